@@ -1,30 +1,136 @@
+import atexit
 import logging
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler
+from typing import Callable, List, Optional, Sequence
 
 # Setup logging directory
 LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-# Configure Audit Logger
+# Batching of the writes: records are written every AUDIT_BATCH_SIZE records or
+# AUDIT_FLUSH_SECONDS, whichever comes first, and always at shutdown
+AUDIT_BATCH_SIZE = int(os.getenv("VIGIE_AUDIT_BATCH_SIZE", 100))
+AUDIT_FLUSH_SECONDS = float(os.getenv("VIGIE_AUDIT_FLUSH_SECONDS", 1.0))
+
+# Formatter
+formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+class FileSink:
+    """
+    Appends a batch of records to the audit file in a single write.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, records: List[logging.LogRecord]):
+        lines = "".join(formatter.format(record) + "\n" for record in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+class AuditWriter:
+    """
+    Background thread draining the audit queue into the sinks by batches, so that
+    callers of log_action never wait on the disk.
+    """
+    def __init__(self, records: "queue.Queue", sinks: Sequence[Callable[[List[logging.LogRecord]], None]],
+                 batch_size: int = AUDIT_BATCH_SIZE, interval: float = AUDIT_FLUSH_SECONDS):
+        self.queue = records
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stopping = object()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every record queued so far is written.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self):
+        """
+        Writes the pending records and ends the thread. Idempotent.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(self._stopping)
+            self._thread.join()
+        self._thread = None
+
+    def _write(self, batch: List[logging.LogRecord]):
+        for sink in self.sinks:
+            try:
+                sink(batch)
+            except Exception as e:
+                # The audit trail must never break the application
+                print(f"Audit write failed ({sink.__class__.__name__}): {e}")
+        batch.clear()
+
+    def _run(self):
+        batch: List[logging.LogRecord] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, logging.LogRecord):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+                if len(batch) < self.batch_size:
+                    continue
+            # Batch full, interval elapsed, flush request or stop
+            if batch:
+                self._write(batch)
+            deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._stopping:
+                return
+
+# Configure Audit Logger: log_action only enqueues, the writer thread does the I/O
 audit_logger = logging.getLogger("audit")
 audit_logger.setLevel(logging.INFO)
 
-# File handler
 log_file = os.path.join(LOG_DIR, "audit.log")
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
+audit_queue: "queue.Queue" = queue.Queue()
+audit_logger.addHandler(QueueHandler(audit_queue))
 
-# Formatter
-formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-file_handler.setFormatter(formatter)
+audit_writer = AuditWriter(audit_queue, [FileSink(log_file)])
+audit_writer.start()
+
+def add_sink(sink: Callable[[List[logging.LogRecord]], None]):
+    """
+    Adds a destination to the audit writer, e.g. the audit table once the database is ready.
+    """
+    audit_writer.sinks.append(sink)
+
+def shutdown():
+    """
+    Flushes the audit trail on exit (registered with atexit and app.on_shutdown).
+    """
+    audit_writer.stop()
 
-audit_logger.addHandler(file_handler)
+atexit.register(shutdown)
 
 def log_action(user_name: str, action: str, details: str):
     """
-    Log an action to the audit file.
+    Log an action to the audit file (and the audit table, see add_sink).
     """
     msg = f"USER: {user_name} | ACTION: {action} | DETAILS: {details}"
-    audit_logger.info(msg)
+    # Structured fields for the audit table (app.services.audit_store.DatabaseSink)
+    audit_logger.info(msg, extra={"audit_user": user_name, "audit_action": action, "audit_details": str(details)})
@@ -1,8 +1,14 @@
 import os
 from pathlib import Path
+from typing import Dict
+from urllib.parse import quote
 
 from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import SQLModel, create_engine, Session
+from app.services.search import create_search_index
 
 # Charger le fichier .env depuis la racine du projet
 project_root = Path(__file__).parent.parent
@@ -14,21 +20,148 @@ sqlite_data_dir = os.getenv("VIGIE_DATA_DIR", default_data_dir)
 # Convertir "." en chemin absolu
 if sqlite_data_dir == ".":
     sqlite_data_dir = str(project_root)
-sqlite_url = f"sqlite:///{sqlite_data_dir}/vigie.db"
+sqlite_path = f"{sqlite_data_dir}/vigie.db"
+sqlite_url = f"sqlite:///{sqlite_path}"
+
+# Connection profile, applied to every new pooled connection. WAL lets pages read
+# while a write is in progress; the page cache and memory-mapped I/O serve
+# read-heavy pages from memory. VIGIE_SQLITE_MMAP_MB=0 disables memory mapping.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "OFF" if os.getenv("VIGIE_SQLITE_FOREIGN_KEYS", "1") == "0" else "ON",
+    "busy_timeout": int(os.getenv("VIGIE_SQLITE_BUSY_TIMEOUT_MS", 30000)),
+    "cache_size": -int(os.getenv("VIGIE_SQLITE_CACHE_MB", 64)) * 1024,  # Negative: size in KiB
+    "mmap_size": int(os.getenv("VIGIE_SQLITE_MMAP_MB", 256)) * 1024 * 1024,
+    "temp_store": os.getenv("VIGIE_SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def use_sqlite_profile(target: Engine, pragmas: Dict[str, object] = SQLITE_PRAGMAS):
+    """
+    Applies `pragmas` to each connection the engine opens (most of them only last
+    for the connection, not for the database file).
+    """
+    @event.listens_for(target, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def effective_pragmas(target: Engine, names=SQLITE_PRAGMAS) -> Dict[str, object]:
+    """
+    Values SQLite actually uses for `names` on a pooled connection.
+    """
+    with target.connect() as connection:
+        return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
+# Read-only connections: the page cache settings of the profile, writes refused
+READER_PRAGMAS = {name: value for name, value in SQLITE_PRAGMAS.items() if name != "journal_mode"}
+READER_PRAGMAS["query_only"] = "ON"
+READER_POOL_SIZE = int(os.getenv("VIGIE_SQLITE_READERS", 10))
+
+def serialize_writes(target: Engine):
+    """
+    Starts the transactions of the engine with BEGIN IMMEDIATE: the write lock is
+    taken up front, so concurrent writers wait their turn (busy_timeout) instead
+    of failing when a read transaction upgrades to a write.
+    Connections with the execution option sqlite_deferred=True start a plain BEGIN
+    instead, so that reads never wait for the writer (see get_session).
+    """
+    @event.listens_for(target, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        # SQLAlchemy emits BEGIN itself, see below
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(target, "begin")
+    def begin_immediate(connection):
+        if connection.get_execution_options().get("sqlite_deferred"):
+            connection.exec_driver_sql("BEGIN")
+        else:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
 
-# Enable WAL mode and busy_timeout for concurrency
 connect_args = {"check_same_thread": False, "timeout": 30}
 
-engine = create_engine(sqlite_url, echo=False, connect_args=connect_args)
+def create_writer_engine(path: str) -> Engine:
+    target = create_engine(f"sqlite:///{path}", echo=False, connect_args=connect_args)
+    use_sqlite_profile(target)
+    serialize_writes(target)
+    return target
+
+def create_reader_engine(path: str, pool_size: int = READER_POOL_SIZE) -> Engine:
+    """
+    Read-only engine (mode=ro, query_only). In WAL mode its connections read a
+    consistent snapshot without waiting for the writer.
+    """
+    target = create_engine(f"sqlite:///file:{quote(path)}?mode=ro&uri=true", echo=False,
+                           connect_args=connect_args, pool_size=pool_size, max_overflow=pool_size)
+    use_sqlite_profile(target, READER_PRAGMAS)
+    return target
+
+engine = create_writer_engine(sqlite_path)
+read_engine = create_reader_engine(sqlite_path)
 
 def create_db_and_tables():
-    # Helper to enable WAL mode
-    with engine.connect() as connection:
-        connection.exec_driver_sql("PRAGMA journal_mode=WAL;")
-        connection.exec_driver_sql("PRAGMA synchronous=NORMAL;")
-    
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    create_search_index(engine)
+    for name, target, pragmas in (("writer", engine, SQLITE_PRAGMAS), ("reader", read_engine, READER_PRAGMAS)):
+        print(f"SQLite profile ({name}): " +
+              ", ".join(f"{pragma}={value}" for pragma, value in effective_pragmas(target, pragmas).items()))
+
+def add_missing_columns(target: Engine):
+    """
+    create_all does not alter existing tables: add the nullable columns declared
+    since an existing database was created. Their values are backfilled by
+    app.services.bootstrap.
+    """
+    # Inspected before the transaction: the inspector uses its own connection,
+    # which would wait on the writer lock held by the transaction
+    inspector = inspect(target)
+    missing = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [(table, column) for column in table.columns if column.name not in existing and column.nullable]
+    if not missing:
+        return
+    with target.begin() as conn:
+        for table, column in missing:
+            ddl = CreateColumn(column).compile(dialect=target.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}')
+
+def create_missing_indexes(target: Engine):
+    """
+    create_all only creates the indexes of new tables: add the ones declared
+    since an existing database was created.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(target, checkfirst=True)
 
 def get_session():
+    """
+    Session on the database whose transactions start deferred: reading does not
+    wait for a write transaction in progress (WAL). Use get_write_session to write.
+    """
+    with Session(engine.execution_options(sqlite_deferred=True)) as session:
+        yield session
+
+def get_write_session():
+    """
+    Session whose transactions take the write lock up front (BEGIN IMMEDIATE), for
+    the handlers that write.
+    """
     with Session(engine) as session:
         yield session
+
+def get_read_session():
+    """
+    Session on the read-only engine, for pages that only display data.
+    """
+    with Session(read_engine) as session:
+        yield session
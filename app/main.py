@@ -69,18 +69,34 @@ def categories():
 
 import os
 from app.services.bootstrap import bootstrap_data
+from app.services.jobs import runner
+from app import audit
+from app.database import engine
+from app.services.audit_store import DatabaseSink
 
 # Get the project root directory
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_DIR = os.path.join(PROJECT_ROOT, 'static')
 
-def main():
+def startup():
     create_db_and_tables()
     bootstrap_data()
+    # Audit events also go to the indexed table read by the logs page
+    audit.add_sink(DatabaseSink(engine))
+
+def main():
+    # Run by the process serving the pages only: "spawn" workers (PDF batches, CPU jobs)
+    # import this module again as __mp_main__ and must not migrate or bootstrap the database
+    app.on_startup(startup)
     
     storage_secret = os.getenv('VIGIE_STORAGE_SECRET', 'vigie_secure_key')
     port = int(os.getenv('VIGIE_PORT', 8080))
     
+    # Wait for background jobs (resyncs, reports) before exiting
+    app.on_shutdown(runner.shutdown)
+    # Then write the pending audit records
+    app.on_shutdown(audit.shutdown)
+
     # Serve static files (including favicon)
     app.add_static_files('/static', STATIC_DIR)
     
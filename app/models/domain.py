@@ -1,8 +1,11 @@
 from datetime import date
 from decimal import Decimal
 from typing import Optional, List
+from pydantic import NaiveDatetime
+from sqlalchemy import Index, event
 from sqlmodel import SQLModel, Field, Relationship
 from enum import Enum
+from app.utils.fingerprint import operation_fingerprint
 
 class OperationType(str, Enum):
     ENTREE = "ENTREE"
@@ -42,6 +45,11 @@ class LotBase(SQLModel):
 
 class Lot(LotBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Dates whose allocations are out of date after fraction edits, until the next
+    # sync (see app.services.accounting.mark_resync_window). None bounds are unbounded.
+    resync_pending: Optional[bool] = None
+    resync_start: Optional[date] = None
+    resync_end: Optional[date] = None
     operations: List["Operation"] = Relationship(back_populates="lot")
     quote_parts: List["QuotePart"] = Relationship(back_populates="lot")
 
@@ -69,7 +77,7 @@ class BankAccount(BankAccountBase, table=True):
 
 class QuotePart(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    lot_id: int = Field(foreign_key="lot.id")
+    lot_id: int = Field(foreign_key="lot.id", index=True)
     owner_id: int = Field(foreign_key="owner.id")
     numerator: int
     denominator: int
@@ -80,27 +88,83 @@ class QuotePart(SQLModel, table=True):
     owner: Owner = Relationship(back_populates="quote_parts")
 
 class Operation(SQLModel, table=True):
+    # (lot_id, date) also serves lookups on lot_id alone. The date index is declared
+    # here since the field name shadows its type annotation.
+    __table_args__ = (
+        Index("ix_operation_date", "date"),
+        Index("ix_operation_lot_date", "lot_id", "date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     date: date
     lot_id: Optional[int] = Field(default=None, foreign_key="lot.id")
-    bank_account_id: int = Field(foreign_key="bankaccount.id")
+    bank_account_id: int = Field(foreign_key="bankaccount.id", index=True)
     type: OperationType
     category_id: Optional[int] = Field(default=None, foreign_key="category.id")
     label: str
     amount: Decimal = Field(default=Decimal("0.00"), max_digits=14, decimal_places=2)
     paid_by_owner_id: Optional[int] = Field(default=None, foreign_key="owner.id", description="If paid by owner (Note de frais)")
     proof_filename: Optional[str] = None
+    # Duplicate-detection key (account, date, signed amount, normalized label), see app.services.duplicates
+    fingerprint: Optional[str] = Field(default=None, index=True)
 
     lot: Lot = Relationship(back_populates="operations")
     bank_account: BankAccount = Relationship(back_populates="operations")
     category_ref: Optional[Category] = Relationship(back_populates="operations")
     allocations: List["Allocation"] = Relationship(back_populates="operation")
 
+@event.listens_for(Operation, "before_insert")
+@event.listens_for(Operation, "before_update")
+def _set_fingerprint(mapper, connection, op: Operation):
+    # Bulk Core inserts (app.services.importer) compute it themselves
+    op.fingerprint = operation_fingerprint(op.bank_account_id, op.date, op.type, op.amount, op.label)
+
 class Allocation(SQLModel, table=True):
+    # (owner_id, operation_id) also serves lookups on owner_id alone
+    __table_args__ = (
+        Index("ix_allocation_owner_operation", "owner_id", "operation_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    operation_id: int = Field(foreign_key="operation.id")
+    operation_id: int = Field(foreign_key="operation.id", index=True)
     owner_id: int = Field(foreign_key="owner.id")
     amount: Decimal = Field(default=Decimal("0.00"), max_digits=14, decimal_places=2)
 
     operation: Operation = Relationship(back_populates="allocations")
     owner: Owner = Relationship(back_populates="allocations")
+
+class OwnerBalance(SQLModel, table=True):
+    """
+    Materialized ledger: allocations summed per owner, lot, bank account and month.
+    Maintained by app.services.ledger, never edited directly.
+    """
+    __table_args__ = (
+        Index("ix_ownerbalance_owner_month", "owner_id", "month"),
+        Index("ix_ownerbalance_lot_month", "lot_id", "month"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="owner.id")
+    lot_id: Optional[int] = Field(default=None, foreign_key="lot.id")
+    bank_account_id: int = Field(foreign_key="bankaccount.id")
+    month: date  # First day of the month
+    income: Decimal = Field(default=Decimal("0.00"), max_digits=14, decimal_places=2)
+    expense: Decimal = Field(default=Decimal("0.00"), max_digits=14, decimal_places=2)
+    balance: Decimal = Field(default=Decimal("0.00"), max_digits=14, decimal_places=2)  # income - expense
+
+class AuditEvent(SQLModel, table=True):
+    """
+    One entry of the audit trail, written by app.audit (see app.services.audit_store).
+    """
+    # Newest-first pages: the indexes also hold the rowid, so (timestamp, id) needs no sort
+    __table_args__ = (
+        Index("ix_auditevent_timestamp", "timestamp"),
+        Index("ix_auditevent_user_timestamp", "user", "timestamp"),
+        Index("ix_auditevent_action_timestamp", "action", "timestamp"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    timestamp: NaiveDatetime  # Local time, like the text log
+    user: str
+    action: str
+    details: str = ""
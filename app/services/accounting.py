@@ -1,8 +1,17 @@
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
 from decimal import Decimal
-from datetime import date
-from typing import List, Optional
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, select
 from app.models.domain import Operation, Allocation, QuotePart, Lot, Owner
+from app.services.ledger import refresh_ledger, refresh_ledger_for
+from app.utils.money import from_cents, split_cents, split_cents_array, sql_cents, to_cents
 
 class AccountingError(Exception):
     pass
@@ -40,6 +49,85 @@ def validate_fractions(session: Session, lot_id: int, check_date: date) -> bool:
         
     return total_numerator == common_denominator
 
+class OwnershipTimeline:
+    """
+    Ownership history of a lot as sorted, non-overlapping date intervals.
+    Each interval holds the share vector (owner_id, numerator, denominator) active
+    on every day of [start, end), ordered by owner for deterministic remainders.
+    """
+    def __init__(self, parts: List[QuotePart]):
+        boundaries = set()
+        for p in parts:
+            boundaries.add(p.start_date)
+            if p.end_date is not None:
+                boundaries.add(p.end_date + timedelta(days=1))
+
+        self.starts: List[date] = []
+        self.ends: List[Optional[date]] = []
+        self.shares: List[Tuple[Tuple[int, int, int], ...]] = []
+
+        ordered = sorted(boundaries)
+        for i, start in enumerate(ordered):
+            end = ordered[i + 1] if i + 1 < len(ordered) else None
+            active = sorted(
+                (p for p in parts
+                 if p.start_date <= start and (p.end_date is None or p.end_date >= start)),
+                key=lambda p: (p.owner_id, p.id or 0)
+            )
+            vector = tuple((p.owner_id, p.numerator, p.denominator) for p in active)
+            # Merge with the previous interval when nothing changed
+            if self.shares and self.ends[-1] == start and self.shares[-1] == vector:
+                self.ends[-1] = end
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+            self.shares.append(vector)
+
+    def shares_at(self, check_date: date) -> Tuple[Tuple[int, int, int], ...]:
+        """
+        Returns the share vector active at the given date (empty if none), by binary search.
+        """
+        i = bisect_right(self.starts, check_date) - 1
+        if i < 0:
+            return ()
+        end = self.ends[i]
+        if end is not None and check_date >= end:
+            return ()
+        return self.shares[i]
+
+# Timelines are cached per engine then per lot, so that separate databases never share entries.
+_timeline_cache: "WeakKeyDictionary[Engine, Dict[int, OwnershipTimeline]]" = WeakKeyDictionary()
+
+def get_lot_timeline(session: Session, lot_id: int) -> OwnershipTimeline:
+    """
+    Returns the ownership timeline of a lot, loading its quote parts only on the first call.
+    """
+    lots = _timeline_cache.setdefault(session.get_bind(), {})
+    timeline = lots.get(lot_id)
+    if timeline is None:
+        parts = session.exec(select(QuotePart).where(QuotePart.lot_id == lot_id)).all()
+        timeline = OwnershipTimeline(parts)
+        lots[lot_id] = timeline
+    return timeline
+
+def invalidate_lot_timeline(lot_id: Optional[int] = None):
+    """
+    Drops the cached timeline of a lot (or of every lot) after its quote parts changed.
+    """
+    for lots in list(_timeline_cache.values()):
+        if lot_id is None:
+            lots.clear()
+        else:
+            lots.pop(lot_id, None)
+
+def split_amount(amount: Decimal, shares: Tuple[Tuple[int, int, int], ...]) -> List[Tuple[int, Decimal]]:
+    """
+    Splits an amount along a share vector, rounding each share to the cent (half to even).
+    The last owner takes the remainder so that the shares always sum to the amount.
+    Computed in integer cents, see app.utils.money.
+    """
+    return [(owner_id, from_cents(share)) for owner_id, share in split_cents(to_cents(amount), shares)]
+
 def distribute_operation(session: Session, operation: Operation) -> List[Allocation]:
     """
     Calculates the distribution of an operation among owners based on active quote parts.
@@ -48,60 +136,71 @@ def distribute_operation(session: Session, operation: Operation) -> List[Allocat
     if not operation.lot_id:
         return []
 
-    # 1. Fetch active fractions
-    statement = select(QuotePart).where(QuotePart.lot_id == operation.lot_id)
-    parts = session.exec(statement).all()
-    
-    active_parts = [
-        p for p in parts 
-        if p.start_date <= operation.date and (p.end_date is None or p.end_date >= operation.date)
-    ]
-    
-    if not active_parts:
+    shares = get_lot_timeline(session, operation.lot_id).shares_at(operation.date)
+    if not shares:
          raise FractionError(f"No active quote parts found for Lot {operation.lot_id} at date {operation.date}")
 
-    # Validate sum is 1 (optional here but good practice, or warn)
-    # We proceed even if slightly off? No, strict mode requested.
-    # calling validate_fractions is expensive if we re-query, sticking to logic above.
-    
-    allocations = []
-    
-    # We will distribute the amount.
-    # To avoid rounding issues with Decimals (e.g. 100 / 3 * 3 != 100), 
-    # we calculate shares and track the remainder.
-    
-    remaining_amount = operation.amount
-    
-    # We need to sort parts to ensure deterministic order for remainder distribution
-    active_parts.sort(key=lambda p: p.owner_id)
-    
-    for i, part in enumerate(active_parts):
-        # Calculation: Amount * (Num / Denom)
-        # Using Decimal for Amount.
-        # share = amount * num / denom
-        
-        share = (operation.amount * part.numerator) / part.denominator
-        # Round to 2 decimals
-        share_rounded = share.quantize(Decimal("0.01"))
-        
-        # If this is the last part, valid or not, we might dump the remainder here?
-        # Better strategy: Accumulated error distribution. 
-        # But simple version: Give difference to last, or largest.
-        # Let's use the 'largest remainder' or just adjust the last one.
-        
-        if i == len(active_parts) - 1:
-            # Last one takes the rest to ensure Sum(allocs) == Total
-            # Sum so far
-            current_allocated = sum(a.amount for a in allocations)
-            share_rounded = operation.amount - current_allocated
-            
-        allocations.append(Allocation(
+    return [
+        Allocation(
             operation_id=operation.id, # Might be None if op is new
-            owner_id=part.owner_id,
-            amount=share_rounded
-        ))
-        
-    return allocations
+            owner_id=owner_id,
+            amount=amount
+        )
+        for owner_id, amount in split_amount(operation.amount, shares)
+    ]
+
+def distribute_operations(session: Session, operations: Sequence[Operation]) -> List[dict]:
+    """
+    Batch version of distribute_operation for already flushed operations.
+    Operations are grouped by lot and by ownership interval, then each group is
+    split at once with NumPy integer arithmetic (same rounding and last-owner
+    remainder rule). Returns allocation rows ready for an executemany INSERT,
+    ordered like `operations`. Operations without lot get no allocation.
+    """
+    by_lot: Dict[int, List[int]] = defaultdict(list)
+    for position, op in enumerate(operations):
+        if op.lot_id:
+            by_lot[op.lot_id].append(position)
+
+    positions_out, owners_out, cents_out = [], [], []
+    for lot_id, positions in by_lot.items():
+        timeline = get_lot_timeline(session, lot_id)
+        positions = np.array(positions, dtype=np.int64)
+        days = np.array([operations[p].date.toordinal() for p in positions], dtype=np.int64)
+        cents = np.array([to_cents(operations[p].amount) for p in positions], dtype=np.int64)
+
+        # Interval of each operation, by binary search on the interval starts
+        starts = np.array([d.toordinal() for d in timeline.starts], dtype=np.int64)
+        ends = np.array([d.toordinal() if d else np.iinfo(np.int64).max for d in timeline.ends], dtype=np.int64)
+        interval = np.searchsorted(starts, days, side="right") - 1
+        active = interval >= 0
+        active[active] = days[active] < ends[interval[active]]
+        for i in np.unique(interval[active]):
+            if not timeline.shares[i]:
+                active[interval == i] = False
+        if not active.all():
+            op = operations[positions[np.argmin(active)]]
+            raise FractionError(f"No active quote parts found for Lot {lot_id} at date {op.date}")
+
+        for i in np.unique(interval):
+            members = interval == i
+            shares = timeline.shares[i]
+            split = split_cents_array(cents[members], shares)
+            positions_out.append(np.repeat(positions[members], len(shares)))
+            owners_out.append(np.tile(np.array([owner_id for owner_id, _, _ in shares], dtype=np.int64),
+                                      int(members.sum())))
+            cents_out.append(split.ravel())
+
+    if not positions_out:
+        return []
+    positions = np.concatenate(positions_out)
+    order = np.argsort(positions, kind="stable")
+    owners = np.concatenate(owners_out)[order].tolist()
+    cents = np.concatenate(cents_out)[order].tolist()
+    return [
+        {"operation_id": operations[position].id, "owner_id": owner_id, "amount": from_cents(share)}
+        for position, owner_id, share in zip(positions[order].tolist(), owners, cents)
+    ]
 
 def create_transfer(session, date_obj, amount: Decimal, from_acc_id: int, to_acc_id: int, lot_id: Optional[int], label: str):
     """
@@ -160,30 +259,164 @@ def create_transfer(session, date_obj, amount: Decimal, from_acc_id: int, to_acc
         for a in d_in:
             a.operation_id = op_in.id
             session.add(a)
+
+        refresh_ledger_for(session, [(lot_id, date_obj)])
         
     return op_out, op_in
 
-def resync_lot_allocations(session: Session, lot_id: int):
+@dataclass
+class ResyncReport:
+    """
+    Outcome of a lot resynchronisation.
+    """
+    operations: int = 0
+    allocations: int = 0
+    skipped: int = 0
+
+# A date window is an inclusive (start, end) pair, None meaning unbounded on that side.
+DateWindow = Tuple[Optional[date], Optional[date]]
+
+# Snapshot of a quote part: (owner_id, numerator, denominator, start_date, end_date)
+FractionSnapshot = Tuple[int, int, int, date, Optional[date]]
+
+def fraction_snapshot(qp: QuotePart) -> FractionSnapshot:
+    return (qp.owner_id, qp.numerator, qp.denominator, qp.start_date, qp.end_date)
+
+def merge_windows(first: Optional[DateWindow], second: Optional[DateWindow]) -> Optional[DateWindow]:
+    """
+    Returns the smallest window covering both windows (None stands for "no window").
+    """
+    if first is None:
+        return second
+    if second is None:
+        return first
+    start = None if first[0] is None or second[0] is None else min(first[0], second[0])
+    end = None if first[1] is None or second[1] is None else max(first[1], second[1])
+    return (start, end)
+
+def fraction_change_window(before: Optional[FractionSnapshot], after: Optional[FractionSnapshot]) -> Optional[DateWindow]:
+    """
+    Computes the dates whose distribution can change when a quote part goes from
+    `before` to `after` (None for an insertion or a deletion).
+    Returns None when nothing needs to be recomputed.
+    """
+    if before is None and after is None:
+        return None
+    if before is None:
+        return (after[3], after[4])
+    if after is None:
+        return (before[3], before[4])
+    if before == after:
+        return None
+
+    if before[:3] != after[:3]:
+        # The share itself changed: every day covered by either version is affected
+        return merge_windows((before[3], before[4]), (after[3], after[4]))
+
+    # Only the period moved: the affected days are those gained or lost at each end
+    window = None
+    (_, _, _, old_start, old_end), (_, _, _, new_start, new_end) = before, after
+    if old_start != new_start:
+        window = merge_windows(window, (min(old_start, new_start), max(old_start, new_start) - timedelta(days=1)))
+    if old_end != new_end:
+        if old_end is None or new_end is None:
+            lower = (old_end or new_end) + timedelta(days=1)
+            window = merge_windows(window, (lower, None))
+        else:
+            window = merge_windows(window, (min(old_end, new_end) + timedelta(days=1), max(old_end, new_end)))
+    return window
+
+def pending_resync_window(lot: Lot) -> Optional[DateWindow]:
+    return (lot.resync_start, lot.resync_end) if lot.resync_pending else None
+
+def mark_resync_window(session: Session, lot_id: int, window: Optional[DateWindow]):
+    """
+    Records on the lot that the allocations of `window` must be regenerated, merged
+    with the window already pending. Called in the transaction of the fraction edit,
+    so that the window survives until sync_lot_history whatever page made the edit.
     """
-    Deletes and regenerates ALL allocations for all operations tied to a specific lot.
+    if window is None:
+        return
+    lot = session.get(Lot, lot_id)
+    if lot is None:
+        return
+    lot.resync_start, lot.resync_end = merge_windows(pending_resync_window(lot), window)
+    lot.resync_pending = True
+
+def _covers(outer: DateWindow, inner: DateWindow) -> bool:
+    starts_before = outer[0] is None or (inner[0] is not None and outer[0] <= inner[0])
+    ends_after = outer[1] is None or (inner[1] is not None and inner[1] <= outer[1])
+    return starts_before and ends_after
+
+def sync_lot_history(session: Session, lot_id: int) -> ResyncReport:
+    """
+    Regenerates the allocations of the window pending on the lot (the full history
+    if none is recorded) and clears it, in one transaction.
+    """
+    lot = session.get(Lot, lot_id)
+    window = pending_resync_window(lot) if lot is not None else None
+    start, end = window or (None, None)
+    return resync_lot_allocations(session, lot_id, start, end)
+
+def resync_lot_allocations(session: Session, lot_id: int, start: Optional[date] = None, end: Optional[date] = None) -> ResyncReport:
+    """
+    Deletes and regenerates the allocations of the operations tied to a specific lot,
+    optionally restricted to operations dated within [start, end] (both inclusive).
     Useful when quote parts are modified and historical data needs to be updated.
+
+    Works set-based: one DELETE for the lot, a single load of its quote parts,
+    in-memory distribution and one executemany INSERT.
+    Operations dated outside any fraction are left without allocations and counted as skipped.
+    The window pending on the lot is cleared when [start, end] covers it.
     """
-    # 1. Fetch all operations for this lot
-    ops = session.exec(select(Operation).where(Operation.lot_id == lot_id)).all()
-    
-    for op in ops:
-        # 2. Delete existing allocations
-        existing = session.exec(select(Allocation).where(Allocation.operation_id == op.id)).all()
-        for a in existing:
-            session.delete(a)
-        
-        # 3. Redistribute
-        try:
-            new_allocs = distribute_operation(session, op)
-            for a in new_allocs:
-                session.add(a)
-        except FractionError:
-             # Skip if no fractions for that date (might happen if user hasn't defined early fractions)
-             pass
-    
+    op_filter = [Operation.lot_id == lot_id]
+    if start is not None:
+        op_filter.append(Operation.date >= start)
+    if end is not None:
+        op_filter.append(Operation.date <= end)
+
+    lot_op_ids = select(Operation.id).where(*op_filter)
+
+    # 1. Delete existing allocations of the lot in one statement
+    session.execute(
+        delete(Allocation).where(Allocation.operation_id.in_(lot_op_ids)),
+        execution_options={"synchronize_session": False}
+    )
+
+    # 2. Load the quote parts once and refresh the cached timeline with them
+    parts = session.exec(select(QuotePart).where(QuotePart.lot_id == lot_id)).all()
+    timeline = OwnershipTimeline(parts)
+    _timeline_cache.setdefault(session.get_bind(), {})[lot_id] = timeline
+
+    # 3. Redistribute every operation in memory
+    report = ResyncReport()
+    rows = []
+    # Amounts read as integer cents and split in integers
+    ops = session.exec(
+        select(Operation.id, Operation.date, sql_cents(Operation.amount)).where(*op_filter)
+    ).all()
+    for op_id, op_date, cents in ops:
+        report.operations += 1
+        shares = timeline.shares_at(op_date)
+        if not shares:
+            # No fractions for that date (might happen if user hasn't defined early fractions)
+            report.skipped += 1
+            continue
+        for owner_id, share in split_cents(cents, shares):
+            rows.append({"operation_id": op_id, "owner_id": owner_id, "amount": from_cents(share)})
+
+    # 4. Insert all allocations with a single executemany
+    if rows:
+        session.execute(insert(Allocation), rows)
+    report.allocations = len(rows)
+
+    # 5. Keep the balance ledger in the same transaction
+    refresh_ledger(session, lot_id, start, end)
+
+    lot = session.get(Lot, lot_id)
+    pending = pending_resync_window(lot) if lot is not None else None
+    if pending is not None and _covers((start, end), pending):
+        lot.resync_pending, lot.resync_start, lot.resync_end = None, None, None
+
     session.commit()
+    return report
@@ -0,0 +1,168 @@
+"""
+Structured audit trail: events are stored in the indexed `auditevent` table by
+the audit writer thread (DatabaseSink) and paged newest first by the logs page.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from app.models.domain import AuditEvent
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def parse_log_line(line: str):
+    """
+    Parses a log line in the format:
+    YYYY-MM-DD HH:MM:SS - USER: user_name | ACTION: action | DETAILS: details
+    """
+    pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - USER: (.*?) \| ACTION: (.*?) \| DETAILS: (.*)$'
+    match = re.match(pattern, line.strip())
+    if match:
+        return {
+            'timestamp': match.group(1),
+            'user': match.group(2),
+            'action': match.group(3),
+            'details': match.group(4)
+        }
+    return None
+
+def record_row(record: logging.LogRecord) -> Optional[dict]:
+    """
+    Row of a log_action record (fields passed as `extra`), None for other records.
+    """
+    if not hasattr(record, "audit_action"):
+        return None
+    return {
+        "timestamp": datetime.fromtimestamp(record.created).replace(microsecond=0),
+        "user": record.audit_user,
+        "action": record.audit_action,
+        "details": record.audit_details,
+    }
+
+class DatabaseSink:
+    """
+    Audit writer sink inserting a batch of records with one executemany.
+    """
+    def __init__(self, target: Engine):
+        self.target = target
+
+    def __call__(self, records: List[logging.LogRecord]):
+        rows = [row for row in map(record_row, records) if row is not None]
+        if rows:
+            with self.target.begin() as conn:
+                conn.execute(insert(AuditEvent.__table__), rows)
+
+def _legacy_rows(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parsed = parse_log_line(line)
+            if parsed:
+                parsed["timestamp"] = datetime.strptime(parsed["timestamp"], TIMESTAMP_FORMAT)
+                yield parsed
+
+def import_legacy_log(session: Session, path: str, batch_size: int = 5000) -> int:
+    """
+    Loads the text audit log into an empty audit table (first start after the
+    upgrade), by batches of executemany INSERTs, and commits. Returns the number
+    of events imported; 0 when the table already has events or there is no file.
+    """
+    if not os.path.exists(path) or session.exec(select(AuditEvent.id).limit(1)).first() is not None:
+        return 0
+    imported = 0
+    batch = []
+    for row in _legacy_rows(path):
+        batch.append(row)
+        if len(batch) == batch_size:
+            session.execute(insert(AuditEvent.__table__), batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(AuditEvent.__table__), batch)
+        imported += len(batch)
+    session.commit()
+    return imported
+
+# --- Queries ---
+
+@dataclass
+class AuditFilters:
+    """
+    Filters of the logs page, all optional. Dates are inclusive.
+    """
+    user: Optional[str] = None
+    action: Optional[str] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.user is not None:
+            conditions.append(AuditEvent.user == self.user)
+        if self.action is not None:
+            conditions.append(AuditEvent.action == self.action)
+        if self.start is not None:
+            conditions.append(AuditEvent.timestamp >= datetime.combine(self.start, datetime.min.time()))
+        if self.end is not None:
+            conditions.append(AuditEvent.timestamp < datetime.combine(self.end + timedelta(days=1), datetime.min.time()))
+        return conditions
+
+# Position of an event in the newest-first order, used as keyset cursor
+Cursor = Tuple[datetime, int]
+
+def count_events(session: Session, filters: AuditFilters) -> int:
+    return session.exec(select(func.count(AuditEvent.id)).where(*filters.conditions())).one()
+
+def fetch_events(session: Session, filters: AuditFilters, limit: int,
+                 before: Optional[Cursor] = None, offset: int = 0) -> List[AuditEvent]:
+    """
+    One page of events, newest first. `before` is the (timestamp, id) of the last
+    event of the previous page.
+    """
+    statement = select(AuditEvent).where(*filters.conditions())
+    if before is not None:
+        before_time, before_id = before
+        # The redundant upper bound lets SQLite seek in the timestamp index
+        statement = statement.where(AuditEvent.timestamp <= before_time,
+                                    or_(AuditEvent.timestamp < before_time, AuditEvent.id < before_id))
+    statement = statement.order_by(AuditEvent.timestamp.desc(), AuditEvent.id.desc())
+    return session.exec(statement.offset(offset).limit(limit)).all()
+
+def _distinct_values(session: Session, column) -> List[str]:
+    # Loose index scan: each step seeks the next value in the (column, timestamp)
+    # index, so the cost grows with the number of distinct values, not of events
+    values = select(func.min(column).label("value")).cte("distinct_values", recursive=True)
+    following = select(select(func.min(column)).where(column > values.c.value).scalar_subquery())
+    values = values.union_all(following.where(values.c.value.is_not(None)))
+    return session.exec(select(values.c.value).where(values.c.value.is_not(None))).all()
+
+def audit_choices(session: Session) -> Tuple[List[str], List[str]]:
+    """
+    Distinct users and actions of the trail, in order, for the filter selectors.
+    """
+    return _distinct_values(session, AuditEvent.user), _distinct_values(session, AuditEvent.action)
+
+class AuditPager:
+    """
+    Numbered pages of the audit trail with keyset pagination, like JournalPager.
+    """
+    def __init__(self, filters: AuditFilters, page_size: int = 50):
+        self.filters = filters
+        self.page_size = page_size
+        self._cursors: Dict[int, Optional[Cursor]] = {1: None}
+
+    def total(self, session: Session) -> int:
+        return count_events(session, self.filters)
+
+    def page(self, session: Session, number: int) -> List[AuditEvent]:
+        number = max(1, number)
+        known = max(k for k in self._cursors if k <= number)
+        rows = fetch_events(session, self.filters, self.page_size, before=self._cursors[known],
+                            offset=(number - known) * self.page_size)
+        if len(rows) == self.page_size:
+            self._cursors[number + 1] = (rows[-1].timestamp, rows[-1].id)
+        return rows
@@ -1,6 +1,10 @@
-from app.database import get_session
+from app.database import get_write_session
 from app.services.auth import get_password_hash
 from app.models.domain import Owner, UserRole, Category, Operation, OperationType, OperationCategory
+from app.services.ledger import ensure_ledger
+from app.services.duplicates import backfill_fingerprints
+from app.services.audit_store import import_legacy_log
+from app.audit import log_file
 from sqlmodel import select
 
 def bootstrap_categories(session):
@@ -59,14 +63,33 @@ def migrate_operations_to_categories(session):
     session.commit()
     print("Migration complete.")
 
+def migrate_operation_fingerprints(session):
+    """
+    Fills the duplicate-detection fingerprint of operations created before the column existed.
+    """
+    filled = backfill_fingerprints(session)
+    if filled:
+        print(f"Fingerprints computed for {filled} operations.")
+
+def migrate_audit_log(session):
+    """
+    Loads the history of the text audit log into the audit table on the first start.
+    """
+    imported = import_legacy_log(session, log_file)
+    if imported:
+        print(f"Imported {imported} audit events from {log_file}.")
+
 def bootstrap_data():
     """
     Creates initial data and runs migrations.
     """
-    with next(get_session()) as session:
+    with next(get_write_session()) as session:
         # 1. Categories Bootstrap & Migration
         bootstrap_categories(session)
         migrate_operations_to_categories(session)
+        migrate_operation_fingerprints(session)
+        migrate_audit_log(session)
+        ensure_ledger(session)
 
         # 2. Owners Bootstrap
         owners = session.exec(select(Owner)).all()
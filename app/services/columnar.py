@@ -0,0 +1,113 @@
+"""
+Compact columnar export of allocations for analytics (NumPy .npz archive).
+
+Layout (FORMAT_VERSION 1), one entry per array, all of the same length N:
+    operation_id   int64   id of the operation
+    date           int32   proleptic Gregorian ordinal (date.toordinal())
+    amount_cents   int64   allocated amount in cents, sign of the allocation
+    type           int8    +1 for ENTREE, -1 for SORTIE
+    owner          int32   index into owner_names
+    lot            int32   index into lot_names, -1 when the operation has no lot
+    category       int32   index into category_names, -1 when uncategorized
+Dictionaries (unicode arrays): owner_names, lot_names, category_names.
+Scalar: format_version.
+
+Load it with load_allocations_npz() or directly with numpy.load(path, allow_pickle=False).
+"""
+import io
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import BinaryIO, Dict, List, Tuple, Union
+import numpy as np
+from sqlmodel import Session, select
+from app.models.domain import Allocation, Category, Lot, Operation, OperationType, Owner
+from app.utils.money import sql_cents
+
+FORMAT_VERSION = 1
+
+@dataclass
+class AllocationColumns:
+    operation_id: np.ndarray
+    date: np.ndarray
+    amount_cents: np.ndarray
+    type: np.ndarray
+    owner: np.ndarray
+    lot: np.ndarray
+    category: np.ndarray
+    owner_names: np.ndarray
+    lot_names: np.ndarray
+    category_names: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.operation_id)
+
+    def dates(self) -> List[date]:
+        return [date.fromordinal(int(d)) for d in self.date]
+
+def _dictionary(session: Session, model) -> Tuple[Dict[int, int], List[str]]:
+    """
+    Maps the ids of a table to dense codes, returning ({id: code}, names).
+    """
+    rows = session.exec(select(model.id, model.name).order_by(model.id)).all()
+    return {row_id: code for code, (row_id, _) in enumerate(rows)}, [name for _, name in rows]
+
+def export_allocations_npz(session: Session, target: BinaryIO, chunk_rows: int = 10000):
+    """
+    Writes every allocation to `target` in the columnar layout described above.
+    """
+    owner_codes, owner_names = _dictionary(session, Owner)
+    lot_codes, lot_names = _dictionary(session, Lot)
+    category_codes, category_names = _dictionary(session, Category)
+
+    columns = {name: array(typecode) for name, typecode in [
+        ("operation_id", "q"), ("date", "l"), ("amount_cents", "q"), ("type", "b"),
+        ("owner", "l"), ("lot", "l"), ("category", "l"),
+    ]}
+    statement = (
+        select(Allocation.operation_id, Operation.date, sql_cents(Allocation.amount),
+               Operation.type, Allocation.owner_id, Operation.lot_id, Operation.category_id)
+        .join(Operation, Allocation.operation_id == Operation.id)
+        .order_by(Operation.date, Allocation.id)
+    )
+    result = session.execute(statement.execution_options(yield_per=chunk_rows))
+    for op_id, op_date, cents, op_type, owner_id, lot_id, category_id in result:
+        columns["operation_id"].append(op_id)
+        columns["date"].append(op_date.toordinal())
+        columns["amount_cents"].append(cents)
+        columns["type"].append(1 if op_type == OperationType.ENTREE else -1)
+        columns["owner"].append(owner_codes.get(owner_id, -1))
+        columns["lot"].append(lot_codes.get(lot_id, -1))
+        columns["category"].append(category_codes.get(category_id, -1))
+
+    np.savez_compressed(
+        target,
+        format_version=np.int32(FORMAT_VERSION),
+        operation_id=np.asarray(columns["operation_id"], dtype=np.int64),
+        date=np.asarray(columns["date"], dtype=np.int32),
+        amount_cents=np.asarray(columns["amount_cents"], dtype=np.int64),
+        type=np.asarray(columns["type"], dtype=np.int8),
+        owner=np.asarray(columns["owner"], dtype=np.int32),
+        lot=np.asarray(columns["lot"], dtype=np.int32),
+        category=np.asarray(columns["category"], dtype=np.int32),
+        owner_names=np.asarray(owner_names, dtype=str),
+        lot_names=np.asarray(lot_names, dtype=str),
+        category_names=np.asarray(category_names, dtype=str),
+    )
+
+def export_allocations_npz_bytes(session: Session) -> bytes:
+    buffer = io.BytesIO()
+    export_allocations_npz(session, buffer)
+    return buffer.getvalue()
+
+def load_allocations_npz(source: Union[str, BinaryIO]) -> AllocationColumns:
+    """
+    Reads an archive written by export_allocations_npz.
+    """
+    with np.load(source, allow_pickle=False) as archive:
+        version = int(archive["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported allocation export version {version}")
+        return AllocationColumns(**{
+            name: archive[name] for name in AllocationColumns.__dataclass_fields__
+        })
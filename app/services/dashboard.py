@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, List
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.models.domain import BankAccount, Operation, OperationType
+from app.utils.money import from_cents, sql_cents, to_cents
+
+@dataclass
+class DashboardSummary:
+    """
+    Figures shown on the home page.
+    """
+    accounts: List[BankAccount] = field(default_factory=list)
+    account_balances: Dict[int, Decimal] = field(default_factory=dict)
+    total_income: Decimal = Decimal("0.00")
+    total_expense: Decimal = Decimal("0.00")
+
+    @property
+    def global_balance(self) -> Decimal:
+        return sum(self.account_balances.values(), Decimal("0.00"))
+
+def get_dashboard_summary(session: Session) -> DashboardSummary:
+    """
+    Computes income/expense totals and account balances with a single GROUP BY query.
+    """
+    summary = DashboardSummary()
+    summary.accounts = session.exec(select(BankAccount)).all()
+    # Accumulated in integer cents, converted once at the end
+    balances = {a.id: to_cents(a.initial_balance) for a in summary.accounts}
+    income = expense = 0
+
+    statement = (
+        select(Operation.bank_account_id, Operation.type, func.sum(sql_cents(Operation.amount)))
+        .group_by(Operation.bank_account_id, Operation.type)
+    )
+    for account_id, op_type, total in session.exec(statement).all():
+        total = total or 0
+        if op_type == OperationType.ENTREE:
+            income += total
+        else:
+            expense += total
+            total = -total
+        if account_id in balances:
+            balances[account_id] += total
+
+    summary.account_balances = {account_id: from_cents(cents) for account_id, cents in balances.items()}
+    summary.total_income = from_cents(income)
+    summary.total_expense = from_cents(expense)
+    return summary
+
+def get_recent_operations(session: Session, limit: int = 5) -> List[Operation]:
+    """
+    Returns the latest operations, newest first.
+    """
+    statement = select(Operation).order_by(Operation.date.desc(), Operation.id.desc()).limit(limit)
+    return session.exec(statement).all()
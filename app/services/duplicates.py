@@ -0,0 +1,61 @@
+"""
+Duplicate detection for operations, on the indexed `Operation.fingerprint` column
+(account, date, signed amount, normalized label; see app.utils.fingerprint).
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, update
+from sqlmodel import Session, select
+from app.models.domain import Operation
+from app.utils.fingerprint import operation_fingerprint
+
+# Fingerprints per IN (...) query, well below SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+def row_fingerprint(row: dict) -> str:
+    """
+    Fingerprint of an operation row given as a dict of column values (bulk inserts).
+    """
+    return operation_fingerprint(row["bank_account_id"], row["date"], row["type"], row["amount"], row["label"])
+
+def find_duplicates(session: Session, fingerprints: Iterable[str], before_id: Optional[int] = None) -> Dict[str, List[int]]:
+    """
+    Ids of the existing operations sharing each fingerprint, for a whole batch in one
+    indexed query per LOOKUP_CHUNK fingerprints. `before_id` restricts the search to
+    the operations that existed before an import started. Fingerprints without match
+    are absent from the result.
+    """
+    wanted = list(dict.fromkeys(fingerprints))
+    found: Dict[str, List[int]] = defaultdict(list)
+    for i in range(0, len(wanted), LOOKUP_CHUNK):
+        statement = select(Operation.fingerprint, Operation.id) \
+            .where(Operation.fingerprint.in_(wanted[i:i + LOOKUP_CHUNK]))
+        if before_id is not None:
+            statement = statement.where(Operation.id <= before_id)
+        for fingerprint, op_id in session.execute(statement):
+            found[fingerprint].append(op_id)
+    # Sorted here rather than in SQL, so that the lookup stays on the covering index
+    return {fingerprint: sorted(ids) for fingerprint, ids in found.items()}
+
+def backfill_fingerprints(session: Session, batch_size: int = 5000) -> int:
+    """
+    Computes the missing fingerprints (operations written before the column existed)
+    by batches of executemany UPDATEs, and commits. Returns the number of rows filled.
+    """
+    table = Operation.__table__
+    statement = update(table).where(table.c.id == bindparam("op_id")).values(fingerprint=bindparam("fp"))
+    filled = 0
+    while True:
+        rows = session.execute(
+            select(Operation.id, Operation.bank_account_id, Operation.date, Operation.type, Operation.amount, Operation.label)
+            .where(Operation.fingerprint.is_(None)).order_by(Operation.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        session.execute(statement, [
+            {"op_id": op_id, "fp": operation_fingerprint(account_id, d, op_type, amount, label)}
+            for op_id, account_id, d, op_type, amount, label in rows
+        ])
+        filled += len(rows)
+    session.commit()
+    return filled
@@ -1,47 +1,70 @@
 import csv
 import io
-from typing import List
-from app.models.domain import Operation, Allocation
+from typing import Iterator, List
+from sqlmodel import Session, select
+from app.models.domain import Operation, Allocation, BankAccount, Category, Lot, Owner
 
-def generate_operations_csv(operations: List[Operation]) -> str:
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';')
-    
-    # Header
-    writer.writerow(["Date", "Lot", "Compte", "Type", "Categorie", "Libelle", "Montant", "Paye Par"])
-    
-    for op in operations:
-        paid_by = str(op.paid_by_owner_id) if op.paid_by_owner_id else ""
-        writer.writerow([
-            op.date.isoformat(),
-            op.lot.name if op.lot else "?",
-            op.bank_account.name if op.bank_account else "?",
-            op.type.value,
-            op.category_ref.name if op.category_ref else "-",
-            op.label,
-            str(op.amount),
-            paid_by
-        ])
-        
-    return output.getvalue()
+OPERATIONS_HEADER = ["Date", "Lot", "Compte", "Type", "Categorie", "Libelle", "Montant", "Paye Par"]
+ALLOCATIONS_HEADER = ["Date", "Operation", "Lot", "Proprietaire", "Montant"]
 
-def generate_allocations_csv(allocations: List[Allocation]) -> str:
+def _stream_csv(session: Session, header: List[str], statement, to_row, chunk_rows: int) -> Iterator[bytes]:
     """
-    Detailed export of allocations.
+    Yields the CSV as UTF-8 chunks of `chunk_rows` lines, reading the rows from a
+    server-side cursor so that only one chunk is held in memory.
     """
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';')
-    
-    writer.writerow(["Date", "Operation", "Lot", "Proprietaire", "Montant"])
-    
-    for alloc in allocations:
-        op = alloc.operation
-        writer.writerow([
-            op.date.isoformat(),
-            op.label,
-            op.lot.name if op.lot else "?",
-            alloc.owner.name if alloc.owner else "?",
-            str(alloc.amount)
-        ])
-        
-    return output.getvalue()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(header)
+
+    result = session.execute(statement.execution_options(yield_per=chunk_rows))
+    for partition in result.partitions():
+        for row in partition:
+            writer.writerow(to_row(row))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def iter_operations_csv(session: Session, chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    Streaming export of the operations, names resolved in SQL.
+    """
+    statement = (
+        select(Operation.date, Lot.name, BankAccount.name, Operation.type, Category.name,
+               Operation.label, Operation.amount, Operation.paid_by_owner_id)
+        .outerjoin(Lot, Operation.lot_id == Lot.id)
+        .outerjoin(BankAccount, Operation.bank_account_id == BankAccount.id)
+        .outerjoin(Category, Operation.category_id == Category.id)
+        .order_by(Operation.date, Operation.id)
+    )
+    def to_row(row):
+        op_date, lot, account, op_type, category, label, amount, paid_by = row
+        return [
+            op_date.isoformat(),
+            lot or "?",
+            account or "?",
+            op_type.value,
+            category or "-",
+            label,
+            str(amount),
+            str(paid_by) if paid_by else ""
+        ]
+    return _stream_csv(session, OPERATIONS_HEADER, statement, to_row, chunk_rows)
+
+def iter_allocations_csv(session: Session, chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    Streaming detailed export of allocations, names resolved in SQL.
+    """
+    statement = (
+        select(Operation.date, Operation.label, Lot.name, Owner.name, Allocation.amount)
+        .join(Operation, Allocation.operation_id == Operation.id)
+        .outerjoin(Lot, Operation.lot_id == Lot.id)
+        .outerjoin(Owner, Allocation.owner_id == Owner.id)
+        .order_by(Operation.date, Allocation.id)
+    )
+    def to_row(row):
+        op_date, label, lot, owner, amount = row
+        return [op_date.isoformat(), label, lot or "?", owner or "?", str(amount)]
+    return _stream_csv(session, ALLOCATIONS_HEADER, statement, to_row, chunk_rows)
@@ -0,0 +1,318 @@
+"""
+Bulk import of bank statements (CSV or OFX).
+
+Statements are parsed line by line, mapped to operation rows (account, category
+and lot rules), distributed in batches and inserted with executemany, all in a
+single transaction.
+"""
+import codecs
+import csv
+import re
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+from app.models.domain import Allocation, Operation, OperationType
+from app.services.accounting import distribute_operations
+from app.services.duplicates import find_duplicates, row_fingerprint
+from app.services.ledger import refresh_ledger
+from app.utils.fingerprint import normalize_label
+from app.utils.money import CENT
+
+class StatementError(Exception):
+    """
+    A statement line that cannot be read. `line` is its 1-based line number.
+    """
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Ligne {line} : {message}")
+        self.line = line
+
+@dataclass
+class StatementLine:
+    line: int
+    date: date
+    label: str
+    amount: Decimal  # Signed: positive for a credit
+
+# --- Parsing ---
+
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d/%m/%y", "%d.%m.%Y", "%Y%m%d")
+
+@lru_cache(maxsize=4096)  # A statement has far fewer distinct dates than lines
+def parse_date(text: str) -> date:
+    text = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"date invalide '{text}'")
+
+def parse_amount(text: str) -> Decimal:
+    """
+    Reads an amount written with either decimal separator ("1.234,56", "-1,234.56", "12,3 €").
+    """
+    cleaned = re.sub(r"[\s  €]", "", text)
+    if not cleaned:
+        return Decimal("0.00")
+    if "," in cleaned and "." in cleaned:
+        # The last separator is the decimal one
+        thousands = "." if cleaned.rfind(",") > cleaned.rfind(".") else ","
+        cleaned = cleaned.replace(thousands, "")
+    cleaned = cleaned.replace(",", ".")
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"montant invalide '{text}'") from None
+    if amount != amount.quantize(CENT):
+        raise ValueError(f"montant au-delà du centime '{text}'")
+    return amount.quantize(CENT)
+
+def _find_column(keys: List[str], *prefixes: str) -> Optional[int]:
+    for prefix in prefixes:
+        for i, key in enumerate(keys):
+            if key.startswith(prefix):
+                return i
+    return None
+
+def iter_csv_statement(lines: Iterable[str]) -> Iterator[StatementLine]:
+    """
+    Reads a CSV statement with a header row. The delimiter (; , or tab) is guessed
+    from the header; amounts come from a signed amount column, or from separate
+    debit and credit columns.
+    """
+    lines = iter(lines)
+    header_line = next(lines, None)
+    if header_line is None:
+        return
+    delimiter = max(";,\t", key=header_line.count)
+    keys = [normalize_label(k) for k in next(csv.reader([header_line], delimiter=delimiter))]
+
+    date_col = _find_column(keys, "date operation", "date")
+    label_col = _find_column(keys, "libelle", "label", "description", "intitule", "memo")
+    amount_col = _find_column(keys, "montant", "amount")
+    debit_col = _find_column(keys, "debit")
+    credit_col = _find_column(keys, "credit")
+    if date_col is None or label_col is None or (amount_col is None and debit_col is None and credit_col is None):
+        raise StatementError(1, "colonnes date, libellé et montant (ou débit/crédit) attendues")
+
+    for number, row in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            if amount_col is not None:
+                amount = parse_amount(row[amount_col])
+            else:
+                amount = Decimal("0.00")
+                if credit_col is not None:
+                    amount += abs(parse_amount(row[credit_col]))
+                if debit_col is not None:
+                    amount -= abs(parse_amount(row[debit_col]))
+            yield StatementLine(number, parse_date(row[date_col]), row[label_col].strip(), amount)
+        except (ValueError, IndexError) as e:
+            raise StatementError(number, str(e)) from None
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+def iter_ofx_statement(lines: Iterable[str]) -> Iterator[StatementLine]:
+    """
+    Reads the <STMTTRN> transactions of an OFX statement (SGML 1.x or XML 2.x).
+    """
+    current: Optional[Dict[str, str]] = None
+    start = 0
+    for number, text in enumerate(lines, start=1):
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    current, start = {}, number
+                elif current is not None:
+                    yield _ofx_line(start, current)
+                    current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+def _ofx_line(number: int, fields: Dict[str, str]) -> StatementLine:
+    try:
+        posted = parse_date(fields["DTPOSTED"][:8])
+        amount = parse_amount(fields["TRNAMT"])
+    except (KeyError, ValueError) as e:
+        raise StatementError(number, f"transaction incomplète ({e})") from None
+    name, memo = fields.get("NAME", ""), fields.get("MEMO", "")
+    label = f"{name} {memo}".strip() if memo and memo != name else (name or memo)
+    return StatementLine(number, posted, label, amount)
+
+def _detect_encoding(path: str) -> str:
+    # Bank exports are UTF-8 or Windows-1252
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        try:
+            while chunk := f.read(1 << 16):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return "cp1252"
+    return "utf-8-sig"
+
+def read_statement(path: str, filename: Optional[str] = None) -> Iterator[StatementLine]:
+    """
+    Streams the lines of a statement file; OFX/QFX by extension, CSV otherwise.
+    """
+    name = (filename or path).lower()
+    with open(path, encoding=_detect_encoding(path), newline="") as f:
+        if name.endswith((".ofx", ".qfx")):
+            yield from iter_ofx_statement(f)
+        else:
+            yield from iter_csv_statement(f)
+
+# --- Mapping ---
+
+@dataclass
+class ImportRule:
+    """
+    Assigns a category and/or a lot to the lines whose label contains `pattern` (case-insensitive).
+    """
+    pattern: str
+    category_id: Optional[int] = None
+    lot_id: Optional[int] = None
+
+@dataclass
+class ImportSettings:
+    bank_account_id: int
+    lot_id: Optional[int] = None  # Default lot
+    income_category_id: Optional[int] = None
+    expense_category_id: Optional[int] = None
+    rules: List[ImportRule] = field(default_factory=list)
+    # Normalized label -> (category_id, lot_id) learnt from past operations, see learn_rules
+    learned: Dict[str, Tuple[Optional[int], Optional[int]]] = field(default_factory=dict)
+    # Leave out the lines already recorded (re-imported statement, manual entry)
+    skip_duplicates: bool = True
+
+    def map(self, line: StatementLine) -> dict:
+        """
+        Operation row of a statement line. Explicit rules win over learnt labels,
+        which win over the defaults.
+        """
+        op_type = OperationType.ENTREE if line.amount > 0 else OperationType.SORTIE
+        category_id = self.income_category_id if op_type == OperationType.ENTREE else self.expense_category_id
+        lot_id = self.lot_id
+
+        key = normalize_label(line.label)
+        learned = self.learned.get(key)
+        if learned is not None:
+            category_id, lot_id = learned[0] or category_id, learned[1] or lot_id
+        for rule in self.rules:
+            if rule.pattern.lower() in key:
+                category_id, lot_id = rule.category_id or category_id, rule.lot_id or lot_id
+                break
+
+        row = {"date": line.date, "label": line.label, "amount": abs(line.amount), "type": op_type,
+               "bank_account_id": self.bank_account_id, "category_id": category_id, "lot_id": lot_id}
+        row["fingerprint"] = row_fingerprint(row)
+        return row
+
+def learn_rules(session: Session, bank_account_id: Optional[int] = None) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """
+    Category and lot of the most recent operation of each label (optionally of one account),
+    so that recurring lines of a statement are classified like before.
+    """
+    statement = select(Operation.label, Operation.category_id, Operation.lot_id).order_by(Operation.date, Operation.id)
+    if bank_account_id is not None:
+        statement = statement.where(Operation.bank_account_id == bank_account_id)
+    learned = {}
+    for label, category_id, lot_id in session.execute(statement.execution_options(yield_per=5000)):
+        learned[normalize_label(label)] = (category_id, lot_id)
+    return learned
+
+# --- Import ---
+
+@dataclass
+class ImportReport:
+    lines: int = 0
+    allocations: int = 0
+    skipped: int = 0  # Zero amount lines
+    duplicates: int = 0  # Lines matching an operation recorded before the import
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds else 0.0
+
+# What distribute_operations needs from an operation
+_Imported = namedtuple("_Imported", "id lot_id date amount")
+
+def _batches(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def import_statement(session: Session, lines: Iterable[StatementLine], settings: ImportSettings,
+                     batch_size: int = 5000) -> ImportReport:
+    """
+    Imports statement lines as operations in a single transaction: rows are inserted
+    by batches with executemany, distributed in one call per batch, then the ledger
+    months of the touched lots are refreshed. Nothing is kept if any line fails
+    (StatementError, FractionError).
+    With `settings.skip_duplicates`, each existing operation with the same fingerprint
+    absorbs one identical line; repeated lines within the statement are kept.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    touched: Dict[Optional[int], Tuple[date, date]] = {}
+    try:
+        existing_id = session.execute(select(func.max(Operation.id))).scalar() or 0
+        remaining: Dict[str, int] = {}  # Fingerprint -> existing operations not yet matched
+        for batch in _batches(lines, batch_size):
+            rows = []
+            for line in batch:
+                if line.amount == 0:
+                    report.skipped += 1
+                    continue
+                rows.append(settings.map(line))
+            if rows and settings.skip_duplicates:
+                unseen = [row["fingerprint"] for row in rows if row["fingerprint"] not in remaining]
+                matches = find_duplicates(session, unseen, before_id=existing_id)
+                remaining.update((fingerprint, len(matches.get(fingerprint, ()))) for fingerprint in unseen)
+                kept = []
+                for row in rows:
+                    if remaining[row["fingerprint"]]:
+                        remaining[row["fingerprint"]] -= 1
+                        report.duplicates += 1
+                    else:
+                        kept.append(row)
+                rows = kept
+            if not rows:
+                continue
+
+            # Core executemany (no ORM bulk bookkeeping), then the new ids read back in order:
+            # SQLite hands out increasing rowids and the writer holds the lock (BEGIN IMMEDIATE)
+            last_id = session.execute(select(func.max(Operation.id))).scalar() or 0
+            session.execute(insert(Operation.__table__), rows)
+            ids = session.execute(
+                select(Operation.id).where(Operation.id > last_id).order_by(Operation.id)
+            ).scalars().all()
+            ops = [_Imported(op_id, row["lot_id"], row["date"], row["amount"]) for op_id, row in zip(ids, rows)]
+            allocations = distribute_operations(session, ops)
+            if allocations:
+                session.execute(insert(Allocation.__table__), allocations)
+
+            report.lines += len(rows)
+            report.allocations += len(allocations)
+            for op in ops:
+                first, last = touched.get(op.lot_id, (op.date, op.date))
+                touched[op.lot_id] = (min(first, op.date), max(last, op.date))
+
+        for lot_id, (first, last) in touched.items():
+            refresh_ledger(session, lot_id, first, last)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,121 @@
+"""
+Small job runner keeping heavy work (SQLite, PDF rendering, exports) off the NiceGUI
+event loop. I/O-bound jobs run in a thread pool, CPU-bound jobs in a process pool;
+the pool sizes cap the concurrency, extra jobs wait as PENDING.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from multiprocessing import get_context
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+class JobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"  # Still queued when the runner shut down
+
+@dataclass
+class Job:
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    status: JobStatus = JobStatus.PENDING
+    submitted_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    progress: Tuple[int, int] = (0, 0)  # (done, total)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def set_progress(self, done: int, total: int):
+        self.progress = (done, total)
+
+    @property
+    def fraction(self) -> float:
+        done, total = self.progress
+        return done / total if total else 0.0
+
+    async def wait(self) -> Any:
+        return await asyncio.wrap_future(self.future)
+
+class JobRunner:
+    def __init__(self, io_workers: int = 4, cpu_workers: Optional[int] = None, history: int = 50):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.jobs: Deque[Job] = deque(maxlen=history)
+
+    def _executor(self, cpu: bool) -> Executor:
+        # Pools are created on first use so that importing the module stays cheap
+        with self._lock:
+            if cpu:
+                if self._processes is None:
+                    self._processes = ProcessPoolExecutor(self.cpu_workers, mp_context=get_context("spawn"))
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.io_workers, thread_name_prefix="vigie-job")
+            return self._threads
+
+    def submit(self, name: str, fn: Callable, *args, cpu: bool = False, report_progress: bool = False, **kwargs) -> Job:
+        """
+        Schedules `fn(*args, **kwargs)` and returns its Job right away.
+        With report_progress=True, `fn` also receives progress=job.set_progress (I/O jobs only).
+        """
+        job = Job(name=name)
+        if report_progress:
+            kwargs["progress"] = job.set_progress
+
+        if cpu:
+            # A worker process cannot report back: the job counts as running once queued
+            job.status, job.started_at = JobStatus.RUNNING, datetime.now()
+            job.future = self._executor(cpu=True).submit(fn, *args, **kwargs)
+        else:
+            def run():
+                job.status, job.started_at = JobStatus.RUNNING, datetime.now()
+                return fn(*args, **kwargs)
+            job.future = self._executor(cpu=False).submit(run)
+
+        def on_done(future: Future):
+            job.finished_at = datetime.now()
+            if future.cancelled():
+                job.status = JobStatus.CANCELLED
+                return
+            error = future.exception()
+            if error is None:
+                job.status = JobStatus.DONE
+            else:
+                job.status, job.error = JobStatus.FAILED, str(error)
+        job.future.add_done_callback(on_done)
+
+        self.jobs.append(job)
+        return job
+
+    async def io_bound(self, name: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.submit(name, fn, *args, **kwargs).wait()
+
+    async def cpu_bound(self, name: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.submit(name, fn, *args, cpu=True, **kwargs).wait()
+
+    def active(self) -> List[Job]:
+        return [j for j in self.jobs if j.status in (JobStatus.PENDING, JobStatus.RUNNING)]
+
+    def shutdown(self):
+        with self._lock:
+            for pool in (self._threads, self._processes):
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            self._threads = self._processes = None
+
+runner = JobRunner(
+    io_workers=int(os.getenv("VIGIE_JOB_WORKERS", 4)),
+    cpu_workers=int(os.getenv("VIGIE_JOB_PROCESSES", 0)) or None,
+)
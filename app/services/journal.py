@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, or_
+from sqlmodel import Session, select
+from app.models.domain import BankAccount, Category, Lot, Operation, OperationType
+from app.services.search import match_query, operation_fts, search_condition
+
+@dataclass
+class JournalFilters:
+    """
+    Filters of the operations journal, all optional. Dates are inclusive.
+    `search` is free text matched against the label, category and lot names
+    (full-text index); results are then ordered by relevance.
+    """
+    lot_id: Optional[int] = None
+    bank_account_id: Optional[int] = None
+    category_id: Optional[int] = None
+    type: Optional[OperationType] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+    search: Optional[str] = None
+
+    def match(self) -> Optional[str]:
+        return match_query(self.search)
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.lot_id is not None:
+            conditions.append(Operation.lot_id == self.lot_id)
+        if self.bank_account_id is not None:
+            conditions.append(Operation.bank_account_id == self.bank_account_id)
+        if self.category_id is not None:
+            conditions.append(Operation.category_id == self.category_id)
+        if self.type is not None:
+            conditions.append(Operation.type == self.type)
+        if self.start is not None:
+            conditions.append(Operation.date >= self.start)
+        if self.end is not None:
+            conditions.append(Operation.date <= self.end)
+        return conditions
+
+# Position of a row in the journal order, used as keyset cursor
+Cursor = Tuple[date, int]
+
+def _with_search(statement, filters: JournalFilters):
+    query = filters.match()
+    if query is None:
+        return statement
+    return statement.join(operation_fts, operation_fts.c.rowid == Operation.id).where(search_condition(query))
+
+def count_operations(session: Session, filters: JournalFilters) -> int:
+    conditions = filters.conditions()
+    query = filters.match()
+    if query is not None and not conditions:
+        # Search alone: counted on the full-text index, without reading the operations
+        return session.exec(select(func.count()).select_from(operation_fts).where(search_condition(query))).one()
+    statement = select(func.count(Operation.id)).select_from(Operation).where(*conditions)
+    return session.exec(_with_search(statement, filters)).one()
+
+def fetch_journal_page(session: Session, filters: JournalFilters, limit: int,
+                       after: Optional[Cursor] = None, descending: bool = True, offset: int = 0):
+    """
+    Returns one page of the journal ordered by (date, id), with lot, account and category
+    names joined in SQL. `after` is the (date, id) of the last row of the previous page.
+    With a search, pages are ordered by relevance first and `after` is ignored.
+    """
+    statement = (
+        select(
+            Operation.id, Operation.date, Operation.label, Operation.amount, Operation.type,
+            Lot.name.label("lot_name"),
+            BankAccount.name.label("bank_account_name"),
+            Category.name.label("category_name"),
+        )
+        .outerjoin(Lot, Operation.lot_id == Lot.id)
+        .outerjoin(BankAccount, Operation.bank_account_id == BankAccount.id)
+        .outerjoin(Category, Operation.category_id == Category.id)
+        .where(*filters.conditions())
+    )
+    statement = _with_search(statement, filters)
+    searching = filters.match() is not None
+    if after is not None and not searching:
+        after_date, after_id = after
+        if descending:
+            statement = statement.where(or_(Operation.date < after_date,
+                                            and_(Operation.date == after_date, Operation.id < after_id)))
+        else:
+            statement = statement.where(or_(Operation.date > after_date,
+                                            and_(Operation.date == after_date, Operation.id > after_id)))
+    if searching:
+        statement = statement.order_by(operation_fts.c.rank)
+    if descending:
+        statement = statement.order_by(Operation.date.desc(), Operation.id.desc())
+    else:
+        statement = statement.order_by(Operation.date, Operation.id)
+    return session.exec(statement.offset(offset).limit(limit)).all()
+
+class JournalPager:
+    """
+    Serves numbered pages of the journal with keyset pagination.
+    Remembers the cursor ending each visited page; jumping to an unvisited page
+    falls back to an OFFSET from the closest known cursor. Search results, ordered
+    by relevance, are always paged by OFFSET.
+    """
+    def __init__(self, filters: JournalFilters, page_size: int = 25, descending: bool = True):
+        self.filters = filters
+        self.page_size = page_size
+        self.descending = descending
+        self._cursors: Dict[int, Optional[Cursor]] = {1: None}
+
+    def total(self, session: Session) -> int:
+        return count_operations(session, self.filters)
+
+    def page(self, session: Session, number: int) -> List:
+        number = max(1, number)
+        known = max(k for k in self._cursors if k <= number)
+        rows = fetch_journal_page(
+            session, self.filters, self.page_size,
+            after=self._cursors[known], descending=self.descending,
+            offset=(number - known) * self.page_size
+        )
+        if len(rows) == self.page_size and self.filters.match() is None:
+            self._cursors[number + 1] = (rows[-1].date, rows[-1].id)
+        return rows
@@ -0,0 +1,117 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import case, delete, func, insert
+from sqlmodel import Session, select
+from app.models.domain import Operation, Allocation, OwnerBalance, OperationType
+from app.utils.money import from_cents, sql_cents
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+def next_month(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+def _fill_ledger(session: Session, *conditions):
+    """
+    Aggregates the allocations of the operations matching `conditions` into the ledger.
+    """
+    session.flush()
+    # Summed in integer cents: exact, unlike sums of the floating point column
+    income = func.sum(case((Operation.type == OperationType.ENTREE, sql_cents(Allocation.amount)), else_=0))
+    expense = func.sum(case((Operation.type == OperationType.SORTIE, sql_cents(Allocation.amount)), else_=0))
+    month = func.date(Operation.date, "start of month")
+
+    aggregate = (
+        select(Allocation.owner_id, Operation.lot_id, Operation.bank_account_id, month,
+               income / 100.0, expense / 100.0, (income - expense) / 100.0)
+        .join(Operation, Allocation.operation_id == Operation.id)
+        .where(*conditions)
+        .group_by(Allocation.owner_id, Operation.lot_id, Operation.bank_account_id, month)
+    )
+    session.execute(insert(OwnerBalance).from_select(
+        ["owner_id", "lot_id", "bank_account_id", "month", "income", "expense", "balance"],
+        aggregate
+    ))
+
+def refresh_ledger(session: Session, lot_id: Optional[int], start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Recomputes the ledger rows of a lot (None for lot-free operations) for the months
+    overlapping [start, end]. Does not commit: runs inside the caller's transaction.
+    """
+    ledger_filter = [OwnerBalance.lot_id == lot_id if lot_id is not None else OwnerBalance.lot_id.is_(None)]
+    op_filter = [Operation.lot_id == lot_id if lot_id is not None else Operation.lot_id.is_(None)]
+    if start is not None:
+        ledger_filter.append(OwnerBalance.month >= month_start(start))
+        op_filter.append(Operation.date >= month_start(start))
+    if end is not None:
+        ledger_filter.append(OwnerBalance.month < next_month(end))
+        op_filter.append(Operation.date < next_month(end))
+
+    session.execute(delete(OwnerBalance).where(*ledger_filter))
+    _fill_ledger(session, *op_filter)
+
+def refresh_ledger_for(session: Session, entries: Iterable[Tuple[Optional[int], Optional[date]]]):
+    """
+    Recomputes the ledger months touched by operations given as (lot_id, date) pairs,
+    e.g. the old and new values of an edited operation.
+    """
+    months = {(lot_id, month_start(d)) for lot_id, d in entries if d is not None}
+    for lot_id, month in months:
+        refresh_ledger(session, lot_id, month, month)
+
+def rebuild_ledger(session: Session):
+    """
+    Rebuilds the whole ledger from the allocations and commits.
+    """
+    session.execute(delete(OwnerBalance))
+    _fill_ledger(session)
+    session.commit()
+
+def ensure_ledger(session: Session):
+    """
+    Builds the ledger of an existing database the first time it is needed.
+    """
+    if session.exec(select(OwnerBalance.id).limit(1)).first() is None \
+            and session.exec(select(Allocation.id).limit(1)).first() is not None:
+        print("Balance ledger empty. Rebuilding from allocations...")
+        rebuild_ledger(session)
+
+def owner_balances(session: Session, start: Optional[date] = None, end: Optional[date] = None) -> Dict[int, Decimal]:
+    """
+    Returns the signed balance of every owner, optionally restricted to the months of [start, end].
+    """
+    statement = select(OwnerBalance.owner_id, func.sum(sql_cents(OwnerBalance.balance))).group_by(OwnerBalance.owner_id)
+    if start is not None:
+        statement = statement.where(OwnerBalance.month >= month_start(start))
+    if end is not None:
+        statement = statement.where(OwnerBalance.month <= month_start(end))
+    return {owner_id: from_cents(total or 0) for owner_id, total in session.exec(statement).all()}
+
+def owner_totals(session: Session, owner_id: int, start: date, end: date) -> Tuple[Decimal, Decimal]:
+    """
+    Returns the (income, expense) of an owner over the months of [start, end].
+    """
+    statement = (
+        select(func.sum(sql_cents(OwnerBalance.income)), func.sum(sql_cents(OwnerBalance.expense)))
+        .where(OwnerBalance.owner_id == owner_id)
+        .where(OwnerBalance.month >= month_start(start))
+        .where(OwnerBalance.month <= month_start(end))
+    )
+    income, expense = session.exec(statement).one()
+    return from_cents(income or 0), from_cents(expense or 0)
+
+def owner_totals_by_owner(session: Session, start: date, end: date) -> Dict[int, Tuple[Decimal, Decimal]]:
+    """
+    Returns {owner_id: (income, expense)} over the months of [start, end] for every owner.
+    """
+    statement = (
+        select(OwnerBalance.owner_id, func.sum(sql_cents(OwnerBalance.income)), func.sum(sql_cents(OwnerBalance.expense)))
+        .where(OwnerBalance.month >= month_start(start))
+        .where(OwnerBalance.month <= month_start(end))
+        .group_by(OwnerBalance.owner_id)
+    )
+    return {
+        owner_id: (from_cents(income or 0), from_cents(expense or 0))
+        for owner_id, income, expense in session.exec(statement).all()
+    }
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+from app.models.domain import Allocation, Operation, OperationType
+from app.utils.money import from_cents, sql_cents
+
+def signed(column):
+    """
+    SQL expression giving `column` with the sign of the operation (SORTIE counts negative).
+    """
+    return case((Operation.type == OperationType.SORTIE, -column), else_=column)
+
+def owner_amounts(session: Session, operation_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[int, Decimal]]:
+    """
+    Returns {operation_id: {owner_id: signed amount}} from a single grouped query
+    over allocation JOIN operation, optionally restricted to some operations.
+    """
+    statement = (
+        select(Allocation.operation_id, Allocation.owner_id, func.sum(signed(sql_cents(Allocation.amount))))
+        .join(Operation, Allocation.operation_id == Operation.id)
+        .group_by(Allocation.operation_id, Allocation.owner_id)
+    )
+    if operation_ids is not None:
+        statement = statement.where(Allocation.operation_id.in_(list(operation_ids)))
+
+    pivot: Dict[int, Dict[int, Decimal]] = defaultdict(dict)
+    for operation_id, owner_id, amount in session.exec(statement).all():
+        pivot[operation_id][owner_id] = from_cents(amount)
+    return pivot
+
+def grand_total(session: Session) -> Decimal:
+    """
+    Signed sum of all operations.
+    """
+    return from_cents(session.exec(select(func.sum(signed(sql_cents(Operation.amount))))).one() or 0)
@@ -1,29 +1,76 @@
 from fpdf import FPDF
+from fpdf.fonts import TTFFont, SubsetMap
+from fontTools import ttLib
 from datetime import date
 from decimal import Decimal
-from typing import List, Dict
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 from sqlmodel import Session, select
 from app.models.domain import Operation, Allocation, Owner, Category, Lot, OperationType
 from app.utils.formatters import format_currency
+from app.services.ledger import owner_totals, owner_totals_by_owner
+import copy
+import hashlib
+import itertools
+import json
 import os
+import threading
+
+# Bump when the report layout changes, so that cached reports are rendered again
+TEMPLATE_VERSION = 1
+
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}
+
+# Parsed fonts (metrics, glyph ids...), shared by every report rendered in this process
+_font_cache: Dict[str, TTFFont] = {}
+
+def _parsed_font(path: str, style: str) -> TTFFont:
+    """
+    Parses a TrueType font once per process. Parsing the DejaVu fonts costs far more
+    than rendering a small report.
+    """
+    font = _font_cache.get(path)
+    if font is None:
+        loader = FPDF()
+        loader.add_font("DejaVu", style, path)
+        font = next(iter(loader.fonts.values()))
+        # Documents get their own file handle, see add_cached_font
+        font.close()
+        _font_cache[path] = font
+    return font
+
+def add_cached_font(pdf: FPDF, path: str, style: str):
+    """
+    Registers a font in `pdf` from the process cache. Only the per-document state is
+    rebuilt: the glyph subset and the font file handle, which fpdf subsets in place
+    when the document is written.
+    This resets fpdf's private per-document slots, so pyproject pins fpdf2 to the
+    tested minor version; a test checks the output matches fpdf's own add_font.
+    """
+    font = copy.copy(_parsed_font(path, style))
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(path, recalcTimestamp=False, lazy=True)
+    font.subset = SubsetMap(font)
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    pdf.fonts[font.fontkey] = font
 
 class AnnualReportPDF(FPDF):
     def __init__(self):
         super().__init__()
-        # Load DejaVuSans for full Unicode support (€, accents, etc.)
-        font_dir = "/usr/share/fonts/truetype/dejavu"
-        regular = os.path.join(font_dir, "DejaVuSans.ttf")
-        bold = os.path.join(font_dir, "DejaVuSans-Bold.ttf")
-        
+        # DejaVuSans for full Unicode support (€, accents, etc.), parsed once per process
         self.font_family_main = "helvetica" # Fallback
-        
-        if os.path.exists(regular):
-            self.add_font("DejaVu", "", regular, uni=True)
-            self.font_family_main = "DejaVu"
-            
-        if os.path.exists(bold):
-            self.add_font("DejaVu", "B", bold, uni=True)
-            
+
+        for style, filename in FONT_FILES.items():
+            path = os.path.join(FONT_DIR, filename)
+            if os.path.exists(path):
+                add_cached_font(self, path, style)
+                if not style:
+                    self.font_family_main = "DejaVu"
+
         self.set_auto_page_break(auto=True, margin=20)
     
     def header(self):
@@ -49,52 +96,224 @@ class AnnualReportPDF(FPDF):
         self.set_text_color(148, 163, 184) # Slate 400
         self.cell(0, 10, f"Généré le {date.today().strftime('%d/%m/%Y')} - Page {self.page_no()}/{{nb}}", align="C")
 
+class OperationTable:
+    """
+    Writes the operations table of a report row by row from an iterable, starting
+    a new page (with the column headers again) whenever the next row does not fit.
+    Only the current row is held, whatever the number of lines.
+    """
+    # Colonnes: DATE 22, LIBELLÉ 90, CATÉGORIE 30, MONTANT 48 = 190
+    COLUMNS = (("DATE", 22, "C"), ("LIBELLÉ / LOT", 90, "L"), ("CATÉGORIE", 30, "C"), ("MONTANT PART", 48, "R"))
+    HEADER_HEIGHT = 8
+    ROW_HEIGHT = 7
+
+    def __init__(self, pdf: AnnualReportPDF):
+        self.pdf = pdf
+
+    def header(self):
+        # En-tête (police réduite pour plus d'espace)
+        pdf = self.pdf
+        pdf.set_fill_color(241, 245, 249) # Slate 100
+        pdf.set_draw_color(203, 213, 225) # Slate 300
+        pdf.set_text_color(71, 85, 105) # Slate 600
+        pdf.set_font(pdf.font_family_main, "B", 8)
+        for title, width, align in self.COLUMNS:
+            pdf.cell(width, self.HEADER_HEIGHT, title, border=1, align=align, fill=True)
+        pdf.ln()
+
+        # Lignes (police réduite pour afficher plus de texte)
+        pdf.set_font(pdf.font_family_main, "", 7)
+        pdf.set_text_color(15, 23, 42)
+        pdf.set_fill_color(252, 253, 254) # Presque blanc pour alternance
+
+    def row(self, index: int, line: dict):
+        pdf = self.pdf
+        if pdf.will_page_break(self.ROW_HEIGHT):
+            pdf.add_page()
+            self.header()
+
+        fill = (index % 2 == 1)
+        (_, date_w, _), (_, label_w, _), (_, cat_w, _), (_, amount_w, _) = self.COLUMNS
+        pdf.cell(date_w, self.ROW_HEIGHT, line["date"], border="B", align="C", fill=fill)
+
+        # Concat libellé et lot - plus de caractères possibles avec police réduite
+        txt = f"{line['label']} ({line['lot']})"
+        if len(txt) > 70: txt = txt[:67] + "..."
+        pdf.cell(label_w, self.ROW_HEIGHT, txt, border="B", fill=fill)
+        pdf.cell(cat_w, self.ROW_HEIGHT, line["category"][:18], border="B", align="C", fill=fill)
+
+        if line["is_income"]:
+            pdf.set_text_color(5, 150, 105)
+            sign = "+"
+        else:
+            pdf.set_text_color(225, 29, 72)
+            sign = "-"
+        pdf.cell(amount_w, self.ROW_HEIGHT, f"{sign} {format_currency(line['amount'])}", border="B", align="R", fill=fill)
+        pdf.set_text_color(15, 23, 42)
+        pdf.ln()
+
+    def write(self, lines: Iterable[dict]) -> int:
+        """
+        Writes the header then every line. Returns the number of lines written.
+        """
+        self.header()
+        count = 0
+        for count, line in enumerate(lines, start=1):
+            self.row(count - 1, line)
+        return count
+
+def report_filename(owner_name: str, year: int) -> str:
+    """
+    Safe file name of an owner's annual report.
+    """
+    safe_name = owner_name.replace(" ", "_").replace("/", "-")
+    return f"Rapport_{safe_name}_{year}.pdf"
+
+def iter_report_details(session: Session, year: int, owner_id: Optional[int] = None,
+                        chunk_rows: int = 1000) -> Iterator[Tuple[int, dict]]:
+    """
+    Streams the year's allocations (of one owner, or of all owners) as (owner_id, line)
+    with names resolved in SQL, reading `chunk_rows` rows at a time from the cursor.
+    """
+    statement = (
+        select(Allocation.owner_id, Operation.date, Operation.label, Category.name, Lot.name,
+               Allocation.amount, Operation.type)
+        .join(Operation, Allocation.operation_id == Operation.id)
+        .outerjoin(Category, Operation.category_id == Category.id)
+        .outerjoin(Lot, Operation.lot_id == Lot.id)
+        .where(Operation.date >= date(year, 1, 1))
+        .where(Operation.date <= date(year, 12, 31))
+        .order_by(Operation.date, Allocation.id)
+    )
+    if owner_id is not None:
+        statement = statement.where(Allocation.owner_id == owner_id)
+
+    result = session.execute(statement.execution_options(yield_per=chunk_rows))
+    for alloc_owner_id, op_date, label, category, lot, amount, op_type in result:
+        yield alloc_owner_id, {
+            "date": op_date.strftime("%d/%m/%Y"),
+            "label": label,
+            "category": category or "-",
+            "lot": lot or "-",
+            "amount": amount,
+            "is_income": op_type == OperationType.ENTREE
+        }
+
+def fetch_report_details(session: Session, year: int, owner_id: Optional[int] = None) -> Dict[int, List[dict]]:
+    """
+    Fetches the year's allocations partitioned by owner as plain, picklable dicts.
+    """
+    details: Dict[int, List[dict]] = defaultdict(list)
+    for alloc_owner_id, line in iter_report_details(session, year, owner_id):
+        details[alloc_owner_id].append(line)
+    return details
+
+def _owner_lines(session: Session, year: int, owner_id: int) -> Optional[Iterator[dict]]:
+    """
+    Streamed report lines of an owner, or None when the owner has none for the year.
+    """
+    lines = (line for _, line in iter_report_details(session, year, owner_id))
+    first = next(lines, None)
+    if first is None:
+        return None
+    return itertools.chain([first], lines)
+
 def generate_owner_annual_report(session: Session, owner_id: int, year: int) -> bytes:
     owner = session.get(Owner, owner_id)
     if not owner:
         return b""
 
-    start_date = date(year, 1, 1)
-    end_date = date(year, 12, 31)
+    # Totals come from the maintained balance ledger
+    total_income, total_expense = owner_totals(session, owner_id, date(year, 1, 1), date(year, 12, 31))
+    lines = _owner_lines(session, year, owner_id)
+    if lines is None:
+        return b""
+    return render_annual_report(owner.name, year, lines, total_income, total_expense)
 
-    statement = (
-        select(Allocation)
-        .join(Operation)
-        .where(Allocation.owner_id == owner_id)
-        .where(Operation.date >= start_date)
-        .where(Operation.date <= end_date)
-        .order_by(Operation.date)
-    )
-    allocations = session.exec(statement).unique().all()
+def report_key(owner_id: int, owner_name: str, year: int, details: Iterable[dict],
+               total_income: Decimal, total_expense: Decimal) -> str:
+    """
+    Content address of a report: hash of everything it is rendered from. Any
+    operation of the year created, edited or deleted for the owner changes it.
+    """
+    digest = hashlib.sha256(repr((TEMPLATE_VERSION, owner_id, owner_name, year,
+                                  str(total_income), str(total_expense))).encode())
+    for d in details:
+        digest.update(repr((d["date"], d["label"], d["category"], d["lot"],
+                            str(d["amount"]), d["is_income"])).encode())
+    return digest.hexdigest()
 
-    # Calculate totals
-    total_income = Decimal("0.00")
-    total_expense = Decimal("0.00")
-    
-    details = []
-    for alloc in allocations:
-        op = alloc.operation
-        if not op: continue
-        
-        is_income = op.type == OperationType.ENTREE
-        amount = alloc.amount
-        if is_income:
-            total_income += amount
-        else:
-            total_expense += amount
+class ReportCache:
+    """
+    Remembers, for each report file of a directory, the key of the data it was
+    rendered from, so that an up to date file is served instead of rendered again.
+    """
+    INDEX_FILE = ".reports_index.json"
+    _lock = threading.Lock()
 
-        details.append({
-            "date": op.date.strftime("%d/%m/%Y"),
-            "label": op.label,
-            "category": op.category_ref.name if op.category_ref else "-",
-            "lot": op.lot.name if op.lot else "-",
-            "amount": amount,
-            "is_income": is_income
-        })
+    def __init__(self, reports_dir: str):
+        self.reports_dir = reports_dir
+        self.index_path = os.path.join(reports_dir, self.INDEX_FILE)
+        self.index = self._load()
 
-    if not details:
-        return b""
+    def _load(self) -> Dict[str, str]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, filename: str, key: str) -> bool:
+        return (self.index.get(filename) == key
+                and os.path.exists(os.path.join(self.reports_dir, filename)))
+
+    def store(self, filename: str, key: str, content: bytes):
+        os.makedirs(self.reports_dir, exist_ok=True)
+        with self._lock:
+            _write_atomic(os.path.join(self.reports_dir, filename), content)
+            # Reload: another page or batch may have written reports meanwhile
+            self.index = self._load()
+            self.index[filename] = key
+            _write_atomic(self.index_path, json.dumps(self.index, indent=1).encode("utf-8"))
 
+def _write_atomic(path: str, content: bytes):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def save_owner_annual_report(session: Session, owner_id: int, year: int,
+                             reports_dir: str) -> Optional[Tuple[str, bool]]:
+    """
+    Writes an owner's annual report to `reports_dir`, unless the file there was
+    rendered from the same data. Returns (file name, rendered), or None when the
+    owner has no data for the year.
+    """
+    owner = session.get(Owner, owner_id)
+    if not owner:
+        return None
+    total_income, total_expense = owner_totals(session, owner_id, date(year, 1, 1), date(year, 12, 31))
+    # Two streamed passes (hash, then render) rather than holding every line
+    lines = _owner_lines(session, year, owner_id)
+    if lines is None:
+        return None
+
+    filename = report_filename(owner.name, year)
+    key = report_key(owner_id, owner.name, year, lines, total_income, total_expense)
+    cache = ReportCache(reports_dir)
+    if cache.is_current(filename, key):
+        return filename, False
+
+    lines = _owner_lines(session, year, owner_id)
+    cache.store(filename, key, render_annual_report(owner.name, year, lines, total_income, total_expense))
+    return filename, True
+
+def render_annual_report(owner_name: str, year: int, details: Iterable[dict],
+                         total_income: Decimal, total_expense: Decimal) -> bytes:
+    """
+    Renders the PDF from already fetched data (no database access, safe to run in a worker process).
+    `details` may be any iterable of report lines; they are consumed one by one.
+    """
     # Create PDF
     pdf = AnnualReportPDF()
     pdf.add_page()
@@ -110,7 +329,7 @@ def generate_owner_annual_report(session: Session, owner_id: int, year: int) ->
     pdf.cell(35, 8, "Propriétaire :")
     pdf.set_font(pdf.font_family_main, "", 12)
     pdf.set_text_color(15, 23, 42) # Slate 900
-    pdf.cell(0, 8, owner.name, ln=True)
+    pdf.cell(0, 8, owner_name, ln=True)
     
     pdf.set_font(pdf.font_family_main, "B", 12)
     pdf.set_text_color(71, 85, 105)
@@ -156,53 +375,54 @@ def generate_owner_annual_report(session: Session, owner_id: int, year: int) ->
     pdf.set_text_color(30, 41, 59)
     pdf.cell(0, 10, "Détail des Opérations", ln=True)
     
-    # En-tête Tableau (police réduite pour plus d'espace)
-    pdf.set_fill_color(241, 245, 249) # Slate 100
-    pdf.set_draw_color(203, 213, 225) # Slate 300
-    pdf.set_text_color(71, 85, 105) # Slate 600
-    pdf.set_font(pdf.font_family_main, "B", 8)
-    
-    # Colonnes ajustées: DATE 22, LIBELLÉ 90, CATÉGORIE 30, MONTANT 48 = 190
-    pdf.cell(22, 8, "DATE", border=1, align="C", fill=True)
-    pdf.cell(90, 8, "LIBELLÉ / LOT", border=1, align="L", fill=True)
-    pdf.cell(30, 8, "CATÉGORIE", border=1, align="C", fill=True)
-    pdf.cell(48, 8, "MONTANT PART", border=1, align="R", fill=True)
-    pdf.ln()
-
-    # Lignes du tableau (police réduite pour afficher plus de texte)
-    pdf.set_font(pdf.font_family_main, "", 7)
-    pdf.set_text_color(15, 23, 42)
-    
-    for i, d in enumerate(details):
-        if pdf.get_y() > 275:
-            pdf.add_page()
-            # On ne remet pas l'en-tête ici pour l'instant pour gagner de la place, 
-            # mais fpdf le gérerait avec une méthode dédiée si besoin.
-            
-        fill = (i % 2 == 1)
-        pdf.set_fill_color(252, 253, 254) # Presque blanc pour alternance
-        
-        pdf.cell(22, 7, d["date"], border="B", align="C", fill=fill)
-        
-        # Concat libellé et lot - plus de caractères possibles avec police réduite
-        txt = f"{d['label']} ({d['lot']})"
-        if len(txt) > 70: txt = txt[:67] + "..."
-        pdf.cell(90, 7, txt, border="B", fill=fill)
-        
-        cat = d["category"][:18]
-        pdf.cell(30, 7, cat, border="B", align="C", fill=fill)
-        
-        if d["is_income"]:
-            pdf.set_text_color(5, 150, 105)
-            val = f"+ {format_currency(d['amount'])}"
-        else:
-            pdf.set_text_color(225, 29, 72)
-            val = f"- {format_currency(d['amount'])}"
-            
-        pdf.cell(48, 7, val, border="B", align="R", fill=fill)
-        pdf.set_text_color(15, 23, 42)
-        pdf.ln()
+    OperationTable(pdf).write(details)
 
     # Convertir en bytes proprement pour NiceGUI
     output_bytes = pdf.output()
     return bytes(output_bytes)
+
+def generate_annual_reports_batch(session: Session, year: int, reports_dir: str,
+                                  progress: Optional[Callable[[int, int], None]] = None,
+                                  max_workers: Optional[int] = None) -> List[str]:
+    """
+    Generates the annual report of every owner with allocations in `year`.
+    Data is fetched once, then PDFs whose data changed since they were last written
+    are rendered in parallel worker processes and written to `reports_dir`.
+    `progress(done, total)` is called after each file. Returns the file names.
+    """
+    details = fetch_report_details(session, year)
+    if not details:
+        return []
+    owners = {o.id: o.name for o in session.exec(select(Owner).where(Owner.id.in_(list(details)))).all()}
+    totals = owner_totals_by_owner(session, date(year, 1, 1), date(year, 12, 31))
+
+    cache = ReportCache(reports_dir)
+    written = []
+    pending = {}
+    for owner_id, rows in details.items():
+        income, expense = totals.get(owner_id, (Decimal("0.00"), Decimal("0.00")))
+        filename = report_filename(owners[owner_id], year)
+        key = report_key(owner_id, owners[owner_id], year, rows, income, expense)
+        if cache.is_current(filename, key):
+            written.append(filename)
+        else:
+            pending[filename] = (key, (owners[owner_id], year, rows, income, expense))
+
+    total = len(details)
+    if progress and written:
+        progress(len(written), total)
+    if not pending:
+        return written
+
+    # "spawn" keeps workers independent from the server's threads and open connections
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+        futures = {pool.submit(render_annual_report, *args): (filename, key)
+                   for filename, (key, args) in pending.items()}
+
+        for future in as_completed(futures):
+            filename, key = futures[future]
+            cache.store(filename, key, future.result())
+            written.append(filename)
+            if progress:
+                progress(len(written), total)
+    return written
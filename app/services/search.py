@@ -0,0 +1,101 @@
+"""
+Full-text search over operations with an SQLite FTS5 index.
+
+`operation_fts` holds, under the operation id as rowid, the label and the
+category and lot names of each operation. Triggers keep it in sync with every
+write, ORM or Core (bulk import, migrations), and with category or lot renames.
+"""
+import re
+from typing import Optional
+from sqlalchemy import column, table
+from sqlalchemy.engine import Engine
+
+# rank is the FTS5 hidden column ordering matches by bm25, weighted with SEARCH_WEIGHTS
+operation_fts = table("operation_fts", column("rowid"), column("rank"), column("operation_fts"))
+
+# bm25 weights of (label, category, lot): a word of the label counts most
+SEARCH_WEIGHTS = (10.0, 2.0, 2.0)
+
+SEARCH_DDL = [
+    # Accents are ignored, prefix indexes serve the "word*" queries of match_query
+    """CREATE VIRTUAL TABLE IF NOT EXISTS operation_fts USING fts5(
+        label, category, lot, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS operation_fts_insert AFTER INSERT ON operation BEGIN
+        INSERT INTO operation_fts (rowid, label, category, lot) VALUES (
+            new.id, new.label,
+            (SELECT name FROM category WHERE id = new.category_id),
+            (SELECT name FROM lot WHERE id = new.lot_id)
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operation_fts_update AFTER UPDATE OF label, category_id, lot_id ON operation BEGIN
+        DELETE FROM operation_fts WHERE rowid = old.id;
+        INSERT INTO operation_fts (rowid, label, category, lot) VALUES (
+            new.id, new.label,
+            (SELECT name FROM category WHERE id = new.category_id),
+            (SELECT name FROM lot WHERE id = new.lot_id)
+        );
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operation_fts_delete AFTER DELETE ON operation BEGIN
+        DELETE FROM operation_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operation_fts_category AFTER UPDATE OF name ON category BEGIN
+        UPDATE operation_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM operation WHERE category_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS operation_fts_lot AFTER UPDATE OF name ON lot BEGIN
+        UPDATE operation_fts SET lot = new.name
+        WHERE rowid IN (SELECT id FROM operation WHERE lot_id = new.id);
+    END""",
+]
+
+REBUILD_SQL = [
+    "DELETE FROM operation_fts",
+    """INSERT INTO operation_fts (rowid, label, category, lot)
+        SELECT operation.id, operation.label, category.name, lot.name FROM operation
+        LEFT JOIN category ON category.id = operation.category_id
+        LEFT JOIN lot ON lot.id = operation.lot_id""",
+    "INSERT INTO operation_fts (operation_fts) VALUES ('optimize')",
+]
+
+def create_search_index(target: Engine):
+    """
+    Creates the FTS table and its triggers if missing, and fills the table when it is
+    new (existing database). Idempotent.
+    """
+    with target.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'operation_fts'"
+        ).first() is not None
+        for statement in SEARCH_DDL:
+            conn.exec_driver_sql(statement)
+        weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+        conn.exec_driver_sql(f"INSERT INTO operation_fts (operation_fts, rank) VALUES ('rank', 'bm25({weights})')")
+        if not exists:
+            for statement in REBUILD_SQL:
+                conn.exec_driver_sql(statement)
+
+def rebuild_search_index(target: Engine):
+    """
+    Refills the FTS table from the operations, e.g. after a restore done without triggers.
+    """
+    with target.begin() as conn:
+        for statement in REBUILD_SQL:
+            conn.exec_driver_sql(statement)
+
+def match_query(text: Optional[str]) -> Optional[str]:
+    """
+    FTS5 query of a search box input: every word must appear, as a word prefix
+    ("loy dup" finds "VIR LOYER DUPONT"). FTS operators typed by the user are not
+    interpreted. None when there is nothing to search.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+def search_condition(query: str):
+    """
+    Condition on the FTS table for a match_query result.
+    """
+    return operation_fts.c.operation_fts.match(query)
@@ -1,7 +1,7 @@
 from nicegui import ui, app
 from app.ui.theme import frame
 from app.models.domain import BankAccount, UserRole
-from app.database import get_session
+from app.database import get_session, get_write_session
 from sqlmodel import select
 from decimal import Decimal
 from app.utils.formatters import format_currency
@@ -17,7 +17,7 @@ def accounts_page():
         initial = ui.number('Solde Initial', value=0.0, format='%.2f')
         
         def save():
-            with next(get_session()) as session:
+            with next(get_write_session()) as session:
                 if acc_id_ref['value']:
                     # UPDATE
                     acc = session.get(BankAccount, acc_id_ref['value'])
@@ -41,7 +41,7 @@ def accounts_page():
         def delete_acc():
             if not acc_id_ref['value']: return
             try:
-                with next(get_session()) as session:
+                with next(get_write_session()) as session:
                     acc = session.get(BankAccount, acc_id_ref['value'])
                     session.delete(acc)
                     session.commit()
@@ -1,6 +1,6 @@
 from nicegui import ui, app
 from app.ui.theme import frame
-from app.database import get_session
+from app.database import get_session, get_write_session
 from app.models.domain import Category, Operation, OperationType
 from sqlmodel import select, func
 from app.audit import log_action
@@ -43,7 +43,7 @@ def categories_page():
                         ui.notify('Le nom est requis', type='negative')
                         return
                     
-                    with next(get_session()) as session:
+                    with next(get_write_session()) as session:
                         new_cat = Category(
                             name=name_input.value,
                             type=type_select.value,
@@ -79,7 +79,7 @@ def categories_page():
             with ui.row().classes('w-full justify-end mt-4'):
                 ui.button('Annuler', on_click=dialog.close).props('flat')
                 async def save():
-                    with next(get_session()) as session:
+                    with next(get_write_session()) as session:
                         cat = session.get(Category, cat_data['id'])
                         if cat:
                             cat.name = name_input.value
@@ -106,7 +106,7 @@ def categories_page():
             with ui.row().classes('w-full justify-end mt-4'):
                 ui.button('Annuler', on_click=dialog.close).props('flat')
                 async def confirm():
-                    with next(get_session()) as session:
+                    with next(get_write_session()) as session:
                         cat = session.get(Category, cat_data['id'])
                         if cat:
                             session.delete(cat)
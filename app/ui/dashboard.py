@@ -1,10 +1,9 @@
 from nicegui import ui
 from app.ui.theme import frame
-from app.database import get_session
-from app.models.domain import BankAccount, Operation, OperationType
-from sqlmodel import select
+from app.database import get_read_session
+from app.models.domain import OperationType
+from app.services.dashboard import get_dashboard_summary, get_recent_operations
 import locale
-from decimal import Decimal
 from app.utils.formatters import format_currency
 
 # Try to set locale for currency, fallback if not available
@@ -19,31 +18,16 @@ def dashboard_page():
         # Quick Stats Row
         with ui.row().classes('w-full gap-4 sm:gap-6 mb-8 flex-wrap'):
             
-            with next(get_session()) as session:
-                # 1. Fetch Accounts
-                accounts = session.exec(select(BankAccount)).all()
-                
-                # 2. Fetch All Operations (In future: Filter by year)
-                ops = session.exec(select(Operation)).all()
-                
-                # 3. Calculate Totals
-                total_income = Decimal("0.00")
-                total_expense = Decimal("0.00")
-                
-                # Track balance per account
-                account_balances = {a.id: a.initial_balance for a in accounts}
-                
-                for op in ops:
-                    if op.type == OperationType.ENTREE:
-                        total_income += op.amount
-                        if op.bank_account_id in account_balances:
-                            account_balances[op.bank_account_id] += op.amount
-                    else:
-                        total_expense += op.amount
-                        if op.bank_account_id in account_balances:
-                            account_balances[op.bank_account_id] -= op.amount
-                            
-                global_balance = sum(account_balances.values())
+            with next(get_read_session()) as session:
+                # Totals and balances are aggregated in SQL
+                summary = get_dashboard_summary(session)
+                recent_ops = get_recent_operations(session, limit=5)
+
+            accounts = summary.accounts
+            account_balances = summary.account_balances
+            total_income = summary.total_income
+            total_expense = summary.total_expense
+            global_balance = summary.global_balance
 
             # Stat Card 1
             with ui.card().classes('w-full sm:w-64 p-4 glass-panel border-none flex-grow'):
@@ -80,9 +64,7 @@ def dashboard_page():
 
         ui.label('Activité Récente').classes('text-xl font-bold dark:text-white mt-8 mb-4')
         with ui.card().classes('w-full glass-panel border-none p-0'):
-            # Latest 5 ops
-            recent_ops = sorted(ops, key=lambda x: x.date, reverse=True)[:5]
-            
+            # Latest 5 ops (fetched with the summary)
             columns = [
                 {'name': 'date', 'label': 'Date', 'field': 'date', 'align': 'left'},
                 {'name': 'label', 'label': 'Libellé', 'field': 'label', 'align': 'left'},
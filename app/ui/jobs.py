@@ -0,0 +1,13 @@
+from contextlib import asynccontextmanager
+from nicegui import ui
+
+@asynccontextmanager
+async def busy(message: str):
+    """
+    Shows a spinner notification while the enclosed jobs run.
+    """
+    notification = ui.notification(message, spinner=True, timeout=None, type='ongoing')
+    try:
+        yield notification
+    finally:
+        notification.dismiss()
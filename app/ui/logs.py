@@ -1,47 +1,10 @@
-import os
-import re
-from datetime import datetime
+from datetime import date
 from nicegui import ui
 from app.ui.theme import frame
-
-def parse_log_line(line: str):
-    """
-    Parses a log line in the format:
-    YYYY-MM-DD HH:MM:SS - USER: user_name | ACTION: action | DETAILS: details
-    """
-    pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - USER: (.*?) \| ACTION: (.*?) \| DETAILS: (.*)$'
-    match = re.match(pattern, line.strip())
-    if match:
-        return {
-            'timestamp': match.group(1),
-            'user': match.group(2),
-            'action': match.group(3),
-            'details': match.group(4)
-        }
-    return None
+from app.database import get_read_session
+from app.services.audit_store import AuditFilters, AuditPager, audit_choices
 
 def logs_page():
-    def get_logs():
-        log_file = "logs/audit.log"
-        if not os.path.exists(log_file):
-            return []
-        
-        try:
-            with open(log_file, "r", encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
-            
-            # Parse lines and reverse to show latest first
-            parsed_logs = []
-            for line in lines:
-                parsed = parse_log_line(line)
-                if parsed:
-                    parsed_logs.append(parsed)
-            
-            return parsed_logs[::-1]
-        except Exception as e:
-            ui.notify(f"Erreur lors de la lecture des logs: {e}", type='negative')
-            return []
-
     def content():
         with ui.column().classes('w-full gap-4'):
             # Stats / Info Row - Using 'glass-panel' for better dark mode support
@@ -52,20 +15,33 @@ def logs_page():
                         ui.label('Historique des Actions').classes('text-lg font-bold text-slate-900 dark:text-slate-100')
                         ui.label('Suivi des modifications effectuées dans l\'application').classes('text-xs text-slate-500 dark:text-slate-400')
                 
-                ui.button('Rafraîchir', icon='refresh', on_click=lambda: table.update_rows(get_logs())).props('flat color=primary')
+                ui.button('Rafraîchir', icon='refresh', on_click=lambda: refresh()).props('flat color=primary')
+
+            # Filters (applied in SQL, on the indexes of the audit table)
+            with next(get_read_session()) as session:
+                users, actions = audit_choices(session)
+            with ui.row().classes('w-full items-end gap-2'):
+                f_user = ui.select(users, label='Utilisateur', clearable=True).classes('w-48')
+                f_action = ui.select(actions, label='Action', clearable=True).classes('w-48')
+                f_start = ui.input('Du (YYYY-MM-DD)').classes('w-32')
+                f_end = ui.input('Au (YYYY-MM-DD)').classes('w-32')
+                ui.button(icon='filter_alt', on_click=lambda: apply_filters()).props('flat color=primary')
 
             # Table
             columns = [
-                {'name': 'timestamp', 'label': 'Date', 'field': 'timestamp', 'required': True, 'align': 'left', 'sortable': True},
-                {'name': 'user', 'label': 'Utilisateur', 'field': 'user', 'required': True, 'align': 'left', 'sortable': True},
-                {'name': 'action', 'label': 'Action', 'field': 'action', 'required': True, 'align': 'left', 'sortable': True},
+                {'name': 'timestamp', 'label': 'Date', 'field': 'timestamp', 'required': True, 'align': 'left'},
+                {'name': 'user', 'label': 'Utilisateur', 'field': 'user', 'required': True, 'align': 'left'},
+                {'name': 'action', 'label': 'Action', 'field': 'action', 'required': True, 'align': 'left'},
                 {'name': 'details', 'label': 'Détails', 'field': 'details', 'required': True, 'align': 'left'}
             ]
-            
-            rows = get_logs()
-            
+
+            # Server-side pagination, newest first: only the visible page is read
+            pagination = {'page': 1, 'rowsPerPage': 50, 'rowsNumber': 0}
+            pager_ref = {'value': AuditPager(AuditFilters())}
+
             with ui.card().classes('w-full shadow-lg border border-slate-200 dark:border-slate-700'):
-                table = ui.table(columns=columns, rows=rows, row_key='timestamp').classes('w-full')
+                table = ui.table(columns=columns, rows=[], row_key='id', pagination=pagination).classes('w-full')\
+                    .props(':rows-per-page-options="[25, 50, 100]"')
                 table.add_slot('header', r'''
                     <q-tr :props="props">
                         <q-th v-for="col in props.cols" :key="col.name" :props="props">
@@ -89,4 +65,46 @@ def logs_page():
                     </q-td>
                 ''')
 
+            def load_page(new_pagination):
+                pager = pager_ref['value']
+                rows_per_page = new_pagination.get('rowsPerPage') or 50
+                if rows_per_page != pager.page_size:
+                    pager = pager_ref['value'] = AuditPager(pager.filters, rows_per_page)
+                with next(get_read_session()) as session:
+                    total = pager.total(session)
+                    events = pager.page(session, new_pagination.get('page', 1))
+                table.rows = [{
+                    'id': e.id,
+                    'timestamp': e.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                    'user': e.user,
+                    'action': e.action,
+                    'details': e.details,
+                } for e in events]
+                table.pagination = {**new_pagination, 'rowsPerPage': rows_per_page, 'rowsNumber': total}
+                table.update()
+
+            table.on('request', lambda e: load_page(e.args['pagination']))
+
+            def apply_filters():
+                try:
+                    filters = AuditFilters(
+                        user=f_user.value,
+                        action=f_action.value,
+                        start=date.fromisoformat(f_start.value) if f_start.value else None,
+                        end=date.fromisoformat(f_end.value) if f_end.value else None,
+                    )
+                except ValueError:
+                    ui.notify('Date invalide (format YYYY-MM-DD)', type='warning')
+                    return
+                pager_ref['value'] = AuditPager(filters, pager_ref['value'].page_size)
+                load_page({**table.pagination, 'page': 1})
+
+            def refresh():
+                # New events shift the pages: restart from the newest
+                pager = pager_ref['value']
+                pager_ref['value'] = AuditPager(pager.filters, pager.page_size)
+                load_page({**table.pagination, 'page': 1})
+
+            refresh()
+
     frame('Historique', content)
@@ -1,11 +1,16 @@
 from nicegui import ui, app
 from app.ui.theme import frame
 from app.models.domain import Lot, QuotePart, Owner, UserRole
-from app.database import get_session
+from app.database import get_session, get_write_session
 from sqlmodel import select
 from datetime import date
 from typing import Optional
-from app.services.accounting import resync_lot_allocations
+from app.services.jobs import runner
+from app.ui.jobs import busy
+from app.services.accounting import (
+    sync_lot_history, invalidate_lot_timeline,
+    fraction_snapshot, fraction_change_window, mark_resync_window
+)
 
 def lots_page():
     # --- EDIT/ADD LOT DIALOG ---
@@ -31,7 +36,7 @@ def lots_page():
                         ui.notify('Le nom du lot est obligatoire', type='negative')
                         return
                         
-                    with next(get_session()) as session:
+                    with next(get_write_session()) as session:
                         if lot_id_ref['value']:
                             lot = session.get(Lot, lot_id_ref['value'])
                             lot.name = name.value
@@ -49,10 +54,11 @@ def lots_page():
                 def delete_lot():
                     if not lot_id_ref['value']: return
                     try:
-                        with next(get_session()) as session:
+                        with next(get_write_session()) as session:
                              lot = session.get(Lot, lot_id_ref['value'])
                              session.delete(lot)
                              session.commit()
+                        invalidate_lot_timeline(lot_id_ref['value'])
                         ui.notify('Lot supprimé')
                         dialog.close()
                         refresh_main_table_func()
@@ -91,9 +97,11 @@ def lots_page():
                             return
                         
                         try:
-                            with next(get_session()) as session:
+                            before = None
+                            with next(get_write_session()) as session:
                                 if qp_id_ref['value']:
                                     qp = session.get(QuotePart, qp_id_ref['value'])
+                                    before = fraction_snapshot(qp)
                                     qp.owner_id = owner_select.value
                                     qp.numerator = int(num.value)
                                     qp.denominator = int(den.value)
@@ -109,7 +117,11 @@ def lots_page():
                                         end_date=date.fromisoformat(end_d.value) if end_d.value else None
                                     )
                                     session.add(qp)
+                                # The dates to regenerate are stored with the edit, until the next sync
+                                mark_resync_window(session, lot_id_ref['value'],
+                                                   fraction_change_window(before, fraction_snapshot(qp)))
                                 session.commit()
+                            invalidate_lot_timeline(lot_id_ref['value'])
                             
                             ui.notify('Fraction enregistrée')
                             cancel_edit_fraction()
@@ -140,11 +152,23 @@ def lots_page():
                                 save_frac_btn.text = 'ENREGISTRER'
                                 cancel_frac_btn.visible = True
 
-                    def sync_history_fraction():
-                        if not lot_id_ref['value']: return
-                        with next(get_session()) as session:
-                            resync_lot_allocations(session, lot_id_ref['value'])
-                        ui.notify('Historique synchronisé avec les nouvelles parts')
+                    async def sync_history_fraction():
+                        lot_id = lot_id_ref['value']
+                        if not lot_id: return
+                        # Only regenerate the dates touched by edits; full history if nothing is pending
+                        def resync():
+                            with next(get_write_session()) as session:
+                                return sync_lot_history(session, lot_id)
+
+                        try:
+                            async with busy('Synchronisation de l\'historique...'):
+                                report = await runner.io_bound(f'Resync lot {lot_id}', resync)
+                        except Exception as e:
+                            ui.notify(f"Erreur: {e}", type='negative')
+                            return
+                        ui.notify(f'Historique synchronisé avec les nouvelles parts ({report.operations} opérations)')
+                        if report.skipped:
+                            ui.notify(f'{report.skipped} opération(s) sans quote-part à leur date, non réparties', type='warning')
 
                     user_role = app.storage.user.get('role', UserRole.READ.value)
                     can_edit = user_role in [UserRole.WRITE.value, UserRole.ADMIN.value]
@@ -157,7 +181,7 @@ def lots_page():
                             ui.space()
                             ui.button('Synchroniser l\'historique', on_click=sync_history_fraction, icon='sync')\
                                 .classes('bg-amber-600 text-white')\
-                                .tooltip('Recalcule toutes les répartitions de ce lot selon les parts actuelles')
+                                .tooltip('Recalcule les répartitions de ce lot touchées par les modifications de parts')
 
                 columns_frac = [
                     {'name': 'owner', 'label': 'Propriétaire', 'field': 'owner_name', 'align': 'left'},
@@ -172,11 +196,13 @@ def lots_page():
                 table_frac = ui.table(columns=columns_frac, rows=[], pagination=5).classes('w-full')
                 
                 def delete_fraction(qp_id):
-                    with next(get_session()) as session:
+                    with next(get_write_session()) as session:
                         qp = session.get(QuotePart, qp_id)
                         if qp:
+                            mark_resync_window(session, qp.lot_id, fraction_change_window(fraction_snapshot(qp), None))
                             session.delete(qp)
                             session.commit()
+                            invalidate_lot_timeline(qp.lot_id)
                             refresh_fractions_table()
                             ui.notify('Supprimé')
 
@@ -1,65 +1,39 @@
 from nicegui import ui, app
 from app.ui.theme import frame
-from app.models.domain import Operation, Owner
-from app.database import get_session
+from app.models.domain import Owner, OperationType
+from app.database import get_read_session
 from sqlmodel import select
 from collections import defaultdict
 from decimal import Decimal
 from app.utils.formatters import format_currency, short_name
+from app.services.ledger import owner_balances
+from app.services.journal import JournalFilters, JournalPager
+from app.services.matrix import owner_amounts, grand_total as grand_total_of
 
 def matrix_page():
     """
     Displays a global matrix table (Pivot).
     """
     def content():
-        with next(get_session()) as session:
-            # Load Data
-            ops = session.exec(select(Operation).order_by(Operation.date.desc())).all()
+        with next(get_read_session()) as session:
+            # Load Data: balances from the ledger, rows are fetched page by page
             owners = session.exec(select(Owner).order_by(Owner.name)).all()
+            totals = defaultdict(Decimal, owner_balances(session))
+            grand_total = grand_total_of(session)
             
             # 1. Base Columns
             columns = [
                 {'name': 'date', 'label': 'Date', 'field': 'date', 'sortable': True, 'align': 'left', 'classes': 'min-w-[100px]'},
                 {'name': 'label', 'label': 'Libellé', 'field': 'label', 'align': 'left', 'classes': 'truncate max-w-[200px]'},
                 {'name': 'lot', 'label': 'Lot', 'field': 'lot', 'align': 'left', 'classes': 'text-slate-400'},
-                {'name': 'total', 'label': 'Total', 'field': 'total_fmt', 'sortable': True, 'align': 'right', 'classes': 'font-bold'},
+                {'name': 'total', 'label': 'Total', 'field': 'total_fmt', 'align': 'right', 'classes': 'font-bold'},
             ]
-            
-            rows = []
-            totals = defaultdict(Decimal)
-            grand_total = Decimal(0)
-            
-            # 2. Calculate Rows & Totals
-            for op in ops:
-                sign = -1 if op.type == "SORTIE" else 1
-                amount = op.amount * sign
-                grand_total += amount
-                
-                row = {
-                    'date': op.date.isoformat(),
-                    'label': op.label,
-                    'lot': op.lot.name if op.lot else "-",
-                    'total_fmt': format_currency(amount, show_sign=True),
-                }
-                
-                for o in owners:
-                    # Find alloc for this owner
-                    alloc = next((a for a in op.allocations if a.owner_id == o.id), None)
-                    val = Decimal(0)
-                    if alloc:
-                        val = alloc.amount * sign
-                    
-                    totals[o.id] += val
-                    # row[f'owner_{o.id}_fmt'] = f"{val:+,.2f}" if val != 0 else ""
-                    row[f'owner_{o.id}_fmt'] = format_currency(val, show_sign=True, include_symbol=False) if val != 0 else ""
-                
-                rows.append(row)
 
-            # 3. Filter Active Owners (Total != 0)
+            # 2. Filter Active Owners (Total != 0)
             # Use abs(total) > 0 to capture positive/negative balances, ignore strict 0.
             active_owners = [o for o in owners if totals[o.id] != 0]
 
-            # 4. Add Columns for Active Owners
+            # 3. Add Columns for Active Owners
             for o in active_owners:
                 columns.append({
                     'name': f'owner_{o.id}',
@@ -70,7 +44,7 @@ def matrix_page():
                     'classes': 'bg-slate-100 dark:bg-slate-800/20 font-mono text-xs'
                 })
                 
-            # 5. Density-Optimized Summary Bar
+            # 4. Density-Optimized Summary Bar
             with ui.row().classes('w-full items-center gap-4 mb-3 p-3 glass-panel rounded-xl border-emerald-500/20 shadow-sm'):
                 # Global Balance (Prominent but thin)
                 with ui.column().classes('gap-0 border-r border-slate-200 dark:border-slate-800 pr-4'):
@@ -87,7 +61,54 @@ def matrix_page():
                             ui.label(short_name(o.name)).classes('text-[10px] font-bold text-slate-600 dark:text-slate-300 uppercase')
                             ui.label(format_currency(val, show_sign=True)).classes(f'text-xs font-bold {color}')
 
-            # Main Table
-            ui.table(columns=columns, rows=rows, pagination=50).classes('w-full glass-panel').props('dense flat separator=cell')
+            search_input = ui.input('Rechercher (libellé, catégorie, lot)').props('clearable dense').classes('w-72 mb-2')\
+                .on('keydown.enter', lambda: apply_search())
+
+            # Main Table (server-side pagination: only the visible page is pivoted and formatted)
+            pagination = {'page': 1, 'rowsPerPage': 50, 'sortBy': 'date', 'descending': True, 'rowsNumber': 0}
+            table = ui.table(columns=columns, rows=[], row_key='id', pagination=pagination)\
+                .classes('w-full glass-panel').props('dense flat separator=cell')
+            pager_ref = {'value': JournalPager(JournalFilters(), 50)}
+
+        def load_page(new_pagination):
+            pager = pager_ref['value']
+            descending = new_pagination.get('descending', True)
+            rows_per_page = new_pagination.get('rowsPerPage') or 50
+            if descending != pager.descending or rows_per_page != pager.page_size:
+                pager = pager_ref['value'] = JournalPager(pager.filters, rows_per_page, descending)
+
+            with next(get_read_session()) as session:
+                total = pager.total(session)
+                ops = pager.page(session, new_pagination.get('page', 1))
+                pivot = owner_amounts(session, [op.id for op in ops])
+
+            rows = []
+            for op in ops:
+                sign = -1 if op.type == OperationType.SORTIE else 1
+                row = {
+                    'id': op.id,
+                    'date': op.date.isoformat(),
+                    'label': op.label,
+                    'lot': op.lot_name or "-",
+                    'total_fmt': format_currency(op.amount * sign, show_sign=True),
+                }
+                amounts = pivot.get(op.id, {})
+                for o in active_owners:
+                    val = amounts.get(o.id)
+                    row[f'owner_{o.id}_fmt'] = format_currency(val, show_sign=True, include_symbol=False) if val else ""
+                rows.append(row)
+            table.rows = rows
+            table.pagination = {**new_pagination, 'rowsPerPage': rows_per_page, 'rowsNumber': total}
+            table.update()
+
+        table.on('request', lambda e: load_page(e.args['pagination']))
+
+        def apply_search():
+            pager = pager_ref['value']
+            pager_ref['value'] = JournalPager(JournalFilters(search=search_input.value or None), pager.page_size, pager.descending)
+            load_page({**table.pagination, 'page': 1})
+
+        search_input.on('clear', lambda: apply_search())
+        load_page(pagination)
 
     frame("Matrice de Répartition", content)
@@ -1,17 +1,28 @@
 from nicegui import ui, app
 from app.ui.theme import frame
 from app.models.domain import Operation, Lot, BankAccount, Owner, OperationType, Allocation, UserRole
-from app.database import get_session
+from app.database import get_write_session, get_read_session
 from app.services.accounting import distribute_operation
+from app.services.ledger import refresh_ledger_for
+from app.services.journal import JournalFilters, JournalPager
 from app.audit import log_action
 from sqlmodel import select
 from datetime import date
 from decimal import Decimal
 from app.utils.formatters import format_currency
+from app.utils.money import CENT
+from app.services.importer import ImportSettings, import_statement, learn_rules, read_statement
+from app.services.duplicates import find_duplicates
+from app.utils.fingerprint import operation_fingerprint
+from app.services.jobs import runner
+from app.ui.jobs import busy
+import os
+import tempfile
 
 def operations_page():
     # State
     op_id_ref = {'value': None}
+    confirmed_duplicate = {'value': None}  # Fingerprint the user chose to save anyway
     
     # --- DIALOG ---
     with ui.dialog() as dialog, ui.card().classes('w-full max-w-2xl'):
@@ -23,7 +34,7 @@ def operations_page():
         owners_map = {}
         categories_map = {}
         
-        with next(get_session()) as session:
+        with next(get_read_session()) as session:
             lots = session.exec(select(Lot)).all()
             lots_map = {l.id: l.name for l in lots}
             
@@ -63,7 +74,7 @@ def operations_page():
         def save():
             try:
                 d = date.fromisoformat(date_input.value)
-                amt = Decimal(str(amount_input.value))
+                amt = Decimal(str(amount_input.value)).quantize(CENT)
                 
                 is_reversement = cat_select.value in reversement_ids
                 
@@ -82,11 +93,24 @@ def operations_page():
                 if not cat_select.value:
                     ui.notify("Veuillez sélectionner une Catégorie", type='warning')
                     return
+
+                # Same account, date, amount and label already recorded: ask for a second click
+                fingerprint = operation_fingerprint(acc_select.value, d, type_select.value, amt, label_input.value)
+                with next(get_read_session()) as session:
+                    twins = [i for i in find_duplicates(session, [fingerprint]).get(fingerprint, []) if i != op_id_ref['value']]
+                if twins and confirmed_duplicate['value'] != fingerprint:
+                    confirmed_duplicate['value'] = fingerprint
+                    ui.notify(f"Opération identique déjà saisie (n° {', '.join(map(str, twins))}). "
+                              "Cliquez à nouveau sur Enregistrer pour confirmer.", type='warning', close_button=True)
+                    return
+                confirmed_duplicate['value'] = None
  
-                with next(get_session()) as session:
+                with next(get_write_session()) as session:
+                    previous = None
                     if op_id_ref['value']:
                         # UPDATE
                         op = session.get(Operation, op_id_ref['value'])
+                        previous = (op.lot_id, op.date)
                         op.date = d
                         op.amount = amt
                         op.lot_id = lot_select.value
@@ -128,6 +152,8 @@ def operations_page():
                         a.operation_id = op.id 
                         session.add(a)
                     
+                    # Update the balance ledger for both the old and the new month/lot
+                    refresh_ledger_for(session, [previous or (None, None), (op.lot_id, op.date)])
                     session.commit()
                     
                     user_name = app.storage.user.get('name', 'Unknown')
@@ -143,12 +169,13 @@ def operations_page():
         def delete_op():
             if not op_id_ref['value']: return
             try:
-                with next(get_session()) as session:
+                with next(get_write_session()) as session:
                     op = session.get(Operation, op_id_ref['value'])
                     # Cascade delete allocations explicitly
                     for a in op.allocations:
                         session.delete(a)
                     session.delete(op)
+                    refresh_ledger_for(session, [(op.lot_id, op.date)])
                     session.commit()
                 ui.notify('Opération supprimée')
                 dialog.close()
@@ -178,7 +205,7 @@ def operations_page():
         def execute_transfer():
             try:
                 d = date.fromisoformat(t_date.value)
-                amt = Decimal(str(t_amount.value))
+                amt = Decimal(str(t_amount.value)).quantize(CENT)
                 
                 if t_from.value == t_to.value:
                     ui.notify('Comptes source et destination identiques', type='warning')
@@ -186,7 +213,7 @@ def operations_page():
                 
                 from app.services.accounting import create_transfer # Import logic
                 
-                with next(get_session()) as session:
+                with next(get_write_session()) as session:
                     create_transfer(session, d, amt, t_from.value, t_to.value, None, t_label.value)
                     session.commit()
                     
@@ -202,6 +229,56 @@ def operations_page():
 
         ui.button('Exécuter le virement', on_click=execute_transfer).classes('mt-4 w-full bg-cyan-600 text-white')
 
+    # --- IMPORT DIALOG ---
+    with ui.dialog() as import_dialog, ui.card().classes('w-full max-w-2xl'):
+        ui.label('Importer un relevé bancaire (CSV / OFX)').classes('text-xl font-bold mb-4')
+
+        with ui.grid(columns=2).classes('w-full gap-4'):
+            i_acc = ui.select(accounts_map, label='Compte Bancaire').classes('w-full')
+            i_lot = ui.select(lots_map, label='Lot par défaut', clearable=True).classes('w-full')
+            i_income = ui.select(categories_map, label='Catégorie des crédits', clearable=True).classes('w-full')
+            i_expense = ui.select(categories_map, label='Catégorie des débits', clearable=True).classes('w-full')
+        ui.label('Les libellés déjà connus reprennent la catégorie et le lot de leur dernière opération.').classes('text-sm text-slate-400')
+
+        async def handle_statement(e):
+            if not i_acc.value:
+                ui.notify('Choisissez le compte bancaire du relevé', type='warning')
+                return
+            settings = ImportSettings(bank_account_id=i_acc.value, lot_id=i_lot.value,
+                                      income_category_id=i_income.value, expense_category_id=i_expense.value)
+            filename = e.file.name
+            fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+            os.close(fd)
+
+            def run_import():
+                # Past labels are read outside of the write transaction
+                with next(get_read_session()) as session:
+                    settings.learned = learn_rules(session, settings.bank_account_id)
+                with next(get_write_session()) as session:
+                    return import_statement(session, read_statement(path, filename), settings)
+
+            try:
+                await e.file.save(path)
+                async with busy(f'Import de {filename}...'):
+                    report = await runner.io_bound(f'Import {filename}', run_import)
+            except Exception as ex:
+                ui.notify(f"Erreur: {ex}", type='negative')
+                return
+            finally:
+                os.remove(path)
+
+            user = app.storage.user.get('name', 'Unknown')
+            log_action(user, "IMPORT", f"{filename}: {report.lines} opérations, compte {i_acc.value}")
+            ui.notify(f'{report.lines} opérations importées ({report.rows_per_second:.0f} lignes/s)', type='positive')
+            if report.skipped:
+                ui.notify(f'{report.skipped} ligne(s) à montant nul ignorée(s)', type='warning')
+            if report.duplicates:
+                ui.notify(f'{report.duplicates} ligne(s) déjà enregistrée(s) ignorée(s)', type='warning')
+            import_dialog.close()
+            refresh_ops_ui()
+
+        i_upload = ui.upload(label='Relevé', auto_upload=True, on_upload=handle_statement).props('accept=".csv,.txt,.ofx,.qfx"').classes('w-full mt-4')
+
     # --- CONTENT ---
     def content():
         # Check Permissions
@@ -236,10 +313,14 @@ def operations_page():
             t_from.value = None
             t_to.value = None
             transfer_dialog.open()
+
+        def open_import():
+            i_upload.reset()
+            import_dialog.open()
             
         def open_edit(op_id):
             op_id_ref['value'] = op_id
-            with next(get_session()) as session:
+            with next(get_read_session()) as session:
                 op = session.get(Operation, op_id)
                 if op:
                     date_input.value = op.date.isoformat()
@@ -264,7 +345,20 @@ def operations_page():
             with ui.row().classes('gap-2 mb-4'):
                 ui.button('Opération Simple', on_click=open_create, icon='add').classes('bg-emerald-500 text-white')
                 ui.button('Virement', on_click=open_transfer, icon='swap_horiz').classes('bg-cyan-600 text-white')
+                ui.button('Importer un relevé', on_click=open_import, icon='upload_file').classes('bg-indigo-600 text-white')
         
+        # Filters (applied in SQL)
+        with ui.row().classes('w-full items-end gap-2 mb-2'):
+            f_search = ui.input('Rechercher (libellé, catégorie, lot)').props('clearable').classes('w-64')\
+                .on('keydown.enter', lambda: apply_filters())
+            f_lot = ui.select(lots_map, label='Lot', clearable=True).classes('w-40')
+            f_acc = ui.select(accounts_map, label='Compte', clearable=True).classes('w-40')
+            f_cat = ui.select(categories_map, label='Catégorie', clearable=True).classes('w-40')
+            f_type = ui.select([t.value for t in OperationType], label='Type', clearable=True).classes('w-32')
+            f_start = ui.input('Du (YYYY-MM-DD)').classes('w-32')
+            f_end = ui.input('Au (YYYY-MM-DD)').classes('w-32')
+            ui.button(icon='filter_alt', on_click=lambda: apply_filters()).props('flat color=primary')
+
         columns = [
             {'name': 'date', 'label': 'Date', 'field': 'date', 'align': 'left', 'sortable': True},
             {'name': 'label', 'label': 'Libellé', 'field': 'label', 'align': 'left'},
@@ -279,7 +373,11 @@ def operations_page():
         if not can_edit:
              columns = [c for c in columns if c['name'] != 'actions']
         
-        table = ui.table(columns=columns, rows=[], pagination=10).classes('w-full glass-panel')
+        # Server-side pagination: only the visible page is fetched and sent to the browser
+        pagination = {'page': 1, 'rowsPerPage': 25, 'sortBy': 'date', 'descending': True, 'rowsNumber': 0}
+        table = ui.table(columns=columns, rows=[], row_key='id', pagination=pagination)\
+            .classes('w-full glass-panel').props(':rows-per-page-options="[10, 25, 50, 100]"')
+        pager_ref = {'value': JournalPager(JournalFilters())}
         
         if can_edit:
             table.add_slot('body-cell-actions', '''
@@ -289,29 +387,61 @@ def operations_page():
             ''')
             table.on('edit', lambda e: open_edit(e.args))
 
+        def current_filters():
+            return JournalFilters(
+                lot_id=f_lot.value,
+                bank_account_id=f_acc.value,
+                category_id=f_cat.value,
+                type=OperationType(f_type.value) if f_type.value else None,
+                start=date.fromisoformat(f_start.value) if f_start.value else None,
+                end=date.fromisoformat(f_end.value) if f_end.value else None,
+                search=f_search.value or None,
+            )
+
+        def load_page(new_pagination):
+            pager = pager_ref['value']
+            descending = new_pagination.get('descending', True)
+            rows_per_page = new_pagination.get('rowsPerPage') or 25
+            if descending != pager.descending or rows_per_page != pager.page_size:
+                pager = pager_ref['value'] = JournalPager(pager.filters, rows_per_page, descending)
+
+            with next(get_read_session()) as session:
+                total = pager.total(session)
+                ops = pager.page(session, new_pagination.get('page', 1))
+            rows = []
+            for o in ops:
+                # Amount color
+                sign = -1 if o.type == OperationType.SORTIE else 1
+                rows.append({
+                    'id': o.id,
+                    'date': o.date.isoformat(),
+                    'label': o.label,
+                    'amount_fmt': format_currency(o.amount * sign, show_sign=True),
+                    'lot_name': o.lot_name or "-",
+                    'bank_account_name': o.bank_account_name or "?",
+                    'type': o.type,
+                })
+            table.rows = rows
+            table.pagination = {**new_pagination, 'rowsPerPage': rows_per_page, 'rowsNumber': total}
+            table.update()
+
+        table.on('request', lambda e: load_page(e.args['pagination']))
+
+        def apply_filters():
+            try:
+                filters = current_filters()
+            except ValueError:
+                ui.notify('Date invalide (format YYYY-MM-DD)', type='warning')
+                return
+            pager = pager_ref['value']
+            pager_ref['value'] = JournalPager(filters, pager.page_size, pager.descending)
+            load_page({**table.pagination, 'page': 1})
+
         def refresh_table():
-             with next(get_session()) as session:
-                 # Join would be better but keeping it simple
-                 ops = session.exec(select(Operation).order_by(Operation.date.desc())).all()
-                 rows = []
-                 for o in ops: # Lazy load refs
-                     l_name = o.lot.name if o.lot else "-"
-                     acc_name = o.bank_account.name if o.bank_account else "?"
-                     # Amount color
-                     sign = -1 if o.type == OperationType.SORTIE else 1
-                     amt_fmt = format_currency(o.amount * sign, show_sign=True)
-                          
-                     rows.append({
-                         'id': o.id,
-                         'date': o.date.isoformat(),
-                         'label': o.label,
-                         'amount_fmt': amt_fmt,
-                         'lot_name': l_name,
-                         'bank_account_name': acc_name,
-                         'type': o.type,
-                     })
-                 table.rows = rows
-                 table.update()
+            # Cursors may be stale after a write: restart from the first page
+            pager = pager_ref['value']
+            pager_ref['value'] = JournalPager(pager.filters, pager.page_size, pager.descending)
+            load_page({**table.pagination, 'page': 1})
                  
         refresh_table()
         global refresh_ops_ref
@@ -1,7 +1,7 @@
 from nicegui import ui, app
 from app.ui.theme import frame
 from app.models.domain import Owner, UserRole
-from app.database import get_session
+from app.database import get_session, get_write_session
 from app.services.auth import get_password_hash
 from sqlmodel import select
 
@@ -24,7 +24,7 @@ def owners_page():
         
         def save():
             if not can_edit: return
-            with next(get_session()) as session:
+            with next(get_write_session()) as session:
                 if owner_id_ref['value']:
                     # Update
                     owner = session.get(Owner, owner_id_ref['value'])
@@ -52,7 +52,7 @@ def owners_page():
         def delete_owner():
             if not owner_id_ref['value']: return
             try:
-                with next(get_session()) as session:
+                with next(get_write_session()) as session:
                     o = session.get(Owner, owner_id_ref['value'])
                     session.delete(o)
                     session.commit()
@@ -1,7 +1,13 @@
 from nicegui import ui, app
 from app.ui.theme import frame
-from app.database import get_session
-from app.models.domain import Operation, Allocation, Owner
+from app.database import get_read_session
+from app.models.domain import Owner
+from app.services.export import iter_operations_csv, iter_allocations_csv
+from app.services.columnar import export_allocations_npz_bytes
+from app.services.jobs import runner
+from app.ui.jobs import busy
+from fastapi import Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import select
 from datetime import date
 import os
@@ -14,59 +20,80 @@ def reports_page():
     report_links_container = {'ref': None}
     
     def download_ops():
-        try:
-            from app.services.export import generate_operations_csv
-            with next(get_session()) as session:
-                ops = session.exec(select(Operation)).all()
-                content = generate_operations_csv(ops)
-                ui.download(content.encode('utf-8'), 'operations.csv')
-        except Exception as e:
-            ui.notify(f"Erreur export: {e}", type="negative")
+        # Streamed by the /export route below
+        ui.download('/export/operations.csv', 'operations.csv')
 
     def download_allocs():
-        try:
-            from app.services.export import generate_allocations_csv
-            with next(get_session()) as session:
-                allocs = session.exec(select(Allocation)).all()
-                content = generate_allocations_csv(allocs)
-                ui.download(content.encode('utf-8'), 'allocations.csv')
-        except Exception as e:
-            ui.notify(f"Erreur export: {e}", type="negative")
+        ui.download('/export/allocations.csv', 'allocations.csv')
 
-    def generate_annual_pdf(owner_id: int, year: int):
-        """Generate the PDF and save it to the reports directory."""
+    def download_allocs_npz():
+        ui.download('/export/allocations.npz', 'allocations.npz')
+
+    async def generate_annual_pdf(owner_id: int, year: int):
+        """Generate the PDF and save it to the reports directory (in a background job)."""
         if not owner_id:
             ui.notify("Veuillez sélectionner un propriétaire", type="warning")
             return
-        
-        try:
-            from app.services.pdf_reports import generate_owner_annual_report
-            with next(get_session()) as session:
+
+        def build():
+            from app.services.pdf_reports import save_owner_annual_report
+            with next(get_read_session()) as session:
                 owner = session.get(Owner, owner_id)
                 if not owner:
-                    ui.notify("Propriétaire introuvable", type="negative")
-                    return
-                
-                pdf_content = generate_owner_annual_report(session, owner_id, year)
-                if pdf_content:
-                    # Create safe filename
-                    safe_name = owner.name.replace(" ", "_").replace("/", "-")
-                    filename = f"Rapport_{safe_name}_{year}.pdf"
-                    filepath = os.path.join(REPORTS_DIR, filename)
-                    
-                    # Write PDF to file
-                    with open(filepath, 'wb') as f:
-                        f.write(pdf_content)
-                    
+                    return None, None
+                # Served as is when the owner's data for the year did not change
+                saved = save_owner_annual_report(session, owner_id, year, REPORTS_DIR)
+                return owner.name, saved
+
+        try:
+            async with busy("Génération du rapport PDF..."):
+                owner_name, saved = await runner.io_bound(f"PDF {owner_id}/{year}", build)
+            if owner_name is None:
+                ui.notify("Propriétaire introuvable", type="negative")
+            elif saved:
+                filename, rendered = saved
+                if rendered:
                     ui.notify(f"Rapport généré : {filename}", type="positive")
-                    
-                    # Refresh the links container
-                    refresh_report_links()
                 else:
-                    ui.notify("Aucune donnée pour ce rapport", type="warning")
+                    ui.notify(f"Rapport déjà à jour : {filename}", type="info")
+                # Refresh the links container
+                refresh_report_links()
+            else:
+                ui.notify("Aucune donnée pour ce rapport", type="warning")
         except Exception as e:
             ui.notify(f"Erreur PDF: {e}", type="negative")
 
+    batch_state = {'job': None}
+
+    async def generate_all_pdfs(year: int):
+        """Generate every owner's report for the year in worker processes, off the event loop."""
+        if batch_state['job'] and batch_state['job'] in runner.active():
+            ui.notify("Une génération est déjà en cours", type="warning")
+            return
+
+        def build(progress):
+            from app.services.pdf_reports import generate_annual_reports_batch
+            with next(get_read_session()) as session:
+                return generate_annual_reports_batch(session, year, REPORTS_DIR, progress=progress)
+
+        job = batch_state['job'] = runner.submit(f"PDF batch {year}", build, report_progress=True)
+        batch_progress.value = 0
+        batch_progress.visible = True
+        timer = ui.timer(0.5, lambda: batch_progress.set_value(job.fraction))
+        try:
+            async with busy(f"Génération des rapports {year}..."):
+                written = await job.wait()
+            if written:
+                ui.notify(f"{len(written)} rapport(s) générés pour {year}", type="positive")
+            else:
+                ui.notify("Aucune donnée pour cette année", type="warning")
+            refresh_report_links()
+        except Exception as e:
+            ui.notify(f"Erreur PDF: {e}", type="negative")
+        finally:
+            timer.cancel()
+            batch_progress.visible = False
+
     def delete_report(filename: str):
         """Delete a report file."""
         try:
@@ -102,7 +129,7 @@ def reports_page():
         # Load owners for the dropdown
         owners_map = {}
         try:
-            with next(get_session()) as session:
+            with next(get_read_session()) as session:
                 owners = session.exec(select(Owner)).all()
                 owners_map = {o.id: o.name for o in owners}
         except Exception as e:
@@ -120,6 +147,9 @@ def reports_page():
                         .props('outline').classes('w-full justify-start')
                     ui.button('Détail des Répartitions', icon='download', on_click=download_allocs)\
                         .props('outline').classes('w-full justify-start')
+                    ui.button('Répartitions (format compact .npz)', icon='download', on_click=download_allocs_npz)\
+                        .props('outline').classes('w-full justify-start')\
+                        .tooltip('Export colonnaire pour analyses (NumPy), montants en centimes')
 
             # PDF Section
             with ui.card().classes('glass-panel p-6'):
@@ -136,6 +166,11 @@ def reports_page():
                 ui.button('Générer le Rapport PDF', icon='auto_awesome', 
                           on_click=lambda: generate_annual_pdf(owner_select.value, year_select.value))\
                     .classes('w-full bg-red-600 text-white shadow-md hover:scale-105 transition-transform')
+                ui.button('Générer pour tous les propriétaires', icon='library_books',
+                          on_click=lambda: generate_all_pdfs(year_select.value))\
+                    .props('outline').classes('w-full mt-2')
+                batch_progress = ui.linear_progress(value=0, show_value=False).classes('mt-2')
+                batch_progress.visible = False
 
         # Section for generated reports
         ui.label('Rapports Générés').classes('text-lg font-bold mt-6 mb-2')
@@ -147,3 +182,38 @@ def reports_page():
 
 # Serve the reports directory as static files
 app.add_static_files('/reports', REPORTS_DIR)
+
+def _streamed_csv(exporter, filename: str):
+    """
+    Streams a CSV export; the session stays open while the response is being sent.
+    """
+    if not app.storage.user.get('authenticated', False):
+        return Response(status_code=401)
+
+    def chunks():
+        with next(get_read_session()) as session:
+            yield from exporter(session)
+
+    return StreamingResponse(chunks(), media_type='text/csv; charset=utf-8',
+                             headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.get('/export/operations.csv')
+def export_operations_csv():
+    return _streamed_csv(iter_operations_csv, 'operations.csv')
+
+@app.get('/export/allocations.csv')
+def export_allocations_csv():
+    return _streamed_csv(iter_allocations_csv, 'allocations.csv')
+
+@app.get('/export/allocations.npz')
+async def export_allocations_npz():
+    if not app.storage.user.get('authenticated', False):
+        return Response(status_code=401)
+
+    def build():
+        with next(get_read_session()) as session:
+            return export_allocations_npz_bytes(session)
+
+    content = await runner.io_bound("Export allocations.npz", build)
+    return Response(content, media_type='application/octet-stream',
+                    headers={'Content-Disposition': 'attachment; filename="allocations.npz"'})
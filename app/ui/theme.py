@@ -1,6 +1,6 @@
 from nicegui import ui, app
 from typing import Callable
-from app.database import get_session
+from app.database import get_write_session, get_read_session
 from app.models.domain import Owner
 
 def menu_link(text: str, target: str, icon: str):
@@ -20,7 +20,7 @@ def frame(page_title: str, content_func: Callable):
     initial_value = True # Default Dark
     
     if user_id:
-        with next(get_session()) as session:
+        with next(get_read_session()) as session:
             me = session.get(Owner, user_id)
             if me and me.theme == "LIGHT":
                 initial_value = False
@@ -132,7 +132,7 @@ def frame(page_title: str, content_func: Callable):
         
         # Persist to DB
         if user_id:
-            with next(get_session()) as session:
+            with next(get_write_session()) as session:
                 me = session.get(Owner, user_id)
                 if me:
                     me.theme = "DARK" if new_val else "LIGHT"
@@ -0,0 +1,21 @@
+import hashlib
+import unicodedata
+from datetime import date
+from decimal import Decimal
+from app.utils.money import to_cents
+
+def normalize_label(label: str) -> str:
+    """
+    Label compared without case, accents or repeated spaces: "Prlv  Électricité" -> "prlv electricite".
+    """
+    ascii_label = unicodedata.normalize("NFKD", label or "").encode("ascii", "ignore").decode()
+    return " ".join(ascii_label.lower().split())
+
+def operation_fingerprint(bank_account_id: int, d: date, op_type, amount: Decimal, label: str) -> str:
+    """
+    Duplicate-detection key of an operation: same account, date, signed amount in
+    cents and normalized label give the same fingerprint.
+    """
+    sign = 1 if getattr(op_type, "value", op_type) == "ENTREE" else -1
+    key = f"{bank_account_id}|{d.isoformat()}|{sign * to_cents(amount)}|{normalize_label(label)}"
+    return hashlib.blake2b(key.encode(), digest_size=10).hexdigest()
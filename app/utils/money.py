@@ -0,0 +1,80 @@
+from decimal import Decimal
+from typing import List, Tuple
+import numpy as np
+from sqlalchemy import Integer, cast, func
+
+# Amounts are Decimal with two places at the ORM boundary. Bulk computations
+# (distribution, aggregation, balance ledger) work on integer cents instead and
+# convert back exactly.
+CENT = Decimal("0.01")
+
+def to_cents(amount) -> int:
+    """
+    Exact conversion of an amount to integer cents.
+    Raises ValueError if the amount has a fraction of a cent.
+    """
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    numerator, denominator = value.as_integer_ratio()
+    cents, remainder = divmod(numerator * 100, denominator)
+    if remainder:
+        raise ValueError(f"Amount {amount} is not a whole number of cents")
+    return cents
+
+def from_cents(cents: int) -> Decimal:
+    """
+    Integer cents back to a Decimal with two places.
+    """
+    return Decimal(cents).scaleb(-2)
+
+def div_half_even(numerator: int, denominator: int) -> int:
+    """
+    numerator / denominator rounded half to even (the Decimal default), in integers.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+def split_cents(cents: int, shares: Tuple[Tuple[int, int, int], ...]) -> List[Tuple[int, int]]:
+    """
+    Splits an amount in cents along a share vector of (owner_id, numerator, denominator).
+    The last owner takes the remainder so that the shares always sum to the amount.
+    """
+    result = []
+    allocated = 0
+    last = len(shares) - 1
+    for i, (owner_id, numerator, denominator) in enumerate(shares):
+        if i == last:
+            share = cents - allocated
+        else:
+            share = div_half_even(cents * numerator, denominator)
+            allocated += share
+        result.append((owner_id, share))
+    return result
+
+def split_cents_array(cents: np.ndarray, shares: Tuple[Tuple[int, int, int], ...]) -> np.ndarray:
+    """
+    split_cents for many amounts sharing the same share vector: returns an
+    (amounts x owners) int64 array, with the same rounding and remainder rule.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    numerators = np.array([numerator for _, numerator, _ in shares], dtype=np.int64)
+    denominators = np.array([denominator for _, _, denominator in shares], dtype=np.int64)
+    if cents.size and int(np.abs(cents).max()) * int(numerators.max()) >= 2 ** 62:
+        # Would overflow int64: fall back to Python integers
+        return np.array([[share for _, share in split_cents(int(c), shares)] for c in cents], dtype=np.int64)
+
+    quotient, remainder = np.divmod(cents[:, None] * numerators, denominators)
+    twice = 2 * remainder
+    quotient += (twice > denominators) | ((twice == denominators) & (quotient % 2 == 1))
+    quotient[:, -1] = cents - quotient[:, :-1].sum(axis=1)
+    return quotient
+
+def sql_cents(column):
+    """
+    SQL expression of a money column in integer cents. SQLite stores Numeric
+    columns as floating point, so sums of cents are exact where sums of the
+    column are not.
+    """
+    return cast(func.round(column * 100), Integer)
@@ -0,0 +1,49 @@
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+from app.models.domain import AuditEvent
+from app.services.audit_store import AuditFilters, AuditPager, audit_choices
+
+USERS = [f"user{i}" for i in range(12)]
+ACTIONS = ["LOGIN", "CREATE_OPERATION", "UPDATE_OPERATION", "TRANSFER", "IMPORT", "CATEGORY_UPDATE"]
+
+def bench(count: int = 1_000_000):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(1)
+    start_time = datetime(2016, 1, 1)
+    with Session(engine) as session:
+        # About ten years of history
+        for first in range(0, count, 100_000):
+            session.execute(insert(AuditEvent.__table__), [
+                {"timestamp": start_time + timedelta(minutes=5 * i), "user": rng.choice(USERS),
+                 "action": rng.choice(ACTIONS), "details": f"Montant: {rng.randint(1, 10**5)}"}
+                for i in range(first, min(first + 100_000, count))
+            ])
+        session.commit()
+
+        audit_choices(session)
+        start = time.perf_counter()
+        users, actions = audit_choices(session)
+        print(f"filter choices: {len(users)} users, {len(actions)} actions, "
+              f"{(time.perf_counter() - start) * 1000:.2f} ms")
+
+        for name, filters in (("all", AuditFilters()), ("user", AuditFilters(user="user3")),
+                              ("action+dates", AuditFilters(action="TRANSFER", start=datetime(2020, 1, 1).date(),
+                                                            end=datetime(2020, 12, 31).date()))):
+            pager = AuditPager(filters, page_size=50)
+            start = time.perf_counter()
+            total = pager.total(session)
+            pager.page(session, 1)
+            first_page = time.perf_counter() - start
+            start = time.perf_counter()
+            for number in range(2, 12):
+                pager.page(session, number)
+            next_pages = (time.perf_counter() - start) / 10
+            print(f"{name}: {total} events, count + newest page {first_page * 1000:.1f} ms, "
+                  f"next pages {next_pages * 1000:.2f} ms each")
+
+if __name__ == "__main__":
+    bench()
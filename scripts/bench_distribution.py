@@ -0,0 +1,54 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import SQLModel, Session, create_engine
+from app.models.domain import BankAccount, Lot, Operation, OperationType, Owner, QuotePart
+from app.services.accounting import distribute_operation, distribute_operations
+
+def setup(session: Session, lots: int = 20, owners_per_lot: int = 3):
+    account = BankAccount(name="Bench")
+    session.add(account)
+    lot_ids = []
+    for i in range(lots):
+        lot = Lot(name=f"Lot {i}")
+        owners = [Owner(name=f"Owner {i}-{j}") for j in range(owners_per_lot)]
+        session.add(lot)
+        session.add_all(owners)
+        session.flush()
+        # Ownership changes every other year
+        for year in range(2015, 2026, 2):
+            end = date(year + 1, 12, 31) if year < 2025 else None
+            for j, owner in enumerate(owners):
+                session.add(QuotePart(lot_id=lot.id, owner_id=owner.id, numerator=j + year % 3 + 1,
+                                      denominator=sum(k + year % 3 + 1 for k in range(owners_per_lot)),
+                                      start_date=date(year, 1, 1), end_date=end))
+        lot_ids.append(lot.id)
+    session.commit()
+    return account.id, lot_ids
+
+def bench(count: int = 100_000):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(1)
+    with Session(engine) as session:
+        account_id, lot_ids = setup(session)
+        ops = [Operation(id=i + 1, date=date(2015, 1, 1) + timedelta(days=rng.randint(0, 4000)),
+                         amount=Decimal(rng.randint(1, 10**7)) / 100, lot_id=rng.choice(lot_ids),
+                         bank_account_id=account_id, type=OperationType.SORTIE, label="Bench")
+               for i in range(count)]
+
+        start = time.perf_counter()
+        single = [a for op in ops for a in distribute_operation(session, op)]
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = distribute_operations(session, ops)
+        batch_time = time.perf_counter() - start
+
+    assert len(rows) == len(single)
+    print(f"{count} operations, {len(rows)} allocations: "
+          f"distribute_operation loop {loop_time:.2f} s, distribute_operations {batch_time:.2f} s")
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,57 @@
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlmodel import SQLModel, Session, create_engine
+from app.models.domain import BankAccount, Lot, Owner, QuotePart
+from app.services.importer import ImportRule, ImportSettings, import_statement, read_statement
+from app.services.search import create_search_index
+
+LABELS = ["VIR LOYER {}", "PRLV SYNDIC RESIDENCE", "FRAIS TENUE COMPTE", "CB BRICO DEPOT {}", "PRLV ASSURANCE PNO"]
+
+def write_statement(path: str, count: int, rng: random.Random):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Date opération;Libellé;Montant\n")
+        for i in range(count):
+            d = date(2015, 1, 1) + timedelta(days=rng.randint(0, 4000))
+            label = rng.choice(LABELS).format(i % 97)
+            cents = rng.randint(1, 10**6) * (1 if label.startswith("VIR") else -1)
+            amount = f"{cents / 100:.2f}".replace(".", ",")
+            f.write(f"{d:%d/%m/%Y};{label};{amount}\n")
+
+def setup(session: Session, owners: int = 3):
+    account, lot, other = BankAccount(name="Bench"), Lot(name="Immeuble"), Lot(name="Garage")
+    people = [Owner(name=f"Owner {j}") for j in range(owners)]
+    session.add_all([account, lot, other, *people])
+    session.flush()
+    for target in (lot, other):
+        for owner in people:
+            session.add(QuotePart(lot_id=target.id, owner_id=owner.id, numerator=1, denominator=owners,
+                                  start_date=date(2010, 1, 1)))
+    session.commit()
+    return account.id, lot.id, other.id
+
+def bench(count: int = 50_000):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    create_search_index(engine)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_statement(path, count, random.Random(1))
+        with Session(engine) as session:
+            account_id, lot_id, garage_id = setup(session)
+            settings = ImportSettings(bank_account_id=account_id, lot_id=lot_id,
+                                      rules=[ImportRule("brico", lot_id=garage_id)])
+            start = time.perf_counter()
+            report = import_statement(session, read_statement(path), settings)
+            elapsed = time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+    print(f"{report.lines} lines, {report.allocations} allocations imported in {elapsed:.2f} s "
+          f"({report.rows_per_second:.0f} rows/s)")
+
+if __name__ == "__main__":
+    bench()
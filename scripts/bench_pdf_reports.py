@@ -0,0 +1,33 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from app.services.pdf_reports import render_annual_report
+
+def sample_details(lines: int):
+    start = date(2025, 1, 1)
+    return [{
+        "date": (start + timedelta(days=i * 7)).strftime("%d/%m/%Y"),
+        "label": f"Loyer appartement n°{i}",
+        "category": "Loyer" if i % 2 else "Charges",
+        "lot": "Lot A",
+        "amount": Decimal("123.45") + i,
+        "is_income": i % 2 == 1,
+    } for i in range(lines)]
+
+def bench(lines: int = 50, runs: int = 20):
+    details = sample_details(lines)
+    args = ("Jean Dupont", 2025, details, Decimal("5000.00"), Decimal("1200.00"))
+
+    start = time.perf_counter()
+    render_annual_report(*args)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        render_annual_report(*args)
+    per_report = (time.perf_counter() - start) / runs
+
+    print(f"{lines}-line report: first {first * 1000:.1f} ms, then {per_report * 1000:.1f} ms per report ({runs} runs)")
+
+if __name__ == "__main__":
+    bench()
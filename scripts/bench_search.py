@@ -0,0 +1,52 @@
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+from app.models.domain import BankAccount, Category, Lot, Operation, OperationType
+from app.services.journal import JournalFilters, JournalPager
+from app.services.search import create_search_index
+
+WORDS = ["loyer", "vir", "prlv", "syndic", "residence", "facture", "plombier", "chaudiere", "taxe", "fonciere",
+         "assurance", "electricite", "eau", "frais", "tenue", "compte", "travaux", "peinture", "garage", "cave"]
+
+def populate(engine, count: int, rng: random.Random):
+    with Session(engine) as session:
+        account = BankAccount(name="Bench")
+        lots = [Lot(name=f"Lot {i}") for i in range(20)]
+        categories = [Category(name=f"CAT {i}") for i in range(10)]
+        session.add_all([account, *lots, *categories])
+        session.commit()
+        rows = [{"date": date(2010, 1, 1) + timedelta(days=rng.randint(0, 5000)),
+                 "label": " ".join(rng.sample(WORDS, 3)) + f" {rng.randint(1, 99999)}",
+                 "amount": rng.randint(1, 10**6) / 100, "type": OperationType.SORTIE,
+                 "bank_account_id": account.id, "lot_id": rng.choice(lots).id,
+                 "category_id": rng.choice(categories).id}
+                for _ in range(count)]
+        start = time.perf_counter()
+        session.execute(insert(Operation.__table__), rows)
+        session.commit()
+        return time.perf_counter() - start
+
+def bench(count: int = 500_000, queries=("loyer", "plomb chaud", "taxe fonc 12", "lot 7 peinture")):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    create_search_index(engine)
+    insert_time = populate(engine, count, random.Random(1))
+    print(f"{count} operations inserted and indexed in {insert_time:.1f} s")
+
+    with Session(engine) as session:
+        for text in queries:
+            pager = JournalPager(JournalFilters(search=text), page_size=25)
+            start = time.perf_counter()
+            total = pager.total(session)
+            first = pager.page(session, 1)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            pager.page(session, 5)
+            later = time.perf_counter() - start
+            print(f"'{text}': {total} matches, count + page 1 {elapsed * 1000:.1f} ms, "
+                  f"page 5 {later * 1000:.1f} ms, best: {first[0].label if first else '-'}")
+
+if __name__ == "__main__":
+    bench()
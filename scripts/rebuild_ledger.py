@@ -0,0 +1,12 @@
+from app.database import get_write_session, create_db_and_tables
+from app.services.ledger import rebuild_ledger
+
+def rebuild():
+    print("Rebuilding the balance ledger from allocations...")
+    create_db_and_tables()
+    with next(get_write_session()) as session:
+        rebuild_ledger(session)
+    print("Ledger rebuilt.")
+
+if __name__ == "__main__":
+    rebuild()
@@ -1,10 +1,10 @@
-from app.database import get_session
+from app.database import get_write_session
 from app.models.domain import Owner, UserRole
 from sqlmodel import select
 
 def promote_admin():
     email = "mlgvalentin@gmail.com"
-    with next(get_session()) as session:
+    with next(get_write_session()) as session:
         owner = session.exec(select(Owner).where(Owner.email == email)).first()
         if owner:
             owner.role = UserRole.ADMIN
@@ -1,4 +1,4 @@
-from app.database import get_session
+from app.database import get_write_session
 from app.models.domain import Owner, UserRole
 from app.services.auth import get_password_hash
 from sqlmodel import select
@@ -7,7 +7,7 @@ def set_passwords():
     print("Setting temporary passwords...")
     pwd_hash = get_password_hash("vigie2026")
     
-    with next(get_session()) as session:
+    with next(get_write_session()) as session:
         owners = session.exec(select(Owner)).all()
         count = 0
         for o in owners:
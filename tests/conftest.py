@@ -34,3 +34,24 @@ def test_lot_fixture(session):
     session.commit()
     session.refresh(lot)
     return lot
+
+@pytest.fixture(name="count_queries")
+def count_queries_fixture(session):
+    """
+    Returns a context manager collecting the SQL statements sent by the session's engine.
+    """
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        statements = []
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        engine = session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+    return counter
@@ -0,0 +1,235 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Operation, Owner, QuotePart, OperationType
+from app.services.accounting import (
+    OwnershipTimeline, distribute_operation, get_lot_timeline, invalidate_lot_timeline
+)
+
+def make_owners(session: Session, *names):
+    owners = [Owner(name=n) for n in names]
+    for o in owners:
+        session.add(o)
+    session.commit()
+    return owners
+
+def test_timeline_intervals(session: Session, test_lot):
+    a, b, c = make_owners(session, "A", "B", "C")
+    parts = [
+        QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=2,
+                  start_date=date(2020, 1, 1), end_date=date(2021, 12, 31)),
+        QuotePart(lot_id=test_lot.id, owner_id=b.id, numerator=1, denominator=2,
+                  start_date=date(2020, 1, 1)),
+        QuotePart(lot_id=test_lot.id, owner_id=c.id, numerator=1, denominator=2,
+                  start_date=date(2022, 1, 1)),
+    ]
+    timeline = OwnershipTimeline(parts)
+
+    assert timeline.shares_at(date(2019, 12, 31)) == ()
+    assert timeline.shares_at(date(2020, 1, 1)) == ((a.id, 1, 2), (b.id, 1, 2))
+    assert timeline.shares_at(date(2021, 12, 31)) == ((a.id, 1, 2), (b.id, 1, 2))
+    assert timeline.shares_at(date(2022, 1, 1)) == ((b.id, 1, 2), (c.id, 1, 2))
+    assert timeline.shares_at(date(2050, 6, 1)) == ((b.id, 1, 2), (c.id, 1, 2))
+
+def test_timeline_gap_and_merge(session: Session, test_lot):
+    a, = make_owners(session, "A")
+    parts = [
+        QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1,
+                  start_date=date(2020, 1, 1), end_date=date(2020, 6, 30)),
+        QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1,
+                  start_date=date(2020, 7, 1), end_date=date(2020, 12, 31)),
+        QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1,
+                  start_date=date(2022, 1, 1), end_date=date(2022, 12, 31)),
+    ]
+    timeline = OwnershipTimeline(parts)
+
+    # Contiguous identical intervals are merged, gaps are kept empty
+    assert timeline.starts == [date(2020, 1, 1), date(2021, 1, 1), date(2022, 1, 1), date(2023, 1, 1)]
+    assert timeline.shares_at(date(2021, 5, 1)) == ()
+    assert timeline.shares_at(date(2023, 1, 1)) == ()
+
+def test_distribute_uses_cached_timeline(session: Session, test_lot, test_account):
+    a, b, c = make_owners(session, "A", "B", "C")
+    for o in (a, b, c):
+        session.add(QuotePart(lot_id=test_lot.id, owner_id=o.id, numerator=1, denominator=3,
+                              start_date=date(2020, 1, 1)))
+    session.commit()
+
+    op = Operation(date=date(2024, 3, 1), amount=Decimal("100.00"), lot_id=test_lot.id,
+                   bank_account_id=test_account.id, type=OperationType.ENTREE, label="Loyer")
+    allocs = distribute_operation(session, op)
+    assert [a.amount for a in allocs] == [Decimal("33.33"), Decimal("33.33"), Decimal("33.34")]
+    assert sum(a.amount for a in allocs) == op.amount
+
+    # The timeline is reused until invalidated
+    timeline = get_lot_timeline(session, test_lot.id)
+    assert get_lot_timeline(session, test_lot.id) is timeline
+    invalidate_lot_timeline(test_lot.id)
+    assert get_lot_timeline(session, test_lot.id) is not timeline
+
+def test_resync_lot_allocations_bulk(session: Session, test_lot, test_account):
+    from sqlmodel import select
+    from app.models.domain import Allocation
+    from app.services.accounting import resync_lot_allocations
+
+    a, b = make_owners(session, "A", "B")
+    session.add(QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1,
+                          start_date=date(2020, 1, 1)))
+    session.commit()
+
+    ops = [
+        Operation(date=date(2019, 6, 1), amount=Decimal("10.00"), lot_id=test_lot.id,
+                  bank_account_id=test_account.id, type=OperationType.SORTIE, label="Avant"),
+        Operation(date=date(2021, 6, 1), amount=Decimal("90.00"), lot_id=test_lot.id,
+                  bank_account_id=test_account.id, type=OperationType.ENTREE, label="Loyer"),
+    ]
+    for op in ops:
+        session.add(op)
+    session.flush()
+    for a_ in distribute_operation(session, ops[1]):
+        session.add(a_)
+    session.commit()
+
+    # Ownership is now split in half: the history must follow
+    qp = session.exec(select(QuotePart)).one()
+    qp.numerator, qp.denominator = 1, 2
+    session.add(QuotePart(lot_id=test_lot.id, owner_id=b.id, numerator=1, denominator=2,
+                          start_date=date(2020, 1, 1)))
+    session.commit()
+
+    report = resync_lot_allocations(session, test_lot.id)
+    assert (report.operations, report.allocations, report.skipped) == (2, 2, 1)
+
+    allocs = session.exec(select(Allocation).order_by(Allocation.owner_id)).all()
+    assert [(x.operation_id, x.owner_id, x.amount) for x in allocs] == [
+        (ops[1].id, a.id, Decimal("45.00")),
+        (ops[1].id, b.id, Decimal("45.00")),
+    ]
+
+def test_fraction_change_window():
+    from app.services.accounting import fraction_change_window
+
+    base = (1, 1, 2, date(2020, 1, 1), None)
+    # Insertion / deletion cover the whole period of the fraction
+    assert fraction_change_window(None, base) == (date(2020, 1, 1), None)
+    assert fraction_change_window(base, None) == (date(2020, 1, 1), None)
+    assert fraction_change_window(base, base) is None
+    # Closing a fraction only affects the days after the new end date
+    assert fraction_change_window(base, (1, 1, 2, date(2020, 1, 1), date(2026, 3, 31))) == (date(2026, 4, 1), None)
+    # Moving the start date only affects the days in between
+    assert fraction_change_window(base, (1, 1, 2, date(2020, 3, 1), None)) == (date(2020, 1, 1), date(2020, 2, 29))
+    # Changing the share affects the whole period
+    assert fraction_change_window(
+        (1, 1, 2, date(2026, 1, 1), date(2026, 12, 31)), (1, 1, 4, date(2026, 1, 1), date(2026, 12, 31))
+    ) == (date(2026, 1, 1), date(2026, 12, 31))
+
+def test_resync_lot_allocations_window(session: Session, test_lot, test_account):
+    from sqlmodel import select
+    from app.models.domain import Allocation
+    from app.services.accounting import resync_lot_allocations
+
+    a, = make_owners(session, "A")
+    session.add(QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1,
+                          start_date=date(1998, 1, 1)))
+    session.commit()
+
+    old = Operation(date=date(1998, 5, 1), amount=Decimal("10.00"), lot_id=test_lot.id,
+                    bank_account_id=test_account.id, type=OperationType.ENTREE, label="1998")
+    new = Operation(date=date(2026, 5, 1), amount=Decimal("20.00"), lot_id=test_lot.id,
+                    bank_account_id=test_account.id, type=OperationType.ENTREE, label="2026")
+    session.add(old)
+    session.add(new)
+    session.commit()
+
+    report = resync_lot_allocations(session, test_lot.id, date(2026, 1, 1), None)
+    assert (report.operations, report.allocations) == (1, 1)
+    allocs = session.exec(select(Allocation)).all()
+    assert [x.operation_id for x in allocs] == [new.id]
+
+def test_pending_window_survives_the_page(session: Session, test_lot, test_account):
+    from sqlmodel import select
+    from app.models.domain import Allocation, Lot
+    from app.services.accounting import (
+        fraction_change_window, fraction_snapshot, mark_resync_window, sync_lot_history
+    )
+
+    a, b = make_owners(session, "A", "B")
+    qp = QuotePart(lot_id=test_lot.id, owner_id=a.id, numerator=1, denominator=1, start_date=date(2020, 1, 1))
+    session.add(qp)
+    ops = [Operation(date=date(year, 6, 1), amount=Decimal("10.00"), lot_id=test_lot.id,
+                     bank_account_id=test_account.id, type=OperationType.ENTREE, label=str(year))
+           for year in (2020, 2024)]
+    for op in ops:
+        session.add(op)
+    session.commit()
+    sync_lot_history(session, test_lot.id)
+
+    # A first edit, never synced from its page: A sells half of the lot to B in 2020-2021...
+    before = fraction_snapshot(qp)
+    qp.end_date = date(2021, 12, 31)
+    mark_resync_window(session, test_lot.id, fraction_change_window(before, fraction_snapshot(qp)))
+    for owner in (a, b):
+        part = QuotePart(lot_id=test_lot.id, owner_id=owner.id, numerator=1, denominator=2, start_date=date(2022, 1, 1))
+        session.add(part)
+        mark_resync_window(session, test_lot.id, fraction_change_window(None, fraction_snapshot(part)))
+    session.commit()
+    # ...then an unrelated edit of 2020 from another page, which syncs
+    before = fraction_snapshot(qp)
+    qp.start_date = date(2019, 1, 1)
+    mark_resync_window(session, test_lot.id, fraction_change_window(before, fraction_snapshot(qp)))
+    session.commit()
+    assert (test_lot.resync_start, test_lot.resync_end) == (date(2019, 1, 1), None)
+
+    report = sync_lot_history(session, test_lot.id)
+    assert report.operations == 2
+    allocs = session.exec(select(Allocation.operation_id, Allocation.owner_id, Allocation.amount)
+                          .order_by(Allocation.operation_id, Allocation.owner_id)).all()
+    assert allocs == [(ops[0].id, a.id, Decimal("10.00")),
+                      (ops[1].id, a.id, Decimal("5.00")), (ops[1].id, b.id, Decimal("5.00"))]
+    assert not session.get(Lot, test_lot.id).resync_pending
+
+def test_distribute_operations_matches_single(session: Session, test_account):
+    import random
+    import pytest
+    from app.models.domain import Lot
+    from app.services.accounting import FractionError, distribute_operations
+
+    rng = random.Random(7)
+    owners = make_owners(session, "A", "B", "C", "D")
+    lots = [Lot(name=f"Lot {i}") for i in range(3)]
+    for lot in lots:
+        session.add(lot)
+    session.commit()
+    # Lot 0: thirds then halves, lot 1: a single owner, lot 2: uneven shares
+    fractions = [
+        (lots[0], owners[0], 1, 3, date(2020, 1, 1), date(2022, 6, 30)),
+        (lots[0], owners[1], 1, 3, date(2020, 1, 1), date(2022, 6, 30)),
+        (lots[0], owners[2], 1, 3, date(2020, 1, 1), date(2022, 6, 30)),
+        (lots[0], owners[0], 1, 2, date(2022, 7, 1), None),
+        (lots[0], owners[3], 1, 2, date(2022, 7, 1), None),
+        (lots[1], owners[1], 1, 1, date(2020, 1, 1), None),
+        (lots[2], owners[2], 7, 17, date(2020, 1, 1), None),
+        (lots[2], owners[3], 10, 17, date(2020, 1, 1), None),
+    ]
+    for lot, owner, num, den, start, end in fractions:
+        session.add(QuotePart(lot_id=lot.id, owner_id=owner.id, numerator=num, denominator=den,
+                              start_date=start, end_date=end))
+    session.commit()
+
+    ops = []
+    for i in range(500):
+        lot = rng.choice(lots + [None])
+        ops.append(Operation(id=i + 1, date=date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000)),
+                             amount=Decimal(rng.randint(-10**6, 10**8)) / 100, lot_id=lot.id if lot else None,
+                             bank_account_id=test_account.id, type=OperationType.ENTREE, label="Op"))
+
+    rows = distribute_operations(session, ops)
+    expected = [{"operation_id": a.operation_id, "owner_id": a.owner_id, "amount": a.amount}
+                for op in ops for a in distribute_operation(session, op)]
+    assert rows == expected
+
+    orphan = Operation(id=999, date=date(2019, 1, 1), amount=Decimal("10.00"), lot_id=lots[1].id,
+                       bank_account_id=test_account.id, type=OperationType.ENTREE, label="Avant")
+    with pytest.raises(FractionError):
+        distribute_operations(session, ops + [orphan])
+    assert distribute_operations(session, []) == []
@@ -0,0 +1,97 @@
+import logging
+import logging.handlers
+import queue
+import time
+from app.audit import AuditWriter, FileSink
+
+def make_record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("audit", logging.INFO, __file__, 0, message, None, None)
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class SlowSink:
+    """
+    Records each batch it receives, taking `delay` seconds per write (slow disk).
+    """
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, records):
+        time.sleep(self.delay)
+        self.batches.append([r.getMessage() for r in records])
+
+def test_writer_batches_by_size_and_interval():
+    sink = SlowSink()
+    records = queue.Queue()
+    writer = AuditWriter(records, [sink], batch_size=3, interval=1.0)
+    writer.start()
+    try:
+        start = time.monotonic()
+        for i in range(7):
+            records.put(make_record(f"m{i}"))
+        # Two full batches right away, the last record once the interval has elapsed
+        assert wait_for(lambda: len(sink.batches) == 2)
+        assert sink.batches == [["m0", "m1", "m2"], ["m3", "m4", "m5"]]
+        assert wait_for(lambda: len(sink.batches) == 3)
+        assert sink.batches[-1] == ["m6"]
+        assert time.monotonic() - start >= 0.9
+    finally:
+        writer.stop()
+
+def test_logging_does_not_wait_for_slow_disk():
+    sink = SlowSink(delay=0.3)
+    records = queue.Queue()
+    logger = logging.getLogger("audit-test")
+    handler = logging.handlers.QueueHandler(records)
+    logger.addHandler(handler)
+    writer = AuditWriter(records, [sink], batch_size=1000, interval=10.0)
+    writer.start()
+    try:
+        start = time.perf_counter()
+        for i in range(200):
+            logger.warning("edit %d", i)
+        assert time.perf_counter() - start < 0.2
+        assert writer.flush(timeout=5)
+        assert [len(b) for b in sink.batches] == [200]
+    finally:
+        logger.removeHandler(handler)
+        writer.stop()
+
+def test_stop_flushes_pending_records(tmp_path):
+    path = tmp_path / "audit.log"
+    records = queue.Queue()
+    writer = AuditWriter(records, [FileSink(str(path))], batch_size=1000, interval=60.0)
+    writer.start()
+    records.put(make_record("USER: alice | ACTION: CREATE_OPERATION | DETAILS: Montant: 10.00"))
+    records.put(make_record("USER: bob | ACTION: TRANSFER | DETAILS: 5 from 1 to 2"))
+    writer.stop()
+    writer.stop()  # Idempotent
+    assert not writer.flush()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [line.split(" - ", 1)[1] for line in lines] == [
+        "USER: alice | ACTION: CREATE_OPERATION | DETAILS: Montant: 10.00",
+        "USER: bob | ACTION: TRANSFER | DETAILS: 5 from 1 to 2",
+    ]
+
+def test_failing_sink_does_not_stop_the_writer():
+    def broken(records):
+        raise OSError("disk full")
+    sink = SlowSink()
+    records = queue.Queue()
+    writer = AuditWriter(records, [broken, sink], batch_size=1, interval=1.0)
+    writer.start()
+    try:
+        records.put(make_record("a"))
+        records.put(make_record("b"))
+        assert writer.flush(timeout=5)
+        assert sink.batches == [["a"], ["b"]]
+    finally:
+        writer.stop()
@@ -0,0 +1,88 @@
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from app.models.domain import AuditEvent
+from app.services.audit_store import (
+    AuditFilters, AuditPager, DatabaseSink, audit_choices, fetch_events, import_legacy_log, parse_log_line
+)
+from tests.test_indexes import query_plans
+
+def add_events(session: Session, count: int, start=datetime(2020, 1, 1)):
+    users, actions = ["alice", "bob", "carol"], ["CREATE_OPERATION", "TRANSFER", "LOGIN"]
+    session.execute(insert(AuditEvent.__table__), [
+        {"timestamp": start + timedelta(hours=i // 2), "user": users[i % 3], "action": actions[i % 5 % 3],
+         "details": f"event {i}"}
+        for i in range(count)
+    ])
+    session.commit()
+
+def test_database_sink_stores_log_action_records(session: Session):
+    sink = DatabaseSink(session.get_bind())
+    record = logging.LogRecord("audit", logging.INFO, __file__, 0, "USER: alice | ACTION: TRANSFER | DETAILS: 5",
+                               None, None)
+    record.__dict__.update(audit_user="alice", audit_action="TRANSFER", audit_details="5 from 1 to 2")
+    other = logging.LogRecord("audit", logging.INFO, __file__, 0, "not an action", None, None)
+    sink([record, other])
+
+    event = session.exec(select(AuditEvent)).one()
+    assert (event.user, event.action, event.details) == ("alice", "TRANSFER", "5 from 1 to 2")
+    assert event.timestamp == datetime.fromtimestamp(record.created).replace(microsecond=0)
+
+def test_import_legacy_log(session: Session, tmp_path):
+    path = tmp_path / "audit.log"
+    path.write_text(
+        "2024-01-05 10:00:00 - USER: alice | ACTION: LOGIN | DETAILS: ok\n"
+        "garbage line\n"
+        "2024-01-05 10:05:00 - USER: bob | ACTION: TRANSFER | DETAILS: 10 from 1 to 2 | extra\n",
+        encoding="utf-8")
+    assert parse_log_line("garbage line") is None
+
+    assert import_legacy_log(session, str(path), batch_size=1) == 2
+    # Only once: the table is no longer empty
+    assert import_legacy_log(session, str(path)) == 0
+    assert import_legacy_log(session, str(tmp_path / "missing.log")) == 0
+    events = session.exec(select(AuditEvent).order_by(AuditEvent.id)).all()
+    assert [(e.timestamp, e.user, e.action, e.details) for e in events] == [
+        (datetime(2024, 1, 5, 10, 0), "alice", "LOGIN", "ok"),
+        (datetime(2024, 1, 5, 10, 5), "bob", "TRANSFER", "10 from 1 to 2 | extra"),
+    ]
+
+def test_pages_newest_first_with_filters(session: Session):
+    add_events(session, 500)
+    all_events = session.exec(select(AuditEvent)).all()
+
+    pager = AuditPager(AuditFilters(), page_size=40)
+    assert pager.total(session) == 500
+    pages = [e for n in range(1, 14) for e in pager.page(session, n)]
+    expected = sorted(all_events, key=lambda e: (e.timestamp, e.id), reverse=True)
+    assert [e.id for e in pages] == [e.id for e in expected]
+    # Jumping back and forth gives the same pages
+    assert [e.id for e in pager.page(session, 7)] == [e.id for e in expected[240:280]]
+
+    filters = AuditFilters(user="bob", action="TRANSFER", start=date(2020, 1, 3), end=date(2020, 1, 5))
+    pager = AuditPager(filters, page_size=10)
+    found = [e for n in range(1, 5) for e in pager.page(session, n)]
+    expected = [e for e in expected if e.user == "bob" and e.action == "TRANSFER"
+                and date(2020, 1, 3) <= e.timestamp.date() <= date(2020, 1, 5)]
+    assert found and [e.id for e in found] == [e.id for e in expected]
+    assert pager.total(session) == len(expected)
+
+    assert audit_choices(session) == (["alice", "bob", "carol"], ["CREATE_OPERATION", "LOGIN", "TRANSFER"])
+
+def test_pages_use_indexes(session: Session):
+    cursor = (datetime(2024, 1, 1), 100)
+    plans = query_plans(session, lambda: (
+        fetch_events(session, AuditFilters(), 50, before=cursor),
+        fetch_events(session, AuditFilters(user="alice"), 50),
+        fetch_events(session, AuditFilters(action="LOGIN", start=date(2024, 1, 1)), 50),
+        audit_choices(session),
+    ))
+    assert "SEARCH auditevent USING INDEX ix_auditevent_timestamp (timestamp<?)" in plans[0]
+    assert "USING INDEX ix_auditevent_user_timestamp (user=?)" in plans[1]
+    assert "USING INDEX ix_auditevent_action_timestamp (action=? AND timestamp>?)" in plans[2]
+    # Filter choices: one seek per distinct value, never a scan of the trail
+    assert "SEARCH auditevent USING COVERING INDEX ix_auditevent_user_timestamp (user>?)" in plans[3]
+    assert "SEARCH auditevent USING COVERING INDEX ix_auditevent_action_timestamp (action>?)" in plans[4]
+    assert all("SCAN auditevent" not in plan for plan in plans[3:])
+    assert all("TEMP B-TREE" not in plan for plan in plans)
@@ -0,0 +1,38 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Allocation, Operation, OperationType, Owner
+from app.services.columnar import export_allocations_npz, load_allocations_npz
+from app.services.export import iter_allocations_csv
+
+def test_columnar_roundtrip(session: Session, test_account, test_lot, default_categories):
+    owners = [Owner(name="Anne"), Owner(name="Émile")]
+    for o in owners:
+        session.add(o)
+    session.flush()
+    for i in range(400):
+        op = Operation(date=date(2000, 1, 1) + timedelta(days=i * 9), amount=Decimal("1234.57"),
+                       lot_id=test_lot.id if i % 4 else None, bank_account_id=test_account.id,
+                       category_id=default_categories[i % 3].id,
+                       type=OperationType.ENTREE if i % 2 else OperationType.SORTIE, label=f"Loyer {i}")
+        session.add(op)
+        session.flush()
+        session.add(Allocation(operation_id=op.id, owner_id=owners[0].id, amount=Decimal("617.28")))
+        session.add(Allocation(operation_id=op.id, owner_id=owners[1].id, amount=Decimal("617.29")))
+    session.commit()
+
+    buffer = io.BytesIO()
+    export_allocations_npz(session, buffer)
+    buffer.seek(0)
+    table = load_allocations_npz(buffer)
+
+    assert len(table) == 800
+    assert int(table.amount_cents.sum()) == 400 * 123457
+    assert table.dates()[0] == date(2000, 1, 1)
+    assert list(table.owner_names[table.owner[:2]]) == ["Anne", "Émile"]
+    assert table.lot[0] == -1 and table.lot_names[table.lot[2]] == "Test Lot"
+    assert set(table.type.tolist()) == {1, -1}
+
+    csv_size = len(b"".join(iter_allocations_csv(session)))
+    assert buffer.getbuffer().nbytes * 3 < csv_size
@@ -0,0 +1,28 @@
+from datetime import date
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import BankAccount, Operation, OperationType
+from app.services.dashboard import get_dashboard_summary, get_recent_operations
+
+def test_dashboard_summary(session: Session, test_account):
+    savings = BankAccount(name="Livret", initial_balance=Decimal("1000.00"))
+    session.add(savings)
+    session.commit()
+
+    for d, amount, op_type, acc in [
+        (date(2024, 1, 1), "500.00", OperationType.ENTREE, test_account),
+        (date(2024, 2, 1), "120.50", OperationType.SORTIE, test_account),
+        (date(2024, 3, 1), "200.00", OperationType.ENTREE, savings),
+        (date(2024, 4, 1), "50.00", OperationType.SORTIE, savings),
+    ]:
+        session.add(Operation(date=d, amount=Decimal(amount), bank_account_id=acc.id, type=op_type, label=str(d)))
+    session.commit()
+
+    summary = get_dashboard_summary(session)
+    assert summary.total_income == Decimal("700.00")
+    assert summary.total_expense == Decimal("170.50")
+    assert summary.account_balances == {test_account.id: Decimal("379.50"), savings.id: Decimal("1150.00")}
+    assert summary.global_balance == Decimal("1529.50")
+
+    recent = get_recent_operations(session, limit=2)
+    assert [o.date for o in recent] == [date(2024, 4, 1), date(2024, 3, 1)]
@@ -0,0 +1,83 @@
+import sqlite3
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import create_engine
+from app.database import (
+    SQLITE_PRAGMAS, create_reader_engine, create_writer_engine, effective_pragmas, use_sqlite_profile
+)
+
+def test_sqlite_profile_applied_to_every_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/profile.db")
+    pragmas = dict(SQLITE_PRAGMAS, cache_size=-2048, mmap_size=8 * 1024 * 1024)
+    use_sqlite_profile(engine, pragmas)
+
+    expected = {"journal_mode": "wal", "synchronous": 1, "foreign_keys": 1, "busy_timeout": 30000,
+                "cache_size": -2048, "mmap_size": 8 * 1024 * 1024, "temp_store": 2}
+    assert effective_pragmas(engine) == expected
+
+    # Connections opened later by the pool get the same profile
+    with engine.connect() as first, engine.connect() as second:
+        for connection in (first, second):
+            assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -2048
+            assert connection.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+def test_reader_and_writer_engines(tmp_path):
+    path = f"{tmp_path}/split.db"
+    writer = create_writer_engine(path)
+    with writer.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        connection.exec_driver_sql("INSERT INTO t VALUES (1)")
+    reader = create_reader_engine(path, pool_size=2)
+
+    with writer.connect() as connection:
+        connection.exec_driver_sql("INSERT INTO t VALUES (2)")
+        # The write lock is taken when the transaction begins...
+        other = sqlite3.connect(path, timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.execute("BEGIN IMMEDIATE")
+        other.close()
+        # ...while readers keep reading the last committed snapshot
+        with reader.connect() as read:
+            assert read.exec_driver_sql("SELECT x FROM t").scalars().all() == [1]
+        connection.commit()
+
+    with reader.connect() as read:
+        assert read.exec_driver_sql("SELECT x FROM t ORDER BY x").scalars().all() == [1, 2]
+        assert read.exec_driver_sql("PRAGMA query_only").scalar() == 1
+        with pytest.raises(OperationalError):
+            read.exec_driver_sql("INSERT INTO t VALUES (3)")
+
+def test_session_reads_do_not_wait_for_writer(tmp_path, monkeypatch):
+    import time
+    from sqlalchemy import event, text
+    from app import database
+
+    writer = create_writer_engine(f"{tmp_path}/sessions.db")
+    @event.listens_for(writer, "connect")
+    def short_timeout(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA busy_timeout=500")
+    with writer.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        connection.exec_driver_sql("INSERT INTO t VALUES (1)")
+    monkeypatch.setattr(database, "engine", writer)
+
+    # A long job holds the write lock (resync, import, audit sink...)
+    with writer.connect() as job:
+        job.exec_driver_sql("INSERT INTO t VALUES (2)")
+
+        started = time.perf_counter()
+        with next(database.get_session()) as session:
+            assert session.execute(text("SELECT x FROM t")).scalars().all() == [1]
+        assert time.perf_counter() - started < 0.2
+
+        # Writers still wait their turn
+        with next(database.get_write_session()) as session:
+            with pytest.raises(OperationalError, match="locked"):
+                session.execute(text("SELECT x FROM t"))
+        job.commit()
+
+    with next(database.get_write_session()) as session:
+        session.execute(text("INSERT INTO t VALUES (3)"))
+        session.commit()
+    with next(database.get_session()) as session:
+        assert session.execute(text("SELECT x FROM t ORDER BY x")).scalars().all() == [1, 2, 3]
@@ -0,0 +1,96 @@
+from datetime import date
+from decimal import Decimal
+from sqlmodel import Session, select
+from app.models.domain import Operation, Owner, QuotePart, OperationType
+from app.services.duplicates import backfill_fingerprints, find_duplicates
+from app.services.importer import ImportSettings, import_statement, iter_csv_statement
+from app.utils.fingerprint import operation_fingerprint
+from tests.test_indexes import query_plans
+
+def add_operation(session, account, d, amount, label, op_type=OperationType.SORTIE):
+    op = Operation(date=d, amount=Decimal(amount), bank_account_id=account.id, type=op_type, label=label)
+    session.add(op)
+    session.commit()
+    return op
+
+def test_fingerprint_maintained_on_write(session: Session, test_account):
+    op = add_operation(session, test_account, date(2024, 3, 1), "49.90", "PRLV  Électricité")
+    assert op.fingerprint == operation_fingerprint(test_account.id, date(2024, 3, 1), OperationType.SORTIE,
+                                                   Decimal("49.90"), "prlv electricite")
+    # The sign takes part in the key: a refund is not a duplicate of the charge
+    assert op.fingerprint != operation_fingerprint(test_account.id, date(2024, 3, 1), OperationType.ENTREE,
+                                                   Decimal("49.90"), "prlv electricite")
+
+    before = op.fingerprint
+    op.amount = Decimal("50.00")
+    session.commit()
+    assert op.fingerprint != before
+
+def test_find_duplicates_in_bulk(session: Session, test_account):
+    first = add_operation(session, test_account, date(2024, 3, 1), "10.00", "Boulangerie")
+    second = add_operation(session, test_account, date(2024, 3, 1), "10.00", "BOULANGERIE")
+    other = add_operation(session, test_account, date(2024, 3, 2), "10.00", "Boulangerie")
+
+    candidates = [first.fingerprint, other.fingerprint, "0" * 20] * 400
+    plans = query_plans(session, lambda: find_duplicates(session, candidates))
+    assert find_duplicates(session, candidates) == {
+        first.fingerprint: [first.id, second.id], other.fingerprint: [other.id],
+    }
+    # One indexed lookup for the whole batch
+    assert len(plans) == 1 and "USING COVERING INDEX ix_operation_fingerprint (fingerprint=?)" in plans[0]
+    assert "TEMP B-TREE" not in plans[0]
+    assert find_duplicates(session, [first.fingerprint], before_id=first.id) == {first.fingerprint: [first.id]}
+
+def test_fingerprint_column_added_and_backfilled(tmp_path):
+    from sqlmodel import SQLModel
+    from app.database import add_missing_columns, create_missing_indexes, create_writer_engine
+    from app.models.domain import BankAccount
+
+    # The application's writer engine: one write transaction at a time
+    engine = create_writer_engine(f"{tmp_path}/old.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        account = BankAccount(name="Compte")
+        session.add(account)
+        session.commit()
+        add_operation(session, account, date(2024, 1, 5), "12.34", "Ancienne")
+        account_id = account.id
+    # A database created before the column was declared
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_operation_fingerprint")
+        connection.exec_driver_sql("ALTER TABLE operation DROP COLUMN fingerprint")
+
+    add_missing_columns(engine)
+    add_missing_columns(engine)  # Idempotent
+    create_missing_indexes(engine)
+    with Session(engine) as session:
+        assert backfill_fingerprints(session, batch_size=1) == 1
+        assert backfill_fingerprints(session) == 0
+        op = session.exec(select(Operation)).one()
+        assert op.fingerprint == operation_fingerprint(account_id, date(2024, 1, 5), OperationType.SORTIE,
+                                                       Decimal("12.34"), "Ancienne")
+
+STATEMENT = """Date;Libellé;Montant
+05/01/2024;VIR LOYER;800,00
+10/01/2024;CAFE;-2,50
+10/01/2024;CAFE;-2,50
+"""
+
+def test_reimport_skips_recorded_lines(session: Session, test_lot, test_account):
+    owner = Owner(name="A")
+    session.add(owner)
+    session.commit()
+    session.add(QuotePart(lot_id=test_lot.id, owner_id=owner.id, numerator=1, denominator=1,
+                          start_date=date(2020, 1, 1)))
+    session.commit()
+    settings = ImportSettings(bank_account_id=test_account.id, lot_id=test_lot.id)
+
+    # The same line twice in a statement is two operations
+    report = import_statement(session, iter_csv_statement(STATEMENT.splitlines()), settings)
+    assert (report.lines, report.duplicates) == (3, 0)
+
+    # Re-importing it, with one new line, only adds that line
+    again = STATEMENT + "11/01/2024;CAFE;-2,50\n"
+    report = import_statement(session, iter_csv_statement(again.splitlines()), settings, batch_size=2)
+    assert (report.lines, report.duplicates) == (1, 3)
+    assert len(session.exec(select(Operation).where(Operation.label == "CAFE")).all()) == 3
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Allocation, Operation, OperationType, Owner
+from app.services.export import iter_allocations_csv, iter_operations_csv
+
+def add_operations(session, account, lot, category, count):
+    owner = Owner(name="Propriétaire €")
+    session.add(owner)
+    session.flush()
+    for i in range(count):
+        op = Operation(date=date(2024, 1, 1) + timedelta(days=i), amount=Decimal("12.50"),
+                       lot_id=lot.id, bank_account_id=account.id, category_id=category.id,
+                       type=OperationType.SORTIE, label=f"Facture; n°{i}")
+        session.add(op)
+        session.flush()
+        session.add(Allocation(operation_id=op.id, owner_id=owner.id, amount=op.amount))
+    session.commit()
+
+def test_streamed_csv_chunks(session: Session, test_account, test_lot, default_categories):
+    category = default_categories[0]
+    add_operations(session, test_account, test_lot, category, 7)
+
+    chunks = list(iter_operations_csv(session, chunk_rows=3))
+    assert len(chunks) > 2
+    assert all(isinstance(c, bytes) for c in chunks)
+    # The chunk size does not change the file
+    streamed = b"".join(chunks).decode("utf-8")
+    assert streamed == b"".join(iter_operations_csv(session)).decode("utf-8")
+    lines = streamed.splitlines()
+    assert len(lines) == 8
+    assert lines[1] == f'2024-01-01;Test Lot;Test Account;SORTIE;{category.name};"Facture; n°0";12.50;'
+
+    streamed = b"".join(iter_allocations_csv(session, chunk_rows=3)).decode("utf-8")
+    assert streamed == b"".join(iter_allocations_csv(session)).decode("utf-8")
+    lines = streamed.splitlines()
+    assert lines[0] == "Date;Operation;Lot;Proprietaire;Montant"
+    assert lines[1:3] == ['2024-01-01;"Facture; n°0";Test Lot;Propriétaire €;12.50',
+                          '2024-01-02;"Facture; n°1";Test Lot;Propriétaire €;12.50']
+    assert len(lines) == 8
+
+def test_streamed_csv_empty(session: Session):
+    assert b"".join(iter_operations_csv(session)).decode("utf-8").strip() == \
+        "Date;Lot;Compte;Type;Categorie;Libelle;Montant;Paye Par"
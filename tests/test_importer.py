@@ -0,0 +1,104 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlmodel import Session, select
+from app.models.domain import Allocation, Operation, Owner, OwnerBalance, QuotePart, OperationType
+from app.services.accounting import FractionError
+from app.services.importer import (
+    ImportRule, ImportSettings, StatementError, import_statement, iter_csv_statement,
+    iter_ofx_statement, learn_rules, parse_amount, read_statement
+)
+
+CSV_STATEMENT = """Date opération;Libellé;Débit;Crédit
+05/01/2024;VIR LOYER DUPONT;;1.250,00
+10/01/2024;PRLV SYNDIC RESIDENCE;320,15;
+12/01/2024;FRAIS TENUE COMPTE;2,50;
+15/01/2024;ECHANGE NUL;;
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240105120000
+<TRNAMT>1250.00
+<NAME>VIR LOYER DUPONT
+</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110<TRNAMT>-320.15<NAME>PRLV SYNDIC<MEMO>RESIDENCE</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+def test_parse_amount():
+    assert parse_amount("1.250,00") == Decimal("1250.00")
+    assert parse_amount("-1,250.5") == Decimal("-1250.50")
+    assert parse_amount("12,3 €") == Decimal("12.30")
+    with pytest.raises(ValueError):
+        parse_amount("1,005.001")
+
+def test_csv_and_ofx_statements():
+    lines = list(iter_csv_statement(CSV_STATEMENT.splitlines(keepends=True)))
+    assert [(l.date, l.label, l.amount) for l in lines] == [
+        (date(2024, 1, 5), "VIR LOYER DUPONT", Decimal("1250.00")),
+        (date(2024, 1, 10), "PRLV SYNDIC RESIDENCE", Decimal("-320.15")),
+        (date(2024, 1, 12), "FRAIS TENUE COMPTE", Decimal("-2.50")),
+        (date(2024, 1, 15), "ECHANGE NUL", Decimal("0.00")),
+    ]
+    ofx = list(iter_ofx_statement(OFX_STATEMENT.splitlines()))
+    assert [(l.date, l.label, l.amount) for l in ofx] == [
+        (date(2024, 1, 5), "VIR LOYER DUPONT", Decimal("1250.00")),
+        (date(2024, 1, 10), "PRLV SYNDIC RESIDENCE", Decimal("-320.15")),
+    ]
+    with pytest.raises(StatementError) as error:
+        list(iter_csv_statement(["Date;Libellé;Montant\n", "31/02/2024;X;1\n"]))
+    assert error.value.line == 2
+
+def test_read_statement_cp1252(tmp_path):
+    path = tmp_path / "releve.csv"
+    path.write_bytes("Date;Libellé;Montant\n01/02/2024;Réparation chaudière;-80,00\n".encode("cp1252"))
+    line, = read_statement(str(path))
+    assert line.label == "Réparation chaudière"
+
+def test_import_statement_single_transaction(session: Session, test_lot, test_account, default_categories, count_queries):
+    a, b = Owner(name="A"), Owner(name="B")
+    session.add(a)
+    session.add(b)
+    session.commit()
+    for o in (a, b):
+        session.add(QuotePart(lot_id=test_lot.id, owner_id=o.id, numerator=1, denominator=2,
+                              start_date=date(2020, 1, 1)))
+    session.commit()
+    categories = {c.name: c.id for c in default_categories}
+
+    settings = ImportSettings(
+        bank_account_id=test_account.id, lot_id=test_lot.id,
+        income_category_id=categories["LOYER"], expense_category_id=categories["CHARGES"],
+        rules=[ImportRule("frais", category_id=categories["FRAIS_BANCAIRES"])],
+    )
+    lines = iter_csv_statement(CSV_STATEMENT.splitlines(keepends=True))
+    with count_queries() as statements:
+        report = import_statement(session, lines, settings, batch_size=2)
+    assert (report.lines, report.allocations, report.skipped) == (3, 6, 1)
+    # One executemany INSERT of operations per batch, whatever the batch length
+    assert sum(s.startswith("INSERT INTO operation") for s in statements) == 2
+
+    ops = session.exec(select(Operation).order_by(Operation.id)).all()
+    assert [(op.label, op.type, op.amount, op.category_id) for op in ops] == [
+        ("VIR LOYER DUPONT", OperationType.ENTREE, Decimal("1250.00"), categories["LOYER"]),
+        ("PRLV SYNDIC RESIDENCE", OperationType.SORTIE, Decimal("320.15"), categories["CHARGES"]),
+        ("FRAIS TENUE COMPTE", OperationType.SORTIE, Decimal("2.50"), categories["FRAIS_BANCAIRES"]),
+    ]
+    assert sum(x.amount for x in session.exec(select(Allocation)).all()) == Decimal("1572.65")
+    balance = session.exec(select(OwnerBalance).where(OwnerBalance.owner_id == a.id)).one()
+    assert (balance.income, balance.expense) == (Decimal("625.00"), Decimal("161.33"))
+
+    # Recurring labels are classified like the last time
+    learned = learn_rules(session, test_account.id)
+    assert learned["frais tenue compte"] == (categories["FRAIS_BANCAIRES"], test_lot.id)
+
+def test_import_statement_rolls_back(session: Session, test_lot, test_account):
+    # No quote part on the lot: the distribution fails and nothing is kept
+    settings = ImportSettings(bank_account_id=test_account.id, lot_id=test_lot.id)
+    lines = iter_csv_statement(CSV_STATEMENT.splitlines(keepends=True))
+    with pytest.raises(FractionError):
+        import_statement(session, lines, settings)
+    assert session.exec(select(Operation)).all() == []
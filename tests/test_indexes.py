@@ -0,0 +1,64 @@
+from datetime import date
+from sqlalchemy import event
+from sqlmodel import Session
+from app.services.accounting import get_lot_timeline
+from app.services.journal import JournalFilters, fetch_journal_page
+from app.services.pdf_reports import fetch_report_details
+
+def query_plans(session: Session, run) -> list:
+    """
+    Runs `run()` and returns the EXPLAIN QUERY PLAN details of each statement it sent.
+    """
+    statements = []
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    connection = session.connection()
+    return [" | ".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+            for statement, parameters in statements]
+
+def test_journal_queries_use_indexes(session: Session):
+    plans = query_plans(session, lambda: (
+        fetch_journal_page(session, JournalFilters(lot_id=1, start=date(2024, 1, 1)), 25),
+        fetch_journal_page(session, JournalFilters(bank_account_id=1), 25),
+        fetch_journal_page(session, JournalFilters(), 25),
+    ))
+    assert "USING INDEX ix_operation_lot_date (lot_id=? AND date>?)" in plans[0]
+    assert "USING INDEX ix_operation_bank_account_id" in plans[1]
+    # Unfiltered journal: read in date order, no sort
+    assert "SCAN operation USING INDEX ix_operation_date" in plans[2]
+    assert "TEMP B-TREE" not in plans[2]
+
+def test_report_queries_use_indexes(session: Session):
+    plans = query_plans(session, lambda: (
+        fetch_report_details(session, 2024, owner_id=1),
+        fetch_report_details(session, 2024),
+        get_lot_timeline(session, 1),
+    ))
+    assert "USING INDEX ix_allocation_owner_operation (owner_id=?)" in plans[0]
+    assert "USING INDEX ix_operation_date (date>? AND date<?)" in plans[1]
+    assert "USING INDEX ix_allocation_operation_id (operation_id=?)" in plans[1]
+    assert "USING INDEX ix_quotepart_lot_id (lot_id=?)" in plans[2]
+
+def test_missing_indexes_created_on_existing_database(tmp_path):
+    from sqlmodel import SQLModel, create_engine
+    from app.database import create_missing_indexes
+
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    SQLModel.metadata.create_all(engine)
+    # A database created before the indexes were declared
+    with engine.begin() as connection:
+        for name in ("ix_operation_date", "ix_operation_lot_date", "ix_allocation_owner_operation"):
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)  # Idempotent
+    with engine.connect() as connection:
+        names = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    assert {"ix_operation_date", "ix_operation_lot_date", "ix_allocation_owner_operation"} <= names
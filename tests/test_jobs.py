@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import pytest
+from app.services.jobs import JobRunner, JobStatus
+
+def square(x):
+    return x * x
+
+def test_io_and_cpu_jobs():
+    runner = JobRunner(io_workers=2, cpu_workers=1)
+    async def scenario():
+        loop_thread = threading.get_ident()
+        io_thread = await runner.io_bound("thread", threading.get_ident)
+        assert io_thread != loop_thread
+        assert await runner.cpu_bound("square", square, 7) == 49
+    try:
+        asyncio.run(scenario())
+    finally:
+        runner.shutdown()
+    assert [j.status for j in runner.jobs] == [JobStatus.DONE, JobStatus.DONE]
+    assert runner.active() == []
+
+def test_concurrency_cap_and_progress():
+    runner = JobRunner(io_workers=1)
+    release = threading.Event()
+
+    def blocking(progress):
+        progress(1, 2)
+        release.wait(5)
+        progress(2, 2)
+        return "ok"
+
+    async def scenario():
+        first = runner.submit("first", blocking, report_progress=True)
+        second = runner.submit("second", lambda: "later")
+        await asyncio.sleep(0.1)
+        # Only one worker: the second job waits for the first
+        assert first.status == JobStatus.RUNNING and first.fraction == 0.5
+        assert second.status == JobStatus.PENDING
+        release.set()
+        assert await first.wait() == "ok"
+        assert await second.wait() == "later"
+    try:
+        asyncio.run(scenario())
+    finally:
+        runner.shutdown()
+
+def test_failed_job():
+    runner = JobRunner(io_workers=1)
+    async def scenario():
+        with pytest.raises(ZeroDivisionError):
+            await runner.io_bound("boom", lambda: 1 / 0)
+    try:
+        asyncio.run(scenario())
+    finally:
+        runner.shutdown()
+    job = runner.jobs[-1]
+    assert job.status == JobStatus.FAILED and "division" in job.error
+
+# What a "spawn" worker does when the server was started with `python -m app.main`
+SPAWNED_WORKER = """
+import multiprocessing, runpy
+import app.database, app.services.bootstrap
+calls = []
+app.database.create_db_and_tables = lambda: calls.append("create_db_and_tables")
+app.services.bootstrap.bootstrap_data = lambda: calls.append("bootstrap_data")
+multiprocessing.current_process().name = "SpawnProcess-1"
+runpy.run_module("app.main", run_name="__mp_main__", alter_sys=True)
+print(calls)
+"""
+
+def test_spawned_worker_skips_startup():
+    import os
+    import subprocess
+    import sys
+    from app.ui.reports import REPORTS_DIR
+    os.makedirs(REPORTS_DIR, exist_ok=True)  # Served as static files when app.main is imported
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", SPAWNED_WORKER], cwd=root, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": root}, timeout=60)
+    assert result.returncode == 0, result.stderr
+    # Migrations and bootstrap only run when the server starts (app.on_startup)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_jobs_cancelled_on_shutdown():
+    runner = JobRunner(io_workers=1)
+    release = threading.Event()
+    running = runner.submit("running", lambda: release.wait(5))
+    queued = runner.submit("queued", lambda: "never")
+    threading.Timer(0.1, release.set).start()
+    runner.shutdown()
+    # The queued job never ran: it is finished, not left PENDING
+    assert running.status == JobStatus.DONE
+    assert queued.status == JobStatus.CANCELLED and queued.finished_at is not None
+    assert runner.active() == []
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Operation, OperationType
+from app.services.journal import JournalFilters, JournalPager, count_operations, fetch_journal_page
+
+def add_operations(session, account, lot, count):
+    start = date(2024, 1, 1)
+    for i in range(count):
+        session.add(Operation(
+            date=start + timedelta(days=i // 3), amount=Decimal("10.00"), bank_account_id=account.id,
+            lot_id=lot.id if i % 2 else None,
+            type=OperationType.ENTREE if i % 2 else OperationType.SORTIE, label=f"Op {i}"
+        ))
+    session.commit()
+
+def test_keyset_pages_cover_journal_once(session: Session, test_account, test_lot):
+    add_operations(session, test_account, test_lot, 23)
+    pager = JournalPager(JournalFilters(), page_size=5)
+    assert pager.total(session) == 23
+
+    seen = []
+    for number in range(1, 6):
+        seen.extend(row.id for row in pager.page(session, number))
+    assert len(seen) == 23 and len(set(seen)) == 23
+
+    # Rows come newest first, ties broken by id
+    ordered = fetch_journal_page(session, JournalFilters(), limit=100)
+    assert [r.id for r in ordered] == seen
+    assert ordered[0].lot_name is None and ordered[1].lot_name == "Test Lot"
+    assert ordered[0].bank_account_name == "Test Account"
+
+def test_unvisited_page_falls_back_to_offset(session: Session, test_account, test_lot):
+    add_operations(session, test_account, test_lot, 23)
+    sequential = JournalPager(JournalFilters(), page_size=5)
+    expected = [sequential.page(session, n) for n in range(1, 5)][-1]
+    jumped = JournalPager(JournalFilters(), page_size=5).page(session, 4)
+    assert [r.id for r in jumped] == [r.id for r in expected]
+
+def test_journal_filters(session: Session, test_account, test_lot):
+    add_operations(session, test_account, test_lot, 12)
+    assert count_operations(session, JournalFilters(lot_id=test_lot.id)) == 6
+    assert count_operations(session, JournalFilters(type=OperationType.SORTIE)) == 6
+    assert count_operations(session, JournalFilters(start=date(2024, 1, 2), end=date(2024, 1, 3))) == 6
+
+    ascending = JournalPager(JournalFilters(lot_id=test_lot.id), page_size=4, descending=False)
+    first = ascending.page(session, 1)
+    second = ascending.page(session, 2)
+    assert [r.date for r in first + second] == sorted(r.date for r in first + second)
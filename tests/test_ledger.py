@@ -0,0 +1,62 @@
+from datetime import date
+from decimal import Decimal
+from sqlmodel import Session, select
+from app.models.domain import Operation, Owner, QuotePart, OperationType, OwnerBalance
+from app.services.accounting import distribute_operation, resync_lot_allocations
+from app.services.ledger import (
+    owner_balances, owner_totals, rebuild_ledger, refresh_ledger_for
+)
+
+def add_operation(session, lot, account, d, amount, op_type):
+    op = Operation(date=d, amount=Decimal(amount), lot_id=lot.id, bank_account_id=account.id,
+                   type=op_type, label="Test")
+    session.add(op)
+    session.flush()
+    for a in distribute_operation(session, op):
+        session.add(a)
+    refresh_ledger_for(session, [(op.lot_id, op.date)])
+    session.commit()
+    return op
+
+def setup_owners(session, lot):
+    a, b = Owner(name="A"), Owner(name="B")
+    session.add(a)
+    session.add(b)
+    session.commit()
+    for o in (a, b):
+        session.add(QuotePart(lot_id=lot.id, owner_id=o.id, numerator=1, denominator=2,
+                              start_date=date(2020, 1, 1)))
+    session.commit()
+    return a, b
+
+def test_ledger_maintained_on_write(session: Session, test_lot, test_account):
+    a, b = setup_owners(session, test_lot)
+    add_operation(session, test_lot, test_account, date(2024, 1, 5), "100.00", OperationType.ENTREE)
+    add_operation(session, test_lot, test_account, date(2024, 1, 20), "30.00", OperationType.SORTIE)
+    add_operation(session, test_lot, test_account, date(2024, 2, 1), "10.00", OperationType.SORTIE)
+
+    rows = session.exec(select(OwnerBalance).where(OwnerBalance.owner_id == a.id).order_by(OwnerBalance.month)).all()
+    assert [(r.month, r.income, r.expense, r.balance) for r in rows] == [
+        (date(2024, 1, 1), Decimal("50.00"), Decimal("15.00"), Decimal("35.00")),
+        (date(2024, 2, 1), Decimal("0.00"), Decimal("5.00"), Decimal("-5.00")),
+    ]
+    assert owner_balances(session) == {a.id: Decimal("30.00"), b.id: Decimal("30.00")}
+    assert owner_totals(session, a.id, date(2024, 1, 1), date(2024, 1, 31)) == (Decimal("50.00"), Decimal("15.00"))
+
+def test_ledger_follows_resync_and_rebuild(session: Session, test_lot, test_account):
+    a, b = setup_owners(session, test_lot)
+    add_operation(session, test_lot, test_account, date(2024, 1, 5), "100.00", OperationType.ENTREE)
+
+    # A takes everything from now on
+    for qp in session.exec(select(QuotePart)).all():
+        if qp.owner_id == a.id:
+            qp.numerator, qp.denominator = 1, 1
+        else:
+            session.delete(qp)
+    session.commit()
+    resync_lot_allocations(session, test_lot.id)
+    assert owner_balances(session) == {a.id: Decimal("100.00")}
+
+    before = owner_balances(session)
+    rebuild_ledger(session)
+    assert owner_balances(session) == before
@@ -0,0 +1,31 @@
+from datetime import date
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Allocation, Operation, OperationType, Owner
+from app.services.matrix import grand_total, owner_amounts
+
+def test_owner_amounts_pivot(session: Session, test_account, test_lot):
+    a, b = Owner(name="A"), Owner(name="B")
+    session.add(a)
+    session.add(b)
+    rent = Operation(date=date(2024, 1, 1), amount=Decimal("100.00"), lot_id=test_lot.id,
+                     bank_account_id=test_account.id, type=OperationType.ENTREE, label="Loyer")
+    works = Operation(date=date(2024, 2, 1), amount=Decimal("40.00"), lot_id=test_lot.id,
+                      bank_account_id=test_account.id, type=OperationType.SORTIE, label="Travaux")
+    transfer = Operation(date=date(2024, 3, 1), amount=Decimal("5.00"),
+                         bank_account_id=test_account.id, type=OperationType.SORTIE, label="Frais")
+    for op in (rent, works, transfer):
+        session.add(op)
+    session.flush()
+    for op_id, owner_id, amount in [(rent.id, a.id, "60.00"), (rent.id, b.id, "40.00"),
+                                    (works.id, a.id, "30.00"), (works.id, b.id, "10.00")]:
+        session.add(Allocation(operation_id=op_id, owner_id=owner_id, amount=Decimal(amount)))
+    session.commit()
+
+    pivot = owner_amounts(session)
+    assert pivot == {
+        rent.id: {a.id: Decimal("60.00"), b.id: Decimal("40.00")},
+        works.id: {a.id: Decimal("-30.00"), b.id: Decimal("-10.00")},
+    }
+    assert list(owner_amounts(session, [works.id])) == [works.id]
+    assert grand_total(session) == Decimal("55.00")
@@ -0,0 +1,124 @@
+import random
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlmodel import Session
+from app.models.domain import Operation, Owner, QuotePart, OperationType
+from app.utils.money import div_half_even, from_cents, split_cents, to_cents
+
+# Property tests: the integer-cent path must give exactly the Decimal results
+SEED = 20260101
+RUNS = 5000
+
+def random_amount(rng: random.Random) -> Decimal:
+    return from_cents(rng.randint(-10**11, 10**11))
+
+def random_shares(rng: random.Random):
+    return tuple((owner_id, rng.randint(0, 1000), rng.randint(1, 10000)) for owner_id in range(rng.randint(1, 6)))
+
+def decimal_split(amount: Decimal, shares):
+    """Reference implementation on Decimal."""
+    result = []
+    allocated = Decimal("0.00")
+    for i, (owner_id, numerator, denominator) in enumerate(shares):
+        if i == len(shares) - 1:
+            share = amount - allocated
+        else:
+            share = ((amount * numerator) / denominator).quantize(Decimal("0.01"))
+            allocated += share
+        result.append((owner_id, share))
+    return result
+
+def test_cents_round_trip():
+    rng = random.Random(SEED)
+    for _ in range(RUNS):
+        amount = random_amount(rng)
+        assert from_cents(to_cents(amount)) == amount
+        assert str(from_cents(to_cents(amount))) == str(amount.quantize(Decimal("0.01")))
+    assert to_cents("12.30") == 1230
+    assert to_cents(Decimal("-0.05")) == -5
+    with pytest.raises(ValueError):
+        to_cents(Decimal("1.005"))
+
+def test_div_half_even_matches_decimal():
+    rng = random.Random(SEED)
+    for _ in range(RUNS):
+        numerator, denominator = rng.randint(-10**9, 10**9), rng.randint(1, 1000)
+        expected = (Decimal(numerator) / Decimal(denominator)).quantize(Decimal("1"))
+        assert div_half_even(numerator, denominator) == int(expected)
+    # Ties go to the even neighbour
+    assert [div_half_even(n, 2) for n in (1, 3, 5, -1, -3)] == [0, 2, 2, 0, -2]
+
+def test_split_matches_decimal():
+    rng = random.Random(SEED)
+    for _ in range(RUNS):
+        amount, shares = random_amount(rng), random_shares(rng)
+        cents = split_cents(to_cents(amount), shares)
+        assert [(owner_id, from_cents(c)) for owner_id, c in cents] == decimal_split(amount, shares)
+        assert sum(c for _, c in cents) == to_cents(amount)
+
+def test_aggregates_match_decimal(session: Session, test_lot, test_account):
+    from app.services.accounting import distribute_operation
+    from app.services.dashboard import get_dashboard_summary
+    from app.services.ledger import owner_balances, owner_totals, rebuild_ledger
+    from app.services.matrix import grand_total, owner_amounts
+
+    rng = random.Random(SEED)
+    owners = [Owner(name=f"P{i}") for i in range(3)]
+    for o in owners:
+        session.add(o)
+    session.commit()
+    for o, numerator in zip(owners, (1, 1, 1)):
+        session.add(QuotePart(lot_id=test_lot.id, owner_id=o.id, numerator=numerator, denominator=3,
+                              start_date=date(2020, 1, 1)))
+    session.commit()
+
+    ops = []
+    for _ in range(300):
+        op = Operation(date=date(2024, rng.randint(1, 12), rng.randint(1, 28)), amount=from_cents(rng.randint(1, 10**7)),
+                       lot_id=test_lot.id, bank_account_id=test_account.id, label="Op",
+                       type=rng.choice([OperationType.ENTREE, OperationType.SORTIE]))
+        session.add(op)
+        session.flush()
+        for a in distribute_operation(session, op):
+            session.add(a)
+        ops.append(op)
+    session.commit()
+    rebuild_ledger(session)
+
+    def sign(op):
+        return 1 if op.type == OperationType.ENTREE else -1
+
+    expected_balances = {o.id: Decimal("0.00") for o in owners}
+    expected_pivot = {}
+    for op in ops:
+        for a in op.allocations:
+            expected_balances[a.owner_id] += sign(op) * a.amount
+            expected_pivot.setdefault(op.id, {})[a.owner_id] = sign(op) * a.amount
+
+    assert owner_balances(session) == expected_balances
+    assert owner_amounts(session) == expected_pivot
+    assert grand_total(session) == sum(sign(op) * op.amount for op in ops)
+    income = sum((a.amount for op in ops if op.type == OperationType.ENTREE
+                  for a in op.allocations if a.owner_id == owners[0].id), Decimal("0.00"))
+    assert owner_totals(session, owners[0].id, date(2024, 1, 1), date(2024, 12, 31))[0] == income
+
+    summary = get_dashboard_summary(session)
+    assert summary.total_income == sum(op.amount for op in ops if op.type == OperationType.ENTREE)
+    assert summary.global_balance == test_account.initial_balance + grand_total(session)
+
+def test_split_array_matches_split():
+    from app.utils.money import split_cents_array
+
+    rng = random.Random(SEED)
+    for _ in range(200):
+        shares = random_shares(rng)
+        amounts = [rng.randint(-10**11, 10**11) for _ in range(50)]
+        assert split_cents_array(amounts, shares).tolist() == [
+            [share for _, share in split_cents(c, shares)] for c in amounts
+        ]
+    # Products beyond int64 fall back to Python integers
+    huge = [10**17, -(10**17) - 1]
+    assert split_cents_array(huge, ((1, 999, 1000), (2, 1, 1000))).tolist() == [
+        [share for _, share in split_cents(c, ((1, 999, 1000), (2, 1, 1000)))] for c in huge
+    ]
@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session, select
+from app.models.domain import Lot, Operation, OperationType, Owner, QuotePart, Allocation
+from app.services.accounting import distribute_operation
+from app.services.export import iter_allocations_csv, iter_operations_csv
+from app.services.pdf_reports import generate_owner_annual_report
+from app.services.journal import JournalFilters, JournalPager
+from app.services.matrix import owner_amounts
+
+def add_history(session, account_id, category_id, count):
+    """
+    Adds `count` operations, each on a new lot shared by two new owners.
+    """
+    for i in range(count):
+        lot = Lot(name=f"Lot {i}")
+        owners = [Owner(name=f"Owner {i}a"), Owner(name=f"Owner {i}b")]
+        session.add(lot)
+        for o in owners:
+            session.add(o)
+        session.flush()
+        for o in owners:
+            session.add(QuotePart(lot_id=lot.id, owner_id=o.id, numerator=1, denominator=2,
+                                  start_date=date(2020, 1, 1)))
+        session.flush()
+        op = Operation(date=date(2024, 1, 1) + timedelta(days=i), amount=Decimal("10.00"),
+                       lot_id=lot.id, bank_account_id=account_id, category_id=category_id,
+                       type=OperationType.ENTREE, label=f"Op {i}")
+        session.add(op)
+        session.flush()
+        for a in distribute_operation(session, op):
+            session.add(a)
+    session.commit()
+
+def page_queries(session, count_queries):
+    """
+    Runs what the journal, matrix, CSV export and PDF pages run; returns the statements per page.
+    """
+    counts = {}
+
+    with count_queries() as statements:
+        b"".join(iter_operations_csv(session))
+    counts["operations_csv"] = len(statements)
+
+    with count_queries() as statements:
+        b"".join(iter_allocations_csv(session))
+    counts["allocations_csv"] = len(statements)
+
+    pager = JournalPager(JournalFilters(), page_size=50)
+    with count_queries() as statements:
+        pager.total(session)
+        ops = pager.page(session, 1)
+    counts["journal"] = len(statements)
+
+    with count_queries() as statements:
+        owner_amounts(session, [op.id for op in ops])
+    counts["matrix"] = len(statements)
+
+    owner_id = session.exec(select(Allocation.owner_id)).first()
+    session.expunge_all()
+    with count_queries() as statements:
+        generate_owner_annual_report(session, owner_id, 2024)
+    counts["pdf"] = len(statements)
+
+    return counts
+
+def test_query_count_independent_of_rows(session: Session, test_account, default_categories, count_queries):
+    account_id, category_id = test_account.id, default_categories[0].id
+    add_history(session, account_id, category_id, 3)
+    small = page_queries(session, count_queries)
+
+    add_history(session, account_id, category_id, 30)
+    large = page_queries(session, count_queries)
+
+    assert small == large
@@ -79,3 +79,143 @@ def test_annual_report_calculation(session: Session, test_lot: Lot, test_account
     # Wait, qp1 starts from 2024-01-01. So op3 (2023) has NO matching parts?
     # distribute_operation would return [] allocs.
     assert total_o1_2023 == Decimal("0.00")
+
+def test_annual_reports_batch(session: Session, test_lot: Lot, test_account, tmp_path):
+    from app.services.ledger import rebuild_ledger
+    from app.services.pdf_reports import generate_annual_reports_batch, fetch_report_details
+
+    owners = [Owner(name="Anne Martin"), Owner(name="Bruno/Petit")]
+    for o in owners:
+        session.add(o)
+    session.commit()
+    for o in owners:
+        session.add(QuotePart(lot_id=test_lot.id, owner_id=o.id, numerator=1, denominator=2,
+                              start_date=date(2024, 1, 1)))
+    session.commit()
+    for month in range(1, 13):
+        op = Operation(date=date(2024, month, 5), amount=Decimal("800.00"), lot_id=test_lot.id,
+                       bank_account_id=test_account.id, type=OperationType.ENTREE, label=f"Loyer {month}")
+        session.add(op)
+        session.flush()
+        for a in distribute_operation(session, op):
+            session.add(a)
+    session.commit()
+    rebuild_ledger(session)
+
+    details = fetch_report_details(session, 2024)
+    assert sorted(details) == sorted(o.id for o in owners)
+    assert len(details[owners[0].id]) == 12
+
+    progress = []
+    written = generate_annual_reports_batch(session, 2024, str(tmp_path),
+                                            progress=lambda done, total: progress.append((done, total)),
+                                            max_workers=2)
+    assert sorted(written) == ["Rapport_Anne_Martin_2024.pdf", "Rapport_Bruno-Petit_2024.pdf"]
+    assert progress[-1] == (2, 2)
+    for filename in written:
+        assert (tmp_path / filename).read_bytes().startswith(b"%PDF")
+
+    assert generate_annual_reports_batch(session, 2023, str(tmp_path)) == []
+
+def test_report_fonts_parsed_once():
+    import os
+    from app.services import pdf_reports
+
+    if not os.path.exists(os.path.join(pdf_reports.FONT_DIR, pdf_reports.FONT_FILES[""])):
+        pytest.skip("DejaVu fonts not installed")
+
+    details = [{"date": "05/01/2024", "label": "Loyer été €", "category": "Loyer", "lot": "Lot A",
+                "amount": Decimal("100.00"), "is_income": True}]
+    first = pdf_reports.render_annual_report("Propriété A", 2024, details, Decimal("100.00"), Decimal("0.00"))
+    cached = dict(pdf_reports._font_cache)
+    second = pdf_reports.render_annual_report("Propriété A", 2024, details, Decimal("100.00"), Decimal("0.00"))
+
+    # Same parsed fonts, and writing a document does not alter them for the next one
+    assert pdf_reports._font_cache == cached
+    assert len(first) == len(second)
+    pdf = pdf_reports.AnnualReportPDF()
+    assert pdf.font_family_main == "DejaVu"
+    # Each document gets its own copy, subset in place when written
+    assert not {id(f) for f in pdf.fonts.values()} & {id(f) for f in cached.values()}
+
+def test_cached_fonts_render_identical_pdf(monkeypatch):
+    import os
+    from datetime import datetime, timezone
+    from app.services import pdf_reports
+
+    if not os.path.exists(os.path.join(pdf_reports.FONT_DIR, pdf_reports.FONT_FILES[""])):
+        pytest.skip("DejaVu fonts not installed")
+
+    # Fixed creation date, so that two renderings can be compared byte for byte
+    output = pdf_reports.AnnualReportPDF.output
+    def dated_output(pdf, *args, **kwargs):
+        pdf.set_creation_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        return output(pdf, *args, **kwargs)
+    monkeypatch.setattr(pdf_reports.AnnualReportPDF, "output", dated_output)
+
+    details = [{"date": "05/01/2024", "label": f"Loyer été € n°{i}", "category": "Loyer", "lot": "Lot A",
+                "amount": Decimal("100.00"), "is_income": i % 2 == 0} for i in range(80)]
+    args = ("Propriété A", 2024, details, Decimal("4000.00"), Decimal("4000.00"))
+    cached = [pdf_reports.render_annual_report(*args) for _ in range(2)]
+    # fpdf's own font loading, without the process cache
+    monkeypatch.setattr(pdf_reports, "add_cached_font", lambda pdf, path, style: pdf.add_font("DejaVu", style, path))
+    uncached = pdf_reports.render_annual_report(*args)
+    assert cached == [uncached, uncached]
+
+def test_report_cache(session: Session, test_lot: Lot, test_account, tmp_path):
+    from app.services.ledger import refresh_ledger_for
+    from app.services.pdf_reports import save_owner_annual_report, generate_annual_reports_batch
+
+    owner = Owner(name="Anne Martin")
+    session.add(owner)
+    session.commit()
+    session.add(QuotePart(lot_id=test_lot.id, owner_id=owner.id, numerator=1, denominator=1,
+                          start_date=date(2024, 1, 1)))
+    session.commit()
+    op = Operation(date=date(2024, 3, 5), amount=Decimal("800.00"), lot_id=test_lot.id,
+                   bank_account_id=test_account.id, type=OperationType.ENTREE, label="Loyer mars")
+    session.add(op)
+    session.flush()
+    for a in distribute_operation(session, op):
+        session.add(a)
+    refresh_ledger_for(session, [(op.lot_id, op.date)])
+    session.commit()
+
+    assert save_owner_annual_report(session, owner.id, 2024, str(tmp_path)) == ("Rapport_Anne_Martin_2024.pdf", True)
+    # Unchanged data: the existing file is served
+    assert save_owner_annual_report(session, owner.id, 2024, str(tmp_path)) == ("Rapport_Anne_Martin_2024.pdf", False)
+    assert generate_annual_reports_batch(session, 2024, str(tmp_path)) == ["Rapport_Anne_Martin_2024.pdf"]
+
+    # Editing an operation of the year invalidates the report
+    op.label = "Loyer de mars"
+    session.commit()
+    assert save_owner_annual_report(session, owner.id, 2024, str(tmp_path)) == ("Rapport_Anne_Martin_2024.pdf", True)
+
+    # So does deleting the file
+    (tmp_path / "Rapport_Anne_Martin_2024.pdf").unlink()
+    assert save_owner_annual_report(session, owner.id, 2024, str(tmp_path)) == ("Rapport_Anne_Martin_2024.pdf", True)
+    assert save_owner_annual_report(session, owner.id, 2023, str(tmp_path)) is None
+
+def test_operation_table_repeats_header():
+    from app.services.pdf_reports import AnnualReportPDF, OperationTable
+
+    class CountingTable(OperationTable):
+        headers = 0
+
+        def header(self):
+            self.headers += 1
+            super().header()
+
+    def lines():
+        for i in range(200):
+            yield {"date": "05/01/2024", "label": f"Loyer {i}", "category": "Loyer", "lot": "Lot A",
+                   "amount": Decimal("10.00"), "is_income": i % 2 == 0}
+
+    pdf = AnnualReportPDF()
+    pdf.add_page()
+    table = CountingTable(pdf)
+    assert table.write(lines()) == 200
+    # One header per page, and no row overflowing the bottom margin
+    assert pdf.page_no() > 1
+    assert table.headers == pdf.page_no()
+    assert bytes(pdf.output()).startswith(b"%PDF")
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlmodel import Session
+from app.models.domain import Category, Operation, OperationType
+from app.services.journal import JournalFilters, JournalPager, count_operations, fetch_journal_page
+from app.services.search import create_search_index, match_query, rebuild_search_index
+
+def add_operation(session, account, label, lot=None, category=None, d=date(2024, 1, 1)):
+    op = Operation(date=d, amount=Decimal("10.00"), bank_account_id=account.id, type=OperationType.SORTIE,
+                   label=label, lot_id=lot.id if lot else None, category_id=category.id if category else None)
+    session.add(op)
+    session.commit()
+    return op
+
+def search(session, text, **filters):
+    return [row.label for row in fetch_journal_page(session, JournalFilters(search=text, **filters), 50)]
+
+def test_match_query():
+    assert match_query("  Loy dup ") == '"Loy"* "dup"*'
+    # FTS operators and quotes typed by the user are plain words
+    assert match_query('loyer OR "x') == '"loyer"* "OR"* "x"*'
+    assert match_query(" -*- ") is None
+
+def test_search_follows_writes(session: Session, test_account, test_lot):
+    create_search_index(session.get_bind())
+    travaux = Category(name="TRAVAUX")
+    session.add(travaux)
+    session.commit()
+    rent = add_operation(session, test_account, "VIR LOYER DUPONT", lot=test_lot)
+    heater = add_operation(session, test_account, "Réparation chaudière", category=travaux)
+    add_operation(session, test_account, "Facture plombier Loyer", category=travaux)
+
+    assert search(session, "loy dup") == ["VIR LOYER DUPONT"]
+    assert search(session, "chaudiere") == ["Réparation chaudière"]  # Accents ignored
+    assert search(session, "test lot") == ["VIR LOYER DUPONT"]  # Lot name
+    assert sorted(search(session, "travaux")) == ["Facture plombier Loyer", "Réparation chaudière"]
+    assert count_operations(session, JournalFilters(search="travaux", category_id=travaux.id)) == 2
+    assert search(session, "loyer", lot_id=test_lot.id) == ["VIR LOYER DUPONT"]
+
+    heater.label = "Remplacement ballon"
+    session.commit()
+    assert search(session, "chaudiere") == []
+    assert search(session, "ballon") == ["Remplacement ballon"]
+
+    travaux.name = "GROS ENTRETIEN"
+    session.commit()
+    assert search(session, "travaux") == []
+    assert len(search(session, "entretien")) == 2
+
+    session.delete(rent)
+    session.commit()
+    assert search(session, "dupont") == []
+
+def test_search_ranking_and_pages(session: Session, test_account):
+    create_search_index(session.get_bind())
+    autre = Category(name="CHARGES EAU")
+    session.add(autre)
+    session.commit()
+    # A match in the label outranks a match in the category name, whatever the date
+    add_operation(session, test_account, "Prélèvement", category=autre, d=date(2024, 6, 1))
+    add_operation(session, test_account, "Facture eau", d=date(2024, 1, 1))
+    assert search(session, "eau") == ["Facture eau", "Prélèvement"]
+
+    for i in range(30):
+        add_operation(session, test_account, f"Loyer {i}", d=date(2024, 1, 1) + timedelta(days=i))
+    pager = JournalPager(JournalFilters(search="loyer"), page_size=25)
+    assert pager.total(session) == 30
+    pages = [row.id for row in pager.page(session, 1)] + [row.id for row in pager.page(session, 2)]
+    assert len(set(pages)) == 30
+
+def test_search_index_of_existing_database(tmp_path, test_account):
+    from sqlmodel import SQLModel, create_engine
+    from app.models.domain import BankAccount
+
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        account = BankAccount(name="Compte")
+        session.add(account)
+        session.commit()
+        add_operation(session, account, "Taxe foncière")
+
+        # Filled when created, then maintained; a rebuild gives the same index
+        create_search_index(engine)
+        create_search_index(engine)
+        add_operation(session, account, "Taxe habitation")
+        assert sorted(search(session, "taxe")) == ["Taxe foncière", "Taxe habitation"]
+        rebuild_search_index(engine)
+        assert sorted(search(session, "taxe")) == ["Taxe foncière", "Taxe habitation"]
+
+def test_search_uses_fts_index(session: Session):
+    from tests.test_indexes import query_plans
+    create_search_index(session.get_bind())
+    plans = query_plans(session, lambda: fetch_journal_page(session, JournalFilters(search="loyer"), 25))
+    assert "SCAN operation_fts VIRTUAL TABLE INDEX" in plans[0]
+    assert "SEARCH operation USING INTEGER PRIMARY KEY (rowid=?)" in plans[0]